@@ -0,0 +1,106 @@
+"""
+Concurrency benchmark.
+
+This module starts the API in a uvicorn subprocess and measures the latency of
+light requests (predictions) while heavy requests (complete dataset, recomputed on
+each request as the response cache is disabled) run concurrently. With the heavy
+service calls off the event loop, the p99 latency of the light requests should
+stay close to its value on an idle worker.
+
+Usage:
+    python -m api.benchmarks.concurrency [--heavy-clients 4] [--requests 200]
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from typing import Dict, List
+
+import httpx
+
+from api.benchmarks.server import api_server
+
+LIGHT_REQUEST = ("POST", "/prediction/user", {"age": 50, "ap_hi": 120, "ap_lo": 80, "cholesterol": 1, "active": 1})
+HEAVY_PATH = "/cardio/dataset"
+
+
+def light_latencies(base_url: str, requests: int) -> List[float]:
+    """
+    Send light requests one after the other and time them.
+
+    Args:
+        base_url: URL of the API
+        requests: Number of requests
+
+    Returns:
+        List of the latencies, in milliseconds
+    """
+    method, path, body = LIGHT_REQUEST
+    latencies = []
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        for _ in range(requests):
+            start = time.perf_counter()
+            client.request(method, path, json=body).raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """
+    Summarize latencies.
+
+    Args:
+        latencies: Latencies, in milliseconds
+
+    Returns:
+        Dict containing the p50, p99 and max latencies
+    """
+    ordered = sorted(latencies)
+    return {
+        "p50": statistics.median(ordered),
+        "p99": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+        "max": ordered[-1],
+    }
+
+
+def main() -> None:
+    """Run the benchmark and print the measures."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--heavy-clients", type=int, default=4, help="Number of clients sending heavy requests")
+    parser.add_argument("--requests", type=int, default=200, help="Number of light requests per phase")
+    args = parser.parse_args()
+
+    with api_server(env={"RESPONSE_CACHE_MAX_BYTES": "0"}) as server:
+        idle = summarize(light_latencies(server.base_url, args.requests))
+
+        stop = threading.Event()
+        heavy_done = []
+
+        def heavy_client() -> None:
+            with httpx.Client(base_url=server.base_url, headers={"Accept-Encoding": "identity"}, timeout=120) as client:
+                while not stop.is_set():
+                    client.get(HEAVY_PATH).raise_for_status()
+                    heavy_done.append(1)
+
+        threads = [threading.Thread(target=heavy_client) for _ in range(args.heavy_clients)]
+        for thread in threads:
+            thread.start()
+        time.sleep(1)
+        start = time.perf_counter()
+        loaded = summarize(light_latencies(server.base_url, args.requests))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    for name, result in (("idle", idle), (f"with {args.heavy_clients} heavy clients", loaded)):
+        print(
+            f"{LIGHT_REQUEST[1]} {name}: p50 {result['p50']:.1f} ms, "
+            f"p99 {result['p99']:.1f} ms, max {result['max']:.1f} ms"
+        )
+    print(f"{HEAVY_PATH}: {len(heavy_done) / elapsed:.1f} requests/s during the loaded phase")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Dataset export benchmark.
+
+This module starts the API in a uvicorn subprocess and downloads the complete
+dataset from the buffered /cardio/dataset endpoint and from the streaming
+/cardio/dataset/export endpoint, reporting for each the time to first byte, the
+total time and the peak resident memory of the server during the download.
+
+The peak memory is read from /proc, so the benchmark only runs on Linux.
+
+Usage:
+    python -m api.benchmarks.export
+"""
+
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from api.benchmarks.server import api_server
+
+DOWNLOADS = {
+    "buffered JSON (/cardio/dataset)": ("/cardio/dataset", {}),
+    "streaming NDJSON (/cardio/dataset/export)": ("/cardio/dataset/export", {"format": "ndjson"}),
+    "streaming CSV (/cardio/dataset/export)": ("/cardio/dataset/export", {"format": "csv"}),
+}
+
+
+def _memory_kb(pid: int, field: str) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def _reset_peak(pid: int) -> bool:
+    # Writing 5 to clear_refs resets VmHWM to the current resident size (Linux >= 4.0)
+    try:
+        with open(f"/proc/{pid}/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def measure(client: httpx.Client, pid: int, path: str, params: Dict[str, str]) -> Dict[str, Optional[float]]:
+    """
+    Download an endpoint and measure the server during the download.
+
+    Args:
+        client: Client bound to the API server
+        pid: Process id of the API server
+        path: Path of the endpoint
+        params: Query parameters of the request
+
+    Returns:
+        Dict containing the time to first byte and total time in ms, the body size in
+        bytes and the peak resident memory growth of the server in MiB (None if the
+        peak could not be reset)
+    """
+    peak_reset = _reset_peak(pid)
+    rss_before = _memory_kb(pid, "VmRSS")
+
+    start = time.perf_counter()
+    ttfb = None
+    size = 0
+    with client.stream("GET", path, params=params) as response:
+        response.raise_for_status()
+        for chunk in response.iter_raw():
+            if ttfb is None:
+                ttfb = time.perf_counter() - start
+            size += len(chunk)
+    total = time.perf_counter() - start
+
+    peak = max(_memory_kb(pid, "VmHWM") - rss_before, 0) / 1024 if peak_reset else None
+    return {"ttfb": ttfb * 1000, "total": total * 1000, "bytes": size, "peak_mib": peak}
+
+
+def main() -> None:
+    """Run the benchmark and print the measures."""
+    headers = {"Accept-Encoding": "identity"}
+    with api_server() as server, httpx.Client(base_url=server.base_url, headers=headers, timeout=60) as client:
+        for name, (path, params) in DOWNLOADS.items():
+            result = measure(client, server.pid, path, params)
+            peak = "n/a" if result["peak_mib"] is None else f"{result['peak_mib']:.1f} MiB"
+            print(
+                f"{name}: ttfb {result['ttfb']:.1f} ms, total {result['total']:.1f} ms, "
+                f"{result['bytes'] / 1e6:.1f} MB, peak RSS growth {peak}"
+            )
+
+
+if __name__ == "__main__":
+    main()
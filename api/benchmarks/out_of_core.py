@@ -0,0 +1,100 @@
+"""
+Out-of-core benchmark.
+
+This module builds a source file holding several copies of the dataset, then loads
+it in a fresh process as a DatasetStore (every record in memory) and as a
+DatasetSummary (chunk by chunk), and reports the load time and peak resident
+memory of each process (Linux only). The peak memory of the summary should depend
+on the chunk size rather than on the number of records.
+
+Usage:
+    python -m api.benchmarks.out_of_core [--copies 20] [--chunk-size 100000]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from api.services.dataset_store import DATASET_PATH
+
+LOADER = """
+import json, resource, sys, time
+from api.services.cardio_service import CardioService
+from api.services.dataset_store import DatasetStore, DatasetSummary
+
+path, mode, chunk_size, cache_dir = sys.argv[1], sys.argv[2], int(sys.argv[3]), sys.argv[4]
+start = time.perf_counter()
+if mode == "summary":
+    store = DatasetSummary.load(path, chunk_size=chunk_size)
+else:
+    store = DatasetStore.load(path, cache_dir=cache_dir)
+CardioService(store).get_dataset_statistics()
+print(json.dumps({
+    "records": len(store),
+    "seconds": time.perf_counter() - start,
+    "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+}))
+"""
+
+
+def write_copies(path: str, copies: int) -> None:
+    """
+    Write a source file holding several copies of the dataset, with distinct ids.
+
+    Args:
+        path: Path of the file to write
+        copies: Number of copies of the dataset
+    """
+    with open(DATASET_PATH) as source:
+        header = source.readline()
+        rows = [line.split(";", 1)[1] for line in source]
+    with open(path, "w") as target:
+        target.write(header)
+        for copy in range(copies):
+            target.writelines(f"{copy * len(rows) + position};{row}" for position, row in enumerate(rows))
+
+
+def measure(path: str, mode: str, chunk_size: int, cache_dir: str) -> dict:
+    """
+    Load a source file in a fresh process.
+
+    Args:
+        path: Path of the source file
+        mode: "store" or "summary"
+        chunk_size: Number of source rows per chunk of the summary
+        cache_dir: Directory of the binary cache of the store
+
+    Returns:
+        Dict containing the number of records, load time and peak resident memory
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", LOADER, path, mode, str(chunk_size), cache_dir],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    """Run the benchmark and print the measures."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--copies", type=int, default=20, help="Number of copies of the dataset in the source file")
+    parser.add_argument("--chunk-size", type=int, default=100000, help="Number of source rows per chunk")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cardio_copies.csv")
+        write_copies(path, args.copies)
+        print(f"source: {os.path.getsize(path) / 1e6:.0f} MB, {args.copies} copies of the dataset")
+        for mode in ("store", "summary"):
+            result = measure(path, mode, args.chunk_size, os.path.join(directory, "cache"))
+            print(
+                f"{mode:<8} {result['records']} records in {result['seconds']:.2f} s, "
+                f"peak RSS {result['peak_rss'] / 1e6:.0f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Scatter chart benchmark.
+
+This module compares the vectorized scatter chart builders of CardioService with
+the previous implementation, which sampled the DataFrame for each chart and built
+the records with iterrows(). The charts of the whole population are memoized with
+the dataset store, so each run of the current builders reads a fresh snapshot of
+the store, whose memo is empty.
+
+Usage:
+    python -m api.benchmarks.scatter_charts
+"""
+
+import time
+from typing import Callable, Dict, List
+
+import pandas as pd
+
+from api.services.cardio_service import CardioService
+from api.services.dataset_store import DatasetStore, get_dataset_store
+
+
+def legacy_scatter_charts(data: pd.DataFrame) -> List[List[Dict[str, float]]]:
+    """
+    Build the records of the three scatter charts as the previous implementation did.
+
+    Args:
+        data: The preprocessed dataset
+
+    Returns:
+        List of the records of the blood pressure, BMI vs age and blood pressure correlation charts
+    """
+    charts = []
+    for columns in (
+        {'ap_hi': int, 'ap_lo': int, 'cardio': int, 'age': int, 'gender': int},
+        {'age': int, 'IMC': float, 'cardio': int},
+        {'ap_hi': int, 'ap_lo': int, 'cardio': int},
+    ):
+        sample_data = data.sample(n=min(5000, len(data)), random_state=42)
+        charts.append([
+            {name: cast(row[name]) for name, cast in columns.items()}
+            for _, row in sample_data.iterrows()
+        ])
+    return charts
+
+
+def fresh_snapshot(store: DatasetStore) -> DatasetStore:
+    """
+    Get a snapshot of the store sharing its columns and indexes, without memoized analyses.
+
+    Args:
+        store: The dataset store
+
+    Returns:
+        DatasetStore: A store of the same records whose analyses are computed on first use
+    """
+    return DatasetStore(
+        store.columns,
+        store.source,
+        store.version,
+        store.load_time,
+        from_cache=store.from_cache,
+        appended_records=store.appended_records,
+        cube=store.cube,
+        cells=store.cells,
+        index=store.index,
+        moments=store.moments,
+        sketches=store.sketches,
+        moment_cube=store.moment_cube,
+    )
+
+
+def best_time(run: Callable[[DatasetStore], object], store: DatasetStore, repeat: int = 5) -> float:
+    """
+    Time the fastest of several runs, each on a fresh snapshot of the store.
+
+    Args:
+        run: Function building the charts from a store
+        store: The dataset store
+        repeat: Number of runs
+
+    Returns:
+        float: Duration of the fastest run, in seconds
+    """
+    durations = []
+    for _ in range(repeat):
+        snapshot = fresh_snapshot(store)
+        start = time.perf_counter()
+        run(snapshot)
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def vectorized_scatter_charts(store: DatasetStore) -> List[List[Dict[str, float]]]:
+    """
+    Build the records of the three scatter charts with the current service.
+
+    Args:
+        store: The dataset store
+
+    Returns:
+        List of the records of the blood pressure, BMI vs age and blood pressure correlation charts
+    """
+    cardio_service = CardioService(store)
+    return [
+        cardio_service.get_blood_pressure_chart().data,
+        cardio_service.get_bmi_age_chart().data,
+        cardio_service.get_blood_pressure_correlation_chart().data,
+    ]
+
+
+def main() -> None:
+    """Run the benchmark and print the timings."""
+    store = get_dataset_store()
+    assert legacy_scatter_charts(store.data) == vectorized_scatter_charts(store)
+
+    legacy = best_time(lambda snapshot: legacy_scatter_charts(snapshot.data), store)
+    vectorized = best_time(vectorized_scatter_charts, store)
+
+    print(f"records: {len(store)}")
+    print(f"legacy (sample + iterrows, x3): {legacy * 1000:.1f} ms")
+    print(f"vectorized (shared sample):     {vectorized * 1000:.1f} ms")
+    print(f"speedup: {legacy / vectorized:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
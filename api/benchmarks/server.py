@@ -0,0 +1,60 @@
+"""
+Benchmark server.
+
+This module starts the API in a uvicorn subprocess for the benchmarks measuring it
+over HTTP.
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import httpx
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def api_server(env: Optional[Dict[str, str]] = None, timeout: float = 60) -> Iterator[subprocess.Popen]:
+    """
+    Run the API in a uvicorn subprocess until the block exits.
+
+    The block is entered once /health/ready reports the worker as ready.
+
+    Args:
+        env: Environment variables set for the server, on top of the current ones
+        timeout: Maximum number of seconds to wait for the server to be ready
+
+    Yields:
+        subprocess.Popen: The server process, whose base_url attribute is the URL of the API
+    """
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, **(env or {})},
+    )
+    server.base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + timeout
+        with httpx.Client(base_url=server.base_url) as client:
+            while True:
+                try:
+                    if client.get("/health/ready").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError("The API server did not become ready")
+                time.sleep(0.1)
+        yield server
+    finally:
+        server.terminate()
+        server.wait()
@@ -0,0 +1,54 @@
+"""
+Cohort dependency.
+
+This module defines the dependency parsing the cohort filters of the query string.
+"""
+
+from typing import Optional
+
+from fastapi import Query
+
+from api.models.cardio import CholesterolLevel, CohortFilter, Gender, GlucoseLevel
+
+
+def get_cohort(
+    gender: Optional[Gender] = Query(None, description="Gender of the patients (1=female, 2=male)"),
+    cholesterol: Optional[CholesterolLevel] = Query(None, description="Cholesterol level (1, 2 or 3)"),
+    gluc: Optional[GlucoseLevel] = Query(None, description="Glucose level (1, 2 or 3)"),
+    smoke: Optional[bool] = Query(None, description="Whether the patients smoke"),
+    alco: Optional[bool] = Query(None, description="Whether the patients drink alcohol"),
+    active: Optional[bool] = Query(None, description="Whether the patients are physically active"),
+    cardio: Optional[bool] = Query(None, description="Presence of cardiovascular disease"),
+    age_min: Optional[int] = Query(None, description="Minimum age in years (inclusive)"),
+    age_max: Optional[int] = Query(None, description="Maximum age in years (inclusive)"),
+    ap_hi_min: Optional[int] = Query(None, description="Minimum systolic blood pressure (inclusive)"),
+    ap_hi_max: Optional[int] = Query(None, description="Maximum systolic blood pressure (inclusive)"),
+    ap_lo_min: Optional[int] = Query(None, description="Minimum diastolic blood pressure (inclusive)"),
+    ap_lo_max: Optional[int] = Query(None, description="Maximum diastolic blood pressure (inclusive)"),
+    imc_min: Optional[float] = Query(None, description="Minimum BMI (inclusive)"),
+    imc_max: Optional[float] = Query(None, description="Maximum BMI (inclusive)"),
+) -> Optional[CohortFilter]:
+    """
+    Get the cohort selected by the query parameters.
+
+    Returns:
+        Optional[CohortFilter]: The cohort filter, or None when no filter is given.
+    """
+    cohort = CohortFilter(
+        gender=gender,
+        cholesterol=cholesterol,
+        gluc=gluc,
+        smoke=smoke,
+        alco=alco,
+        active=active,
+        cardio=cardio,
+        age_min=age_min,
+        age_max=age_max,
+        ap_hi_min=ap_hi_min,
+        ap_hi_max=ap_hi_max,
+        ap_lo_min=ap_lo_min,
+        ap_lo_max=ap_lo_max,
+        imc_min=imc_min,
+        imc_max=imc_max,
+    )
+    return cohort if cohort.model_dump(exclude_none=True) else None
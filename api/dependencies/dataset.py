@@ -0,0 +1,39 @@
+"""
+Dataset dependency.
+
+This module defines the dependency resolving the dataset selected by the query string.
+"""
+
+from typing import Optional, Union
+
+from fastapi import HTTPException, Query, Request
+
+from api.services.dataset_registry import UnknownDatasetError, registry
+from api.services.dataset_store import DatasetStore, DatasetSummary
+from api.utils.executors import ANALYTICS, run_in_pool
+
+
+async def get_dataset(
+    request: Request,
+    dataset: Optional[str] = Query(None, description="Name of the registered dataset, the default one if not given"),
+) -> Union[DatasetStore, DatasetSummary]:
+    """
+    Get the store of the dataset selected by the query parameters.
+
+    The store already resolved by the versioned route to tag the response is
+    reused, so that a request is counted once by the registry. Other datasets
+    are resolved in the analytics pool, as they may be loaded on first use.
+
+    Returns:
+        Union[DatasetStore, DatasetSummary]: The store of the selected dataset.
+
+    Raises:
+        HTTPException: If no registered dataset has the requested name
+    """
+    store = getattr(request.state, "dataset_store", None)
+    if store is not None:
+        return store
+    try:
+        return await run_in_pool(ANALYTICS, registry.get, dataset)
+    except UnknownDatasetError as e:
+        raise HTTPException(status_code=404, detail=str(e))
@@ -4,18 +4,76 @@ Main application module.
 This module initializes the FastAPI application and includes all routers.
 """
 
+import asyncio
+import logging
 import os
+from contextlib import asynccontextmanager, suppress
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+
+from api.routers import cardio, health, prediction, root
+from api.services.dataset_reloader import reloader
+from api.services.dataset_store import RecordsUnavailableError, get_dataset_store
+from api.services.prediction_service import PredictionService
+from api.services.warmup import Warmup
+from api.utils.executors import shutdown_executors
+
+logger = logging.getLogger(__name__)
+
+
+async def load_prediction_service(app: FastAPI) -> None:
+    """
+    Load the prediction model into the application state.
+
+    Args:
+        app: The FastAPI application
+    """
+    try:
+        app.state.prediction_service = await asyncio.to_thread(PredictionService)
+    except RuntimeError as e:
+        app.state.prediction_error = str(e)
+        logger.exception("Failed to load the prediction model")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Load the shared resources of the worker and warm its caches.
+
+    The dataset is loaded before the worker starts serving requests. The analytics
+    artifacts and the prediction model are then loaded in the background, and
+    /health/ready reports the worker as ready once they are. With
+    DATASET_RELOAD_INTERVAL, the dataset source file is then watched and reloaded
+    in the background when it changes (see api.services.dataset_reloader).
+
+    Args:
+        app: The FastAPI application
+    """
+    app.state.warmup = Warmup(get_dataset_store())
+    app.state.prediction_service = None
+    app.state.prediction_error = None
+
+    preload = asyncio.gather(asyncio.to_thread(app.state.warmup.run), load_prediction_service(app))
+    if reloader.interval > 0:
+        reloader.start(on_reload=lambda warmup: setattr(app.state, "warmup", warmup))
+    yield
+
+    reloader.stop()
+    preload.cancel()
+    with suppress(asyncio.CancelledError):
+        await preload
+    app.state.prediction_service = None
+    shutdown_executors()
 
-from api.routers import cardio, prediction, root
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Heart-AI API",
     description="API for Heart-AI application",
     debug=os.getenv("DEBUG", "False").lower() in ("true", "1", "t"),
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -27,7 +85,24 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+
+@app.exception_handler(RecordsUnavailableError)
+async def records_unavailable_handler(request: Request, exc: RecordsUnavailableError) -> JSONResponse:
+    """
+    Answer the requests needing the dataset records in out-of-core mode.
+
+    Args:
+        request: The request
+        exc: The error raised by the analysis
+
+    Returns:
+        JSONResponse: A 501 response describing the error
+    """
+    return JSONResponse(status_code=501, content={"detail": str(exc)})
+
+
 # Include routers
 app.include_router(root.router)
 app.include_router(cardio.router)
 app.include_router(prediction.router)
+app.include_router(health.router)
@@ -30,9 +30,28 @@ class GlucoseLevel(int, Enum):
     WELL_ABOVE_NORMAL = 3
 
 
+class ScatterMode(str, Enum):
+    """Scatter chart mode enumeration."""
+    POINTS = "points"
+    DENSITY = "density"
+
+
+class Layout(str, Enum):
+    """Layout of the records of a response."""
+    ROWS = "rows"
+    COLUMNAR = "columnar"
+
+
+class ExportFormat(str, Enum):
+    """Dataset export format enumeration."""
+    NDJSON = "ndjson"
+    CSV = "csv"
+    BINARY = "binary"
+
+
 class PatientData(BaseModel):
     """Patient data model."""
-    age: int = Field(..., description="Age of the patient in years")
+    age: int = Field(..., ge=0, le=120, description="Age of the patient in years")
     gender: Gender = Field(..., description="Gender of the patient")
     height: float = Field(..., description="Height of the patient in cm")
     weight: float = Field(..., description="Weight of the patient in kg")
@@ -46,6 +65,39 @@ class PatientData(BaseModel):
     cardio: Optional[bool] = Field(None, description="Presence of cardiovascular disease")
 
 
+class LabeledPatientData(PatientData):
+    """Patient data model with a known cardiovascular disease status, as appended to the dataset."""
+    cardio: bool = Field(..., description="Presence of cardiovascular disease")
+
+
+class RecordsAppended(BaseModel):
+    """Result of appending records to the dataset."""
+    received: int = Field(..., description="Number of records received")
+    appended: int = Field(..., description="Number of records appended to the dataset")
+    rejected: int = Field(..., description="Number of records filtered out as outliers by the preprocessing")
+    total_records: int = Field(..., description="Number of records of the dataset after the append")
+    dataset_version: str = Field(..., description="Version of the dataset holding the appended records")
+
+
+class CohortFilter(BaseModel):
+    """Cohort filter model selecting the records matching every given criterion."""
+    gender: Optional[Gender] = Field(None, description="Gender of the patients")
+    cholesterol: Optional[CholesterolLevel] = Field(None, description="Cholesterol level")
+    gluc: Optional[GlucoseLevel] = Field(None, description="Glucose level")
+    smoke: Optional[bool] = Field(None, description="Whether the patients smoke")
+    alco: Optional[bool] = Field(None, description="Whether the patients drink alcohol")
+    active: Optional[bool] = Field(None, description="Whether the patients are physically active")
+    cardio: Optional[bool] = Field(None, description="Presence of cardiovascular disease")
+    age_min: Optional[int] = Field(None, description="Minimum age in years (inclusive)")
+    age_max: Optional[int] = Field(None, description="Maximum age in years (inclusive)")
+    ap_hi_min: Optional[int] = Field(None, description="Minimum systolic blood pressure (inclusive)")
+    ap_hi_max: Optional[int] = Field(None, description="Maximum systolic blood pressure (inclusive)")
+    ap_lo_min: Optional[int] = Field(None, description="Minimum diastolic blood pressure (inclusive)")
+    ap_lo_max: Optional[int] = Field(None, description="Maximum diastolic blood pressure (inclusive)")
+    imc_min: Optional[float] = Field(None, description="Minimum BMI (inclusive)")
+    imc_max: Optional[float] = Field(None, description="Maximum BMI (inclusive)")
+
+
 class DatasetStatistics(BaseModel):
     """Dataset statistics model."""
     total_records: int = Field(..., description="Total number of records in the dataset")
@@ -56,6 +108,9 @@ class DatasetStatistics(BaseModel):
     blood_pressure_range: Dict[str, Dict[str, float]] = Field(
         ..., description="Min, max, mean, and median blood pressure (systolic and diastolic)"
     )
+    quantiles: Optional[Dict[str, Dict[str, float]]] = Field(
+        None, description="Requested quantiles of age, IMC, ap_hi and ap_lo, keyed by column then by fraction"
+    )
 
 
 class ChartData(BaseModel):
@@ -68,9 +123,21 @@ class ChartData(BaseModel):
     data: List[Dict[str, Union[str, int, float, bool]]] = Field(..., description="Chart data")
 
 
+class ColumnarChartData(BaseModel):
+    """Chart data model with the records laid out as one list of values per column."""
+    chart_type: str = Field(..., description="Type of chart (histogram, scatter, box, etc.)")
+    title: str = Field(..., description="Chart title")
+    description: str = Field(..., description="Chart description")
+    x_label: str = Field(..., description="X-axis label")
+    y_label: Optional[str] = Field(None, description="Y-axis label")
+    columns: Dict[str, List[Union[int, float]]] = Field(..., description="Chart data, one list of values per column")
+
+
 class CorrelationAnalysis(BaseModel):
     """Correlation analysis model."""
-    correlation_matrix: List[List[float]] = Field(..., description="Correlation matrix")
+    correlation_matrix: List[List[Optional[float]]] = Field(
+        ..., description="Correlation matrix, null where a column is constant"
+    )
     feature_names: List[str] = Field(..., description="Feature names")
     top_correlations: List[Dict[str, Union[str, float]]] = Field(
         ..., description="Top correlations with cardiovascular disease"
@@ -81,3 +148,21 @@ class Dataset(BaseModel):
     """Dataset model containing all patient records."""
     data: List[Dict[str, Union[str, int, float, bool]]] = Field(..., description="List of patient records")
     total_records: int = Field(..., description="Total number of records in the dataset")
+    next_cursor: Optional[str] = Field(None, description="Cursor of the next page, None on the last page")
+
+
+class ColumnarDataset(BaseModel):
+    """Dataset model with the patient records laid out as one list of values per column."""
+    columns: Dict[str, List[Union[int, float]]] = Field(..., description="Patient records, one list of values per column")
+    total_records: int = Field(..., description="Total number of records in the dataset")
+    next_cursor: Optional[str] = Field(None, description="Cursor of the next page, None on the last page")
+
+
+class Aggregation(BaseModel):
+    """Group-by aggregation model."""
+    group_by: List[str] = Field(..., description="Grouping columns")
+    metrics: List[str] = Field(..., description="Metrics computed for each group, e.g. mean(ap_hi)")
+    total_records: int = Field(..., description="Number of records matching the conditions")
+    data: List[Dict[str, Union[int, float]]] = Field(
+        ..., description="One record per non-empty group, with the grouping values and the metrics"
+    )
@@ -0,0 +1,74 @@
+"""
+Health models.
+
+This module defines the Pydantic models describing the state of the API workers.
+"""
+
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class DatasetInfo(BaseModel):
+    """Dataset store information model."""
+    source: str = Field(..., description="Path of the file the dataset was loaded from")
+    version: str = Field(..., description="Identifier of the dataset content and preprocessing version")
+    from_cache: bool = Field(..., description="Whether the dataset was read from the binary cache")
+    out_of_core: bool = Field(
+        False, description="Whether the dataset is summarized chunk by chunk instead of held in memory"
+    )
+    total_records: int = Field(..., description="Number of records held by the store")
+    appended_records: int = Field(
+        0, description="Number of records appended to the dataset file, read from its journal"
+    )
+    columns: List[str] = Field(..., description="Columns held by the store")
+    dtypes: Dict[str, str] = Field(..., description="Storage dtype of each column")
+    load_time: float = Field(..., description="Time spent loading the dataset, in seconds")
+    loaded_at: float = Field(..., description="Unix timestamp at which the dataset was loaded")
+    memory_bytes: int = Field(..., description="Memory held by the dataset columns, in bytes")
+    footprint_bytes: int = Field(
+        ..., description="Memory held by the dataset columns and the structures derived from them, in bytes"
+    )
+    original_memory_bytes: int = Field(
+        ..., description="Memory the columns would hold with their original int64/float64 dtypes, in bytes"
+    )
+    memory_mapped: bool = Field(
+        ..., description="Whether the columns are memory-mapped and shared with the other workers"
+    )
+    load_count: int = Field(..., description="Number of times the dataset was loaded by this worker")
+    pid: int = Field(..., description="Process id of the worker serving the request")
+
+
+class Readiness(BaseModel):
+    """Worker readiness model."""
+    ready: bool = Field(..., description="Whether the worker is ready to serve traffic")
+    dataset_version: Optional[str] = Field(None, description="Version of the dataset the artifacts were computed from")
+    artifacts_warm: bool = Field(..., description="Whether every analytics artifact was computed")
+    artifacts: Dict[str, float] = Field(
+        default_factory=dict, description="Time spent computing each analytics artifact, in seconds"
+    )
+    warmup_time: Optional[float] = Field(None, description="Time spent computing the analytics artifacts, in seconds")
+    prediction_model_loaded: bool = Field(..., description="Whether the prediction model was loaded")
+    errors: List[str] = Field(default_factory=list, description="Errors that prevent the worker from being ready")
+
+
+class Metrics(BaseModel):
+    """Worker metrics model."""
+    single_flight: Dict[str, int] = Field(
+        ..., description="Response computations executed, coalesced with an identical one in flight, and in flight"
+    )
+    response_cache: Dict[str, int] = Field(
+        ..., description="Entries, size, budget, hits, misses and evictions of the response cache"
+    )
+    aggregate_cache: Dict[str, int] = Field(
+        ..., description="Entries, size, budget, hits, misses and evictions of the aggregation result cache"
+    )
+    dataset_registry: Dict[str, int] = Field(
+        ..., description="Resident datasets, their size, budget, hits, misses, evictions and loads of the registry"
+    )
+    dataset_reloader: Dict[str, int] = Field(
+        ..., description="Checks of the dataset source file, reloads and failed reloads"
+    )
+    executors: Dict[str, Dict[str, int]] = Field(
+        ..., description="Number of threads and of calls running or waiting in each workload pool"
+    )
@@ -4,220 +4,511 @@ Cardiovascular disease analysis router.
 This module defines the routes for cardiovascular disease analysis.
 """
 
-from typing import List
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional, Union
 
-from fastapi import APIRouter, Depends
+import pandas as pd
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
-from api.models.cardio import ChartData, CorrelationAnalysis, Dataset, DatasetStatistics
-from api.services.cardio_service import CardioService
+from api.dependencies.cohort import get_cohort
+from api.dependencies.dataset import get_dataset
+from api.models.cardio import (
+    Aggregation, ChartData, CohortFilter, ColumnarChartData, ColumnarDataset, CorrelationAnalysis, Dataset, DatasetStatistics,
+    ExportFormat, LabeledPatientData, Layout, RecordsAppended, ScatterMode
+)
+from api.services.aggregation import AggregationEngine
+from api.services.cardio_service import (
+    DEFAULT_DENSITY_BINS, DEFAULT_EXPORT_CHUNK_SIZE, CardioService, StaleCursorError
+)
+from api.services.dataset_registry import registry
+from api.services.dataset_store import DatasetStore, append_records
+from api.services.quantile_sketch import parse_quantiles
+from api.utils import binary_columns
+from api.utils.executors import ANALYTICS, EXPORT, run_in_pool
+from api.utils.http_cache import VersionedRoute
+from api.utils.json_encoding import encode_json
+from api.utils.negotiation import parse_preferences
+
+# Maximum number of records per page of the dataset
+MAX_PAGE_SIZE = 10000
+
+# Maximum number of records appended per request
+MAX_APPEND_RECORDS = 10000
+
+# Media type and file extension of each export format
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.NDJSON: ("application/x-ndjson", "ndjson"),
+    ExportFormat.CSV: ("text/csv; charset=utf-8", "csv"),
+    ExportFormat.BINARY: (binary_columns.MEDIA_TYPE, "bin"),
+}
+
+# Export format of each media type accepted in the Accept header
+EXPORT_FORMATS = {
+    media_type.split(";")[0]: export_format for export_format, (media_type, _) in EXPORT_MEDIA_TYPES.items()
+}
 
 router = APIRouter(
     prefix="/cardio",
     tags=["cardio"],
     responses={404: {"description": "Not found"}},
+    route_class=VersionedRoute,
 )
 
 
-def get_cardio_service() -> CardioService:
+def get_cardio_service(store: DatasetStore = Depends(get_dataset)) -> CardioService:
     """
     Get the cardiovascular disease analysis service.
 
+    Args:
+        store: The store of the selected dataset
+
+    Returns:
+        CardioService: The cardiovascular disease analysis service.
+    """
+    return CardioService(store)
+
+
+async def get_cohort_service(
+    store: DatasetStore = Depends(get_dataset),
+    cohort: Optional[CohortFilter] = Depends(get_cohort),
+) -> CardioService:
+    """
+    Get the cardiovascular disease analysis service restricted to a cohort.
+
+    The cohort is selected by the query parameters of the request (see get_cohort),
+    and covers the whole population when no filter is given. Its records are
+    selected in the analytics pool, off the event loop.
+
+    Args:
+        store: The store of the selected dataset
+        cohort: The cohort filter
+
     Returns:
         CardioService: The cardiovascular disease analysis service.
+
+    Raises:
+        HTTPException: If no record matches the cohort filters
+    """
+    if cohort is None:
+        return CardioService(store)
+    cardio_service = await run_in_pool(ANALYTICS, CardioService, store, cohort)
+    if int(cardio_service.cube.counts.sum()) == 0:
+        raise HTTPException(status_code=404, detail="No records match the cohort filters")
+    return cardio_service
+
+
+def get_aggregation_engine(store: DatasetStore = Depends(get_dataset)) -> AggregationEngine:
     """
-    return CardioService()
+    Get the aggregation engine.
+
+    Args:
+        store: The store of the selected dataset
+
+    Returns:
+        AggregationEngine: The aggregation engine.
+    """
+    return AggregationEngine(store)
 
 
 @router.get("/statistics", response_model=DatasetStatistics)
 async def get_dataset_statistics(
+    quantiles: Optional[str] = Query(None, description="Comma-separated fractions, e.g. 0.05,0.5,0.95"),
+    exact: bool = Query(False, description="Compute exact medians and quantiles instead of reading the sketches"),
     cardio_service: CardioService = Depends(get_cardio_service),
-) -> DatasetStatistics:
+) -> Response:
     """
     Get dataset statistics.
 
+    The medians, and the quantiles of age, IMC, ap_hi and ap_lo requested with
+    quantiles, are read from quantile sketches maintained as the dataset is loaded
+    and records are appended: the rank of each value is within about 1% of the
+    number of records of the requested one. With exact=true, they are computed
+    from every record.
+
     Returns:
         DatasetStatistics: Dataset statistics.
     """
-    return cardio_service.get_dataset_statistics()
+    try:
+        fractions = parse_quantiles(quantiles)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await _encoded(cardio_service.get_dataset_statistics, quantiles=fractions, exact=exact)
 
 
 @router.get("/charts", response_model=List[ChartData])
 async def get_all_charts(
-    cardio_service: CardioService = Depends(get_cardio_service),
-) -> List[ChartData]:
+    cardio_service: CardioService = Depends(get_cohort_service),
+) -> Response:
     """
     Get all chart data.
 
     Returns:
         List[ChartData]: List of all chart data.
     """
-    return cardio_service.get_all_charts()
+    return await _encoded(cardio_service.get_all_charts)
 
 
 @router.get("/charts/age", response_model=ChartData)
 async def get_age_distribution_chart(
-    cardio_service: CardioService = Depends(get_cardio_service),
-) -> ChartData:
+    cardio_service: CardioService = Depends(get_cohort_service),
+) -> Response:
     """
     Get age distribution chart data.
 
     Returns:
         ChartData: Age distribution chart data.
     """
-    return cardio_service.get_age_distribution_chart()
+    return await _encoded(cardio_service.get_age_distribution_chart)
 
 
 @router.get("/charts/gender", response_model=ChartData)
 async def get_gender_distribution_chart(
-    cardio_service: CardioService = Depends(get_cardio_service),
-) -> ChartData:
+    cardio_service: CardioService = Depends(get_cohort_service),
+) -> Response:
     """
     Get gender distribution chart data.
 
     Returns:
         ChartData: Gender distribution chart data.
     """
-    return cardio_service.get_gender_distribution_chart()
+    return await _encoded(cardio_service.get_gender_distribution_chart)
 
 
-@router.get("/charts/blood-pressure", response_model=ChartData)
+@router.get("/charts/blood-pressure", response_model=Union[ChartData, ColumnarChartData])
 async def get_blood_pressure_chart(
-    cardio_service: CardioService = Depends(get_cardio_service),
-) -> ChartData:
+    mode: ScatterMode = Query(ScatterMode.POINTS, description="Sampled points or density grid over every record"),
+    bins: int = Query(DEFAULT_DENSITY_BINS, ge=2, le=200, description="Number of cells per axis in density mode"),
+    layout: Layout = Query(Layout.ROWS, description="One record per row, or one list of values per column"),
+    cardio_service: CardioService = Depends(get_cohort_service),
+) -> Response:
     """
     Get blood pressure chart data.
 
+    In density mode, the chart counts every record on a bins x bins grid, split by
+    cardiovascular disease, instead of listing a sample of points. In the columnar
+    layout, the chart data is returned as one list of values per column.
+
     Returns:
         ChartData: Blood pressure chart data.
     """
-    return cardio_service.get_blood_pressure_chart()
+    if mode == ScatterMode.DENSITY:
+        return await _encoded(cardio_service.get_blood_pressure_density_chart, bins, layout)
+    return await _encoded(cardio_service.get_blood_pressure_chart, layout)
 
 
-@router.get("/charts/blood-pressure-correlation", response_model=ChartData)
+@router.get("/charts/blood-pressure-correlation", response_model=Union[ChartData, ColumnarChartData])
 async def get_blood_pressure_correlation_chart(
-    cardio_service: CardioService = Depends(get_cardio_service),
-) -> ChartData:
+    mode: ScatterMode = Query(ScatterMode.POINTS, description="Sampled points or density grid over every record"),
+    bins: int = Query(DEFAULT_DENSITY_BINS, ge=2, le=200, description="Number of cells per axis in density mode"),
+    layout: Layout = Query(Layout.ROWS, description="One record per row, or one list of values per column"),
+    cardio_service: CardioService = Depends(get_cohort_service),
+) -> Response:
     """
     Get blood pressure correlation chart data.
 
+    In density mode, the chart counts every record on a bins x bins grid, split by
+    cardiovascular disease, instead of listing a sample of points. In the columnar
+    layout, the chart data is returned as one list of values per column.
+
     Returns:
         ChartData: Blood pressure correlation chart data.
     """
-    return cardio_service.get_blood_pressure_correlation_chart()
+    if mode == ScatterMode.DENSITY:
+        return await _encoded(cardio_service.get_blood_pressure_correlation_density_chart, bins, layout)
+    return await _encoded(cardio_service.get_blood_pressure_correlation_chart, layout)
 
 
-@router.get("/charts/bmi-age", response_model=ChartData)
+@router.get("/charts/bmi-age", response_model=Union[ChartData, ColumnarChartData])
 async def get_bmi_age_chart(
-    cardio_service: CardioService = Depends(get_cardio_service),
-) -> ChartData:
+    mode: ScatterMode = Query(ScatterMode.POINTS, description="Sampled points or density grid over every record"),
+    bins: int = Query(DEFAULT_DENSITY_BINS, ge=2, le=200, description="Number of cells per axis in density mode"),
+    layout: Layout = Query(Layout.ROWS, description="One record per row, or one list of values per column"),
+    cardio_service: CardioService = Depends(get_cohort_service),
+) -> Response:
     """
     Get BMI vs age chart data.
 
+    In density mode, the chart counts every record on a bins x bins grid, split by
+    cardiovascular disease, instead of listing a sample of points. In the columnar
+    layout, the chart data is returned as one list of values per column.
+
     Returns:
         ChartData: BMI vs age chart data.
     """
-    return cardio_service.get_bmi_age_chart()
+    if mode == ScatterMode.DENSITY:
+        return await _encoded(cardio_service.get_bmi_age_density_chart, bins, layout)
+    return await _encoded(cardio_service.get_bmi_age_chart, layout)
 
 
 @router.get("/charts/cholesterol", response_model=ChartData)
 async def get_cholesterol_chart(
-    cardio_service: CardioService = Depends(get_cardio_service),
-) -> ChartData:
+    cardio_service: CardioService = Depends(get_cohort_service),
+) -> Response:
     """
     Get cholesterol chart data.
 
     Returns:
         ChartData: Cholesterol chart data.
     """
-    return cardio_service.get_cholesterol_chart()
+    return await _encoded(cardio_service.get_cholesterol_chart)
 
 
 @router.get("/charts/glucose", response_model=ChartData)
 async def get_glucose_chart(
-    cardio_service: CardioService = Depends(get_cardio_service),
-) -> ChartData:
+    cardio_service: CardioService = Depends(get_cohort_service),
+) -> Response:
     """
     Get glucose chart data.
 
     Returns:
         ChartData: Glucose chart data.
     """
-    return cardio_service.get_glucose_chart()
+    return await _encoded(cardio_service.get_glucose_chart)
 
 
 @router.get("/charts/physical-activity", response_model=ChartData)
 async def get_physical_activity_chart(
-    cardio_service: CardioService = Depends(get_cardio_service),
-) -> ChartData:
+    cardio_service: CardioService = Depends(get_cohort_service),
+) -> Response:
     """
     Get physical activity chart data.
 
     Returns:
         ChartData: Physical activity chart data.
     """
-    return cardio_service.get_physical_activity_chart()
+    return await _encoded(cardio_service.get_physical_activity_chart)
 
 
 @router.get("/charts/smoking", response_model=ChartData)
 async def get_smoking_chart(
-    cardio_service: CardioService = Depends(get_cardio_service),
-) -> ChartData:
+    cardio_service: CardioService = Depends(get_cohort_service),
+) -> Response:
     """
     Get smoking chart data.
 
     Returns:
         ChartData: Smoking chart data.
     """
-    return cardio_service.get_smoking_chart()
+    return await _encoded(cardio_service.get_smoking_chart)
 
 
 @router.get("/charts/alcohol", response_model=ChartData)
 async def get_alcohol_chart(
-    cardio_service: CardioService = Depends(get_cardio_service),
-) -> ChartData:
+    cardio_service: CardioService = Depends(get_cohort_service),
+) -> Response:
     """
     Get alcohol consumption chart data.
 
     Returns:
         ChartData: Alcohol consumption chart data.
     """
-    return cardio_service.get_alcohol_chart()
+    return await _encoded(cardio_service.get_alcohol_chart)
 
 
 @router.get("/correlation", response_model=CorrelationAnalysis)
 async def get_correlation_analysis(
-    cardio_service: CardioService = Depends(get_cardio_service),
-) -> CorrelationAnalysis:
+    cardio_service: CardioService = Depends(get_cohort_service),
+) -> Response:
     """
     Get correlation analysis.
 
+    The correlations of a cohort selected by gender, cholesterol, gluc, smoke,
+    alco, active, cardio and age are computed from the sums and cross-products of
+    the cells of the count cube it covers, without reading its records.
+
     Returns:
         CorrelationAnalysis: Correlation analysis.
     """
-    return cardio_service.get_correlation_analysis()
+    return await _encoded(cardio_service.get_correlation_analysis)
 
 
 @router.get("/charts/risk-factors-radar", response_model=ChartData)
 async def get_risk_factors_radar_chart(
-    cardio_service: CardioService = Depends(get_cardio_service),
-) -> ChartData:
+    cardio_service: CardioService = Depends(get_cohort_service),
+) -> Response:
     """
     Get risk factors radar chart data.
 
     Returns:
         ChartData: Risk factors radar chart data.
     """
-    return cardio_service.get_risk_factors_radar_chart()
+    return await _encoded(cardio_service.get_risk_factors_radar_chart)
+
+
+@router.get("/aggregate", response_model=Aggregation)
+async def aggregate(
+    group_by: Optional[str] = Query(None, description="Comma-separated grouping columns, e.g. gender,cholesterol"),
+    metrics: Optional[str] = Query(
+        None, description="Comma-separated metrics among count, sum(c), mean(c), std(c) and rate(c), count by default"
+    ),
+    where: Optional[str] = Query(None, description="Comma-separated conditions, e.g. gender=1,age>=50,ap_hi<=140"),
+    engine: AggregationEngine = Depends(get_aggregation_engine),
+) -> Response:
+    """
+    Aggregate the records by any combination of integer columns.
+
+    Each non-empty group is returned with its grouping values and metrics, e.g.
+    group_by=gender,cholesterol&metrics=count,mean(ap_hi),rate(cardio). The
+    conditions of where select the records before they are grouped.
+
+    Returns:
+        Aggregation: The metrics of each group.
+    """
+    try:
+        return await _encoded(engine.aggregate, _split_fields(group_by), metrics, where)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get("/dataset", response_model=Dataset)
+@router.get("/dataset", response_model=Union[Dataset, ColumnarDataset])
 async def get_complete_dataset(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of records per page"),
+    cursor: Optional[str] = Query(None, description="Cursor returned as next_cursor by the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to include, e.g. age,ap_hi"),
+    layout: Layout = Query(Layout.ROWS, description="One record per row, or one list of values per column"),
     cardio_service: CardioService = Depends(get_cardio_service),
-) -> Dataset:
+) -> Response:
     """
     Get the complete dataset with all patient records.
 
+    With limit, the records are returned one page at a time: pass the next_cursor of
+    a page as the cursor of the next request until it is null. In the columnar
+    layout, the records are returned as one list of values per column.
+
     Returns:
         Dataset: The complete dataset with all patient records.
     """
-    return cardio_service.get_complete_dataset()
+    try:
+        return await _encoded(
+            cardio_service.get_complete_dataset,
+            limit=limit,
+            cursor=cursor,
+            fields=_split_fields(fields),
+            layout=layout,
+        )
+    except StaleCursorError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/dataset/export", response_class=StreamingResponse)
+async def export_dataset(
+    request: Request,
+    format: Optional[ExportFormat] = Query(None, description="Export format, negotiated from Accept if not given"),
+    chunk_size: int = Query(DEFAULT_EXPORT_CHUNK_SIZE, ge=100, le=50000, description="Number of records per chunk"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to include, e.g. age,ap_hi"),
+    accept: Optional[str] = Header(None),
+    cardio_service: CardioService = Depends(get_cardio_service),
+) -> StreamingResponse:
+    """
+    Export the complete dataset as NDJSON, CSV or binary columns.
+
+    The records are encoded and sent one chunk at a time, so the memory used by the
+    export does not grow with the number of records, and the export stops as soon
+    as the client disconnects. Without a format parameter, the format is the one of
+    the Accept header media types (application/x-ndjson, text/csv or
+    application/octet-stream) the client prefers, NDJSON by default. The binary
+    format can be loaded with api.utils.binary_columns.read_columns.
+
+    Returns:
+        StreamingResponse: The records, one per line, or the binary column document.
+    """
+    if format is None:
+        format = _format_from_accept(accept)
+    try:
+        chunks = cardio_service.export_dataset(format, chunk_size, _split_fields(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    media_type, extension = EXPORT_MEDIA_TYPES[format]
+    return StreamingResponse(
+        _until_disconnected(request, chunks),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="cardio_dataset.{extension}"'},
+    )
+
+
+@router.post("/records", response_model=RecordsAppended)
+async def add_records(
+    records: List[LabeledPatientData] = Body(..., max_length=MAX_APPEND_RECORDS),
+    dataset: Optional[str] = Query(None, description="Name of the dataset, only the default one accepts records"),
+) -> RecordsAppended:
+    """
+    Append patient records to the dataset.
+
+    The records go through the preprocessing of the dataset file: the BMI is derived
+    from the height and weight, and records with outlier blood pressures or BMI are
+    rejected. The count cube, moments and indexes of the dataset are updated with
+    the appended records only, so the statistics, charts and correlation analysis
+    reflect them without recomputing them from every record. The records are also
+    written to the journal of the dataset file (see DATASET_JOURNAL_DIR), which is
+    read after the file by every load, so they survive restarts; with several
+    workers, the other workers serve them once they reload the dataset (see
+    DATASET_RELOAD_INTERVAL). Registered datasets are read-only files that may be
+    evicted from memory, so records are only appended to the default dataset. A
+    body of more than MAX_APPEND_RECORDS records is rejected with a 422 response
+    before the records beyond the limit are validated.
+
+    Returns:
+        RecordsAppended: Number of records appended and new version of the dataset.
+    """
+    if not registry.is_default(dataset):
+        raise HTTPException(
+            status_code=400, detail=f"Records can only be appended to the default dataset {registry.default!r}"
+        )
+    data = pd.DataFrame(
+        [record.model_dump(mode="json") for record in records],
+        columns=list(LabeledPatientData.model_fields),
+    )
+    store, appended = await run_in_pool(ANALYTICS, append_records, data)
+    return RecordsAppended(
+        received=len(records),
+        appended=appended,
+        rejected=len(records) - appended,
+        total_records=len(store),
+        dataset_version=store.version,
+    )
+
+
+async def _encoded(analysis: Callable[..., Any], *args: Any, **kwargs: Any) -> Response:
+    """
+    Run an analysis and encode its result in the analytics pool.
+
+    Both the computation and the JSON encoding of the result happen off the event
+    loop, and the encoding holds the GIL for short slices only (see
+    api.utils.json_encoding); the response is encoded as FastAPI would encode it
+    with the route response_model.
+
+    Args:
+        analysis: CardioService method returning a model or a list of models
+        args: Positional arguments of the method
+        kwargs: Keyword arguments of the method
+
+    Returns:
+        Response: The JSON response
+    """
+    def encode() -> Response:
+        return Response(content=encode_json(analysis(*args, **kwargs)), media_type="application/json")
+
+    return await run_in_pool(ANALYTICS, encode)
+
+
+def _format_from_accept(accept: Optional[str]) -> ExportFormat:
+    for media_type, quality in parse_preferences(accept):
+        if quality > 0 and media_type in EXPORT_FORMATS:
+            return EXPORT_FORMATS[media_type]
+    return ExportFormat.NDJSON
+
+
+def _split_fields(fields: Optional[str]) -> Optional[List[str]]:
+    return [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+
+
+async def _until_disconnected(request: Request, chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    # Chunks are encoded in the export pool, one at a time
+    while not await request.is_disconnected():
+        chunk = await run_in_pool(EXPORT, next, chunks, None)
+        if chunk is None:
+            break
+        yield chunk
@@ -0,0 +1,88 @@
+"""
+Health router.
+
+This module defines the routes exposing the state of the API workers.
+"""
+
+from fastapi import APIRouter, Depends, Request, Response
+
+from api.dependencies.dataset import get_dataset
+from api.models.health import DatasetInfo, Metrics, Readiness
+from api.services.aggregation import aggregate_cache
+from api.services.dataset_registry import registry
+from api.services.dataset_reloader import reloader
+from api.services.dataset_store import DatasetStore
+from api.utils.executors import executor_stats
+from api.utils.http_cache import flights, response_cache
+
+router = APIRouter(
+    prefix="/health",
+    tags=["health"],
+)
+
+
+@router.get("/dataset", response_model=DatasetInfo)
+async def get_dataset_info(
+    store: DatasetStore = Depends(get_dataset),
+) -> DatasetInfo:
+    """
+    Get information about the dataset store of the worker.
+
+    A registered dataset is selected with the dataset query parameter, and loaded
+    if it is not resident.
+
+    Returns:
+        DatasetInfo: Load time, size and memory footprint of the dataset store.
+    """
+    return DatasetInfo(**store.info())
+
+
+@router.get("/ready", response_model=Readiness, responses={503: {"model": Readiness}})
+async def get_readiness(request: Request, response: Response) -> Readiness:
+    """
+    Report whether the worker is ready to serve traffic.
+
+    The worker is ready once the analytics artifacts are computed and the prediction
+    model is loaded (see api.main.lifespan); until then the response status is 503.
+
+    Returns:
+        Readiness: Readiness of the worker and time spent warming it up.
+    """
+    state = request.app.state
+    warmup = getattr(state, "warmup", None)
+    prediction_loaded = getattr(state, "prediction_service", None) is not None
+
+    errors = [error for error in (
+        warmup.error if warmup is not None else "The worker was started without warming up",
+        getattr(state, "prediction_error", None),
+    ) if error]
+    readiness = Readiness(
+        ready=warmup is not None and warmup.ready and prediction_loaded,
+        dataset_version=warmup.store.version if warmup is not None else None,
+        artifacts_warm=warmup is not None and warmup.ready,
+        artifacts=warmup.durations if warmup is not None else {},
+        warmup_time=warmup.elapsed if warmup is not None else None,
+        prediction_model_loaded=prediction_loaded,
+        errors=errors,
+    )
+    if not readiness.ready:
+        response.status_code = 503
+    return readiness
+
+
+@router.get("/metrics", response_model=Metrics)
+async def get_metrics() -> Metrics:
+    """
+    Get the caching and concurrency counters of the worker.
+
+    Returns:
+        Metrics: Single-flight, cache, dataset residency, reload and workload pool counters.
+    """
+    return Metrics(
+        single_flight=flights.stats(),
+        response_cache=response_cache.stats(),
+        aggregate_cache=aggregate_cache.stats(),
+        dataset_registry=registry.stats(),
+        dataset_reloader=reloader.stats(),
+        executors=executor_stats(),
+    )
@@ -4,9 +4,10 @@ Cardiovascular disease prediction router.
 This module defines the routes for cardiovascular disease prediction.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 
 from api.services.prediction_service import InputData, UserInputData, PredictionService, CholesterolLevel
+from api.utils.executors import PREDICTION, run_in_pool
 
 router = APIRouter(
     prefix="/prediction",
@@ -15,13 +16,21 @@ router = APIRouter(
 )
 
 
-def get_prediction_service() -> PredictionService:
+def get_prediction_service(request: Request) -> PredictionService:
     """
     Get the cardiovascular disease prediction service.
 
+    The service loaded at startup is reused when available (see api.main.lifespan).
+
+    Args:
+        request: The incoming request
+
     Returns:
         PredictionService: The cardiovascular disease prediction service.
     """
+    prediction_service = getattr(request.app.state, "prediction_service", None)
+    if prediction_service is not None:
+        return prediction_service
     try:
         return PredictionService()
     except RuntimeError as e:
@@ -47,7 +56,7 @@ async def predict_cardiovascular_disease(
         Dict containing probability and prediction (0 or 1)
     """
     try:
-        return prediction_service.predict(data)
+        return await run_in_pool(PREDICTION, prediction_service.predict, data)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except RuntimeError as e:
@@ -84,7 +93,7 @@ async def predict_from_user_data(
         ```
     """
     try:
-        return prediction_service.predict(data)
+        return await run_in_pool(PREDICTION, prediction_service.predict, data)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except RuntimeError as e:
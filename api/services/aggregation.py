@@ -0,0 +1,268 @@
+"""
+Aggregation engine.
+
+This module provides the group-by engine behind the generic aggregation endpoint.
+Each integer column is coded once per dataset version as the index of its value
+in the sorted distinct values of the column, so that a breakdown by several
+columns is a single flat group index per record, and every metric is a bincount
+of that index, weighted by the metric column. Results are kept in a size-aware
+LRU cache shared by the worker.
+"""
+
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from api.models.cardio import Aggregation
+from api.services.bitmap_index import BITMAP_COLUMNS, RANGE_COLUMNS
+from api.services.dataset_store import DatasetStore
+from api.utils.lru import SizedLRUCache
+
+# Aggregates supported by the engine, 'count' being the only one without a column
+AGGREGATES = ('count', 'sum', 'mean', 'std', 'rate')
+
+# Maximum number of grouping columns
+MAX_GROUP_BY = 4
+
+# Maximum number of combinations of the grouping values
+MAX_GROUPS = 1_000_000
+
+# Memory budget of the aggregation results kept by the engine
+AGGREGATE_CACHE_MAX_BYTES = int(os.getenv("AGGREGATE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+METRIC_PATTERN = re.compile(r"^(\w+)(?:\((\w+)\))?$")
+CONDITION_PATTERN = re.compile(r"^(\w+)\s*(>=|<=|=)\s*(-?\d+(?:\.\d+)?)$")
+
+
+class Metric(NamedTuple):
+    """Aggregate computed over a column for each group."""
+    aggregate: str
+    column: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        """Name of the metric in the results, e.g. mean(ap_hi)."""
+        return self.aggregate if self.column is None else f"{self.aggregate}({self.column})"
+
+
+class Filters(NamedTuple):
+    """Conjunction of conditions selecting the aggregated records."""
+    equal: Dict[str, int]
+    ranges: Dict[str, Tuple[Optional[float], Optional[float]]]
+
+    @property
+    def key(self) -> Tuple:
+        """Canonical form of the filters, equal for equivalent conditions."""
+        return tuple(sorted(self.equal.items())), tuple(sorted(self.ranges.items()))
+
+
+def _split(spec: Optional[str]) -> List[str]:
+    return [item.strip() for item in spec.split(",") if item.strip()] if spec else []
+
+
+def parse_metrics(spec: Optional[str], columns: Dict[str, np.ndarray]) -> List[Metric]:
+    """
+    Parse a comma-separated list of metrics, e.g. count,mean(ap_hi),rate(cardio).
+
+    Args:
+        spec: Metrics, count when empty
+        columns: Mapping of column name to column values
+
+    Returns:
+        List of the metrics, without duplicates
+
+    Raises:
+        ValueError: If a metric is malformed, unknown or refers to an unknown column
+    """
+    metrics = []
+    for item in _split(spec) or ['count']:
+        match = METRIC_PATTERN.match(item)
+        if match is None or match.group(1) not in AGGREGATES:
+            raise ValueError(f"Unknown metric '{item}', expected one of {', '.join(AGGREGATES)}")
+        metric = Metric(*match.groups())
+        if (metric.aggregate == 'count') != (metric.column is None):
+            raise ValueError(f"Metric '{item}' must be written as count or {metric.aggregate}(column)")
+        if metric.column is not None and metric.column not in columns:
+            raise ValueError(f"Unknown column '{metric.column}' in metric '{item}'")
+        if metric.aggregate == 'rate' and not 0 <= columns[metric.column].min() <= columns[metric.column].max() <= 1:
+            raise ValueError(f"Metric '{item}' requires a binary column")
+        if metric not in metrics:
+            metrics.append(metric)
+    return metrics
+
+
+def parse_where(spec: Optional[str]) -> Filters:
+    """
+    Parse a comma-separated conjunction of conditions, e.g. gender=1,age>=50,ap_hi<=140.
+
+    Categorical columns accept equality conditions and numeric columns accept
+    equality and closed range conditions, which are resolved through the bitmap
+    index of the store.
+
+    Args:
+        spec: Conditions, none when empty
+
+    Returns:
+        Filters: The parsed conditions
+
+    Raises:
+        ValueError: If a condition is malformed or not supported by the index
+    """
+    filters = Filters({}, {})
+    for item in _split(spec):
+        match = CONDITION_PATTERN.match(item)
+        if match is None:
+            raise ValueError(f"Invalid condition '{item}', expected column=value, column>=value or column<=value")
+        column, operator, value = match.groups()
+        if column in BITMAP_COLUMNS and operator == '=':
+            filters.equal[column] = int(float(value))
+        elif column in RANGE_COLUMNS:
+            low, high = filters.ranges.get(column, (None, None))
+            if operator in ('=', '>='):
+                low = float(value) if low is None else max(low, float(value))
+            if operator in ('=', '<='):
+                high = float(value) if high is None else min(high, float(value))
+            filters.ranges[column] = (low, high)
+        else:
+            raise ValueError(f"Unsupported condition '{item}'")
+    return filters
+
+
+aggregate_cache = SizedLRUCache(
+    AGGREGATE_CACHE_MAX_BYTES,
+    sizeof=lambda result: sum(values.nbytes for values in result[1].values()),
+)
+
+
+class AggregationEngine:
+    """Group-by engine over the integer-coded columns of a dataset store."""
+
+    def __init__(self, store: DatasetStore, cache: SizedLRUCache = aggregate_cache):
+        """
+        Initialize the engine.
+
+        Args:
+            store: Dataset store to aggregate
+            cache: Cache of the aggregation results
+        """
+        self.store = store
+        self.cache = cache
+
+    def codes(self, column: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the coding of an integer column, computing it once per dataset version.
+
+        Args:
+            column: Integer column
+
+        Returns:
+            Tuple of the sorted distinct values and the code of each record
+
+        Raises:
+            ValueError: If the column is unknown or not an integer column
+        """
+        values = self.store.columns.get(column)
+        if values is None or not np.issubdtype(values.dtype, np.integer):
+            groupable = [name for name, values in self.store.columns.items() if np.issubdtype(values.dtype, np.integer)]
+            raise ValueError(f"Cannot group by '{column}', expected one of {', '.join(groupable)}")
+        return self.store.memoize(('codes', column), lambda: np.unique(values, return_inverse=True))
+
+    def aggregate(
+        self,
+        group_by: Optional[List[str]] = None,
+        metrics: Optional[str] = None,
+        where: Optional[str] = None,
+    ) -> Aggregation:
+        """
+        Compute metrics for each combination of values of the grouping columns.
+
+        Only the combinations with at least one record are returned, sorted by the
+        values of the grouping columns.
+
+        Args:
+            group_by: Grouping columns, a single group when empty
+            metrics: Comma-separated metrics, e.g. count,mean(ap_hi),rate(cardio)
+            where: Comma-separated conditions selecting the records, e.g. gender=1,age>=50
+
+        Returns:
+            Aggregation: The metrics of each group
+
+        Raises:
+            ValueError: If the grouping columns, metrics or conditions are invalid
+        """
+        group_by = list(dict.fromkeys(group_by or []))
+        if len(group_by) > MAX_GROUP_BY:
+            raise ValueError(f"Cannot group by more than {MAX_GROUP_BY} columns")
+        codings = [self.codes(column) for column in group_by]
+        if np.prod([len(levels) for levels, _ in codings], dtype=np.float64) > MAX_GROUPS:
+            raise ValueError(f"Cannot group by more than {MAX_GROUPS} combinations of values")
+        parsed = parse_metrics(metrics, self.store.columns)
+        filters = parse_where(where)
+
+        key = (self.store.version, tuple(group_by), tuple(parsed), filters.key)
+        result = self.cache.get(key)
+        if result is None:
+            result = self._compute(group_by, codings, parsed, filters)
+            self.cache.put(key, result)
+        total, columns = result
+
+        names = list(columns)
+        return Aggregation(
+            group_by=group_by,
+            metrics=[metric.name for metric in parsed],
+            total_records=total,
+            data=[dict(zip(names, row)) for row in zip(*(columns[name].tolist() for name in names))],
+        )
+
+    def _compute(
+        self,
+        group_by: List[str],
+        codings: List[Tuple[np.ndarray, np.ndarray]],
+        metrics: List[Metric],
+        filters: Filters,
+    ) -> Tuple[int, Dict[str, np.ndarray]]:
+        rows = None
+        if filters.equal or filters.ranges:
+            rows = self.store.index.select(filters.equal, filters.ranges)
+
+        def column(values: np.ndarray) -> np.ndarray:
+            return values if rows is None else values[rows]
+
+        shape = tuple(len(levels) for levels, _ in codings)
+        size = int(np.prod(shape, dtype=np.int64))
+        total = len(self.store) if rows is None else len(rows)
+        if codings:
+            groups = np.ravel_multi_index([column(codes) for _, codes in codings], shape)
+        else:
+            groups = np.zeros(total, dtype=np.intp)
+
+        counts = np.bincount(groups, minlength=size)
+        present = np.flatnonzero(counts)
+        counts = counts[present]
+        results = {}
+        if codings:
+            for name, (levels, _), codes in zip(group_by, codings, np.unravel_index(present, shape)):
+                results[name] = levels[codes]
+
+        sums: Dict[str, np.ndarray] = {}
+        for metric in metrics:
+            if metric.aggregate == 'count':
+                results[metric.name] = counts
+                continue
+            weights = column(self.store.columns[metric.column]).astype(np.float64)
+            if metric.column not in sums:
+                sums[metric.column] = np.bincount(groups, weights=weights, minlength=size)
+            if metric.aggregate == 'sum':
+                results[metric.name] = sums[metric.column][present]
+                continue
+            means = sums[metric.column][present] / counts
+            if metric.aggregate == 'std':
+                # Second pass over the deviations, which is exact where E[x²] - E[x]² cancels
+                full = np.zeros(size)
+                full[present] = means
+                deviations = weights - full[groups]
+                means = np.sqrt(np.bincount(groups, weights=deviations * deviations, minlength=size)[present] / counts)
+            results[metric.name] = means
+        return total, results
@@ -0,0 +1,180 @@
+"""
+Bitmap index.
+
+This module provides the indexes used to select cohorts of records. Categorical
+columns get one packed bitmap per value and numeric columns get a sorted range
+index, both built once when the dataset is loaded. A cohort is then resolved by
+AND-ing a few bitmaps instead of masking every column of the dataset.
+"""
+
+import copy
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+BITMAP_COLUMNS = ('gender', 'cholesterol', 'gluc', 'smoke', 'alco', 'active', 'cardio')
+RANGE_COLUMNS = ('age', 'ap_hi', 'ap_lo', 'IMC')
+
+
+class BitmapIndex:
+    """Bitmaps per categorical value and sorted range indexes over the dataset rows."""
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        """
+        Build the indexes.
+
+        Args:
+            columns: Mapping of column name to column values
+        """
+        self.size = len(next(iter(columns.values()))) if columns else 0
+
+        self.bitmaps = {
+            name: {
+                int(level): self._pack(columns[name] == level)
+                for level in np.unique(columns[name])
+            }
+            for name in BITMAP_COLUMNS
+            if name in columns
+        }
+
+        self.ranges = {}
+        for name in RANGE_COLUMNS:
+            if name in columns:
+                order = np.argsort(columns[name], kind='stable').astype(np.int32)
+                self.ranges[name] = (order, columns[name][order])
+
+    def _pack(self, mask: np.ndarray) -> np.ndarray:
+        return np.packbits(mask, bitorder='little')
+
+    @property
+    def memory_bytes(self) -> int:
+        """Number of bytes held by the indexes."""
+        bitmaps = sum(bitmap.nbytes for levels in self.bitmaps.values() for bitmap in levels.values())
+        ranges = sum(order.nbytes + values.nbytes for order, values in self.ranges.values())
+        return int(bitmaps + ranges)
+
+    def extend(self, columns: Dict[str, np.ndarray]) -> "BitmapIndex":
+        """
+        Build the indexes of the rows followed by appended rows.
+
+        The bitmaps are extended with the bits of the appended rows, and the sorted
+        appended values are merged into the range indexes, so that no column is
+        sorted again.
+
+        Args:
+            columns: Mapping of column name to the values of the appended rows
+
+        Returns:
+            BitmapIndex: The indexes of the rows and the appended rows
+        """
+        extended = copy.copy(self)
+        appended = len(next(iter(columns.values()))) if columns else 0
+        extended.size = self.size + appended
+
+        extended.bitmaps = {}
+        for name, levels in self.bitmaps.items():
+            values = columns[name]
+            extended.bitmaps[name] = {
+                level: self._pack(np.concatenate([
+                    np.unpackbits(levels[level], count=self.size, bitorder='little').astype(bool)
+                    if level in levels else np.zeros(self.size, dtype=bool),
+                    values == level,
+                ]))
+                for level in sorted(set(levels) | set(np.unique(values).tolist()))
+            }
+
+        extended.ranges = {}
+        for name, (order, values) in self.ranges.items():
+            appended_order = np.argsort(columns[name], kind='stable')
+            appended_values = columns[name][appended_order]
+            positions = np.searchsorted(values, appended_values, side='right')
+            dtype = np.result_type(values.dtype, appended_values.dtype)
+            extended.ranges[name] = (
+                np.insert(order, positions, (appended_order + self.size).astype(np.int32)),
+                np.insert(values.astype(dtype), positions, appended_values),
+            )
+        return extended
+
+    def median(self, column: str) -> float:
+        """
+        Get the median of a numeric column from its range index.
+
+        Args:
+            column: Numeric column
+
+        Returns:
+            float: The median of the column, as numpy.median computes it
+        """
+        values = self.ranges[column][1]
+        middle = (len(values) - 1) // 2
+        return float(np.mean(values[middle:len(values) - middle]))
+
+    def quantiles(self, column: str, fractions: Sequence[float]) -> List[float]:
+        """
+        Get exact quantiles of a numeric column from its range index.
+
+        Args:
+            column: Numeric column
+            fractions: Fractions of the records, between 0 and 1
+
+        Returns:
+            List of the quantiles, interpolated linearly as numpy.quantile does
+        """
+        return np.quantile(self.ranges[column][1], fractions).tolist()
+
+    def equal(self, column: str, value: int) -> np.ndarray:
+        """
+        Get the bitmap of the rows where a categorical column equals a value.
+
+        Args:
+            column: Categorical column
+            value: Value to match
+
+        Returns:
+            np.ndarray: Packed bitmap of the matching rows
+        """
+        empty = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        return self.bitmaps[column].get(int(value), empty)
+
+    def between(self, column: str, low: Optional[float] = None, high: Optional[float] = None) -> np.ndarray:
+        """
+        Get the bitmap of the rows where a numeric column lies in a closed range.
+
+        Args:
+            column: Numeric column
+            low: Lower bound, unbounded if None
+            high: Upper bound, unbounded if None
+
+        Returns:
+            np.ndarray: Packed bitmap of the matching rows
+        """
+        order, values = self.ranges[column]
+        start = 0 if low is None else np.searchsorted(values, low, side='left')
+        stop = len(values) if high is None else np.searchsorted(values, high, side='right')
+
+        mask = np.zeros(self.size, dtype=bool)
+        mask[order[start:stop]] = True
+        return self._pack(mask)
+
+    def select(
+        self,
+        equal: Optional[Dict[str, int]] = None,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+    ) -> np.ndarray:
+        """
+        Resolve a conjunction of filters to the matching rows.
+
+        Args:
+            equal: Mapping of categorical column to the value it must equal
+            ranges: Mapping of numeric column to the closed range it must lie in
+
+        Returns:
+            np.ndarray: Sorted indices of the matching rows
+        """
+        bitmaps = [self.equal(column, value) for column, value in (equal or {}).items()]
+        bitmaps += [self.between(column, low, high) for column, (low, high) in (ranges or {}).items()]
+        if not bitmaps:
+            return np.arange(self.size)
+
+        selected = np.bitwise_and.reduce(bitmaps)
+        return np.flatnonzero(np.unpackbits(selected, count=self.size, bitorder='little'))
@@ -4,103 +4,530 @@ Cardiovascular disease analysis service.
 This module provides services for cardiovascular disease analysis.
 """
 
-import os
-from typing import List
-
+import base64
+import csv
+import functools
+import inspect
+import io
+import json
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar, Union
+
+import numpy as np
 import pandas as pd
 
-from api.models.cardio import ChartData, CorrelationAnalysis, Dataset, DatasetStatistics
+from api.models.cardio import (
+    ChartData, CohortFilter, ColumnarChartData, ColumnarDataset, CorrelationAnalysis, Dataset, DatasetStatistics,
+    ExportFormat, Layout
+)
+from api.services.count_cube import CountCube
+from api.services.dataset_store import DatasetStore, get_dataset_store
+from api.services.moments import Moments
+from api.utils.binary_columns import iter_encoded
+
+# Maximum number of points of the scatter charts
+SCATTER_SAMPLE_SIZE = 5000
+
+# Default number of bins per axis of the density charts
+DEFAULT_DENSITY_BINS = 20
+
+# Default number of records encoded per chunk of a dataset export
+DEFAULT_EXPORT_CHUNK_SIZE = 5000
+
+# Cohort filter fields resolved through the bitmap index
+EQUALITY_FILTERS = ('gender', 'cholesterol', 'gluc', 'smoke', 'alco', 'active', 'cardio')
+RANGE_FILTERS = {
+    'age': ('age_min', 'age_max'),
+    'ap_hi': ('ap_hi_min', 'ap_hi_max'),
+    'ap_lo': ('ap_lo_min', 'ap_lo_max'),
+    'IMC': ('imc_min', 'imc_max'),
+}
+
+
+def _describe(values: np.ndarray) -> Dict[str, float]:
+    """
+    Summarize a numeric column.
+
+    Args:
+        values: Column values
+
+    Returns:
+        Dict containing the min, max, mean and median of the column
+    """
+    return {
+        'min': float(np.min(values)),
+        'max': float(np.max(values)),
+        'mean': float(np.mean(values)),
+        'median': float(np.median(values))
+    }
+
+
+class StaleCursorError(ValueError):
+    """Raised when a pagination cursor belongs to another dataset version."""
+
+
+def encode_cursor(offset: int, version: str) -> str:
+    """
+    Encode the position of a page in a dataset version as an opaque cursor.
+
+    Args:
+        offset: Position of the first record of the page
+        version: Version of the dataset
+
+    Returns:
+        str: The cursor
+    """
+    return base64.urlsafe_b64encode(f"{version}:{offset}".encode()).decode()
+
+
+def decode_cursor(cursor: str, version: str) -> int:
+    """
+    Decode a cursor issued by encode_cursor.
+
+    Args:
+        cursor: The cursor
+        version: Current version of the dataset
+
+    Returns:
+        int: Position of the first record of the page
+
+    Raises:
+        StaleCursorError: If the cursor was issued for another dataset version
+        ValueError: If the cursor is invalid
+    """
+    try:
+        cursor_version, offset = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit(":", 1)
+        offset = int(offset)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    if cursor_version != version:
+        raise StaleCursorError("The cursor belongs to another version of the dataset, restart from the first page")
+    if offset < 0:
+        raise ValueError("Invalid cursor")
+    return offset
+
+
+def _sample(
+    columns: Dict[str, np.ndarray],
+    size: int = SCATTER_SAMPLE_SIZE,
+    seed: int = 42,
+) -> Dict[str, np.ndarray]:
+    """
+    Draw a sample of records without replacement.
+
+    The records are the ones DataFrame.sample(n=size, random_state=seed) would draw.
+
+    Args:
+        columns: Mapping of column name to column values
+        size: Maximum number of records to draw
+        seed: Seed of the random number generator
+
+    Returns:
+        Dict mapping column names to the values of the sampled records
+    """
+    total = len(next(iter(columns.values())))
+    positions = np.random.RandomState(seed).choice(total, size=min(size, total), replace=False)
+    return {name: values[positions] for name, values in columns.items()}
+
+
+def _density(
+    columns: Dict[str, np.ndarray],
+    x: str,
+    y: str,
+    bins: int,
+) -> Dict[str, np.ndarray]:
+    """
+    Count the records of each cell of a 2D grid, split by cardiovascular disease.
+
+    The grid spans the range of both columns with bins equal-width cells per axis.
+    Records are binned in a single vectorized pass and only non-empty cells are
+    returned.
+
+    Args:
+        columns: Mapping of column name to column values
+        x: Column of the horizontal axis
+        y: Column of the vertical axis
+        bins: Number of cells per axis
+
+    Returns:
+        Dict mapping the bounds of a cell on each axis, the cardio status and the count to one value per cell
+    """
+    cells = columns['cardio'].astype(np.int64) * bins * bins
+    edges = {}
+    for axis, stride in ((x, bins), (y, 1)):
+        values = columns[axis]
+        low, high = float(values.min()), float(values.max())
+        span = high - low if high > low else 1.0
+        position = np.minimum(((values - low) * (bins / span)).astype(np.int64), bins - 1)
+        cells += position * stride
+        edges[axis] = np.round(np.linspace(low, low + span, bins + 1), 2)
+
+    counts = np.bincount(cells, minlength=2 * bins * bins)
+    present = np.flatnonzero(counts)
+    cardio, rest = np.divmod(present, bins * bins)
+    x_bin, y_bin = np.divmod(rest, bins)
+    return {
+        f'{x}_min': edges[x][x_bin],
+        f'{x}_max': edges[x][x_bin + 1],
+        f'{y}_min': edges[y][y_bin],
+        f'{y}_max': edges[y][y_bin + 1],
+        'cardio': cardio,
+        'count': counts[present],
+    }
+
+
+def _records(columns: Dict[str, np.ndarray], names: List[str]) -> List[Dict[str, Union[int, float]]]:
+    """
+    Convert columns to a list of records.
+
+    Args:
+        columns: Mapping of column name to column values
+        names: Columns to include in each record, in order
+
+    Returns:
+        List of records mapping each column name to a native Python value
+    """
+    return [dict(zip(names, row)) for row in zip(*(columns[name].tolist() for name in names))]
+
+
+def _chart(
+    columns: Dict[str, np.ndarray],
+    names: List[str],
+    layout: Layout = Layout.ROWS,
+    **chart: str,
+) -> Union[ChartData, ColumnarChartData]:
+    """
+    Build a chart from columns, in the requested layout.
+
+    Args:
+        columns: Mapping of column name to column values
+        names: Columns to include in the chart data, in order
+        layout: Layout of the chart data
+        chart: Type, title, description and axis labels of the chart
+
+    Returns:
+        ChartData with one record per row, or ColumnarChartData with one list of values per column
+    """
+    if layout == Layout.COLUMNAR:
+        return ColumnarChartData(columns={name: columns[name].tolist() for name in names}, **chart)
+    return ChartData(data=_records(columns, names), **chart)
+
+
+Artifact = TypeVar('Artifact', bound=Callable[..., Any])
+
+
+def _population_artifact(method: Artifact) -> Artifact:
+    """
+    Memoize an analysis of the whole population with the dataset store.
+
+    The result is computed once per dataset version and set of arguments, and
+    shared by every service of that version; it must not be modified. The
+    arguments must take a bounded number of values, as the memoized results are
+    kept as long as the store. Analyses of a cohort are computed on each call.
+
+    Args:
+        method: CardioService method computing the analysis
+
+    Returns:
+        The memoized method
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self: "CardioService", *args: Any, **kwargs: Any) -> Any:
+        if self.cohort is not None:
+            return method(self, *args, **kwargs)
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        key = ('artifact', method.__name__, tuple(bound.arguments.items())[1:])
+        return self.store.memoize(key, lambda: method(self, *args, **kwargs))
+
+    return wrapper
 
 
 class CardioService:
     """Service for cardiovascular disease analysis."""
 
-    def __init__(self):
-        """Initialize the service."""
-        self.data = None
+    def __init__(self, store: Optional[DatasetStore] = None, cohort: Optional[CohortFilter] = None):
+        """
+        Initialize the service.
+
+        Args:
+            store: Dataset store to read from, defaults to the process-wide store
+            cohort: Optional filter restricting the analysis to a cohort of records
+        """
+        self.store = store
+        self.cohort = cohort
         self.load_data()
 
     def load_data(self) -> None:
         """
-        Load and preprocess the dataset.
+        Attach the service to the preprocessed dataset.
+
+        The dataset is loaded and preprocessed once per process by the dataset store
+        (see api.services.dataset_store), so this method does not re-read the CSV file.
+        When a cohort is given, the count cube is restricted to it: a cohort selected
+        by the cube dimensions only (equality filters and age range) is read from the
+        cells of the count cube it covers, other cohorts are counted from their rows,
+        resolved through the bitmap index of the store. The rows, columns and records
+        of a cohort are only resolved when an analysis reads them. In out-of-core
+        mode, the store is a DatasetSummary whose records raise
+        RecordsUnavailableError when an analysis reads them.
+        """
+        if self.store is None:
+            self.store = get_dataset_store()
+
+        if self.cohort is None:
+            self.cube = self.store.cube
+            return
+        bounds = self._cube_bounds(self.cohort)
+        if bounds is not None:
+            self.cube = self.store.cube.select(bounds)
+        else:
+            self.cube = CountCube(self.store.cube.levels, self.store.cube.count(self.store.cells[self.rows]))
+
+    @functools.cached_property
+    def rows(self) -> Optional[np.ndarray]:
+        """Sorted indices of the records of the cohort, None for the whole population."""
+        if self.cohort is None:
+            return None
+        return self._select_rows(self.cohort)
+
+    @functools.cached_property
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Mapping of column name to the values of the records of the analysis."""
+        if self.cohort is None:
+            return self.store.columns
+        return {name: values[self.rows] for name, values in self.store.columns.items()}
+
+    @functools.cached_property
+    def data(self) -> pd.DataFrame:
+        """Records of the analysis."""
+        if self.cohort is None:
+            return self.store.data
+        return self.store.data.iloc[self.rows]
+
+    def _cube_bounds(self, cohort: CohortFilter) -> Optional[Dict[str, Tuple[Optional[float], Optional[float]]]]:
+        """
+        Express a cohort filter as bounds on the dimensions of the count cube.
+
+        Args:
+            cohort: Cohort filter
 
-        This method loads the cardio_train.csv dataset and performs the following preprocessing steps:
-        1. Removes the 'id' column
-        2. Converts age from days to years
-        3. Creates a BMI feature from height and weight
-        4. Removes height and weight columns
-        5. Filters out outliers in blood pressure and BMI
+        Returns:
+            Mapping of dimension name to inclusive (low, high) bounds, None if the
+            cohort filters a column that is not a dimension of the cube
         """
-        # Get the absolute path to the dataset
-        dataset_path = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-            "dataset",
-            "cardio_train.csv"
-        )
+        criteria = cohort.model_dump(exclude_none=True)
+        bounds = {column: (int(criteria[column]),) * 2 for column in EQUALITY_FILTERS if column in criteria}
+        bounds.update({
+            column: (criteria.get(low), criteria.get(high))
+            for column, (low, high) in RANGE_FILTERS.items()
+            if low in criteria or high in criteria
+        })
+        if not set(bounds) <= set(self.store.cube.levels):
+            return None
+        return bounds
+
+    def _select_rows(self, cohort: CohortFilter) -> np.ndarray:
+        """
+        Resolve a cohort filter to the indices of its records.
+
+        Args:
+            cohort: Cohort filter
+
+        Returns:
+            np.ndarray: Sorted indices of the records of the cohort
+        """
+        criteria = cohort.model_dump(exclude_none=True)
+        equal = {column: int(criteria[column]) for column in EQUALITY_FILTERS if column in criteria}
+        ranges = {
+            column: (criteria.get(low), criteria.get(high))
+            for column, (low, high) in RANGE_FILTERS.items()
+            if low in criteria or high in criteria
+        }
+        return self.store.index.select(equal, ranges)
+
+    def _describe(self, column: str, exact: bool = True) -> Dict[str, float]:
+        """
+        Summarize a numeric column of the analysis.
+
+        The summary of the whole population is read from the moments, medians and
+        quantile sketches of the store, which are kept up to date as records are
+        appended and are available in out-of-core mode; cohort columns are
+        summarized on demand.
+
+        Args:
+            column: Numeric column of the moments and range indexes
+            exact: Whether the median of the whole population is exact rather than read from its sketch
+
+        Returns:
+            Dict containing the min, max, mean and median of the column
+        """
+        if self.cohort is None:
+            median = self.store.median(column) if exact else self.store.quantiles(column, [0.5])[0]
+            return {**self.store.moments.describe(column), 'median': median}
+        return _describe(self.columns[column])
+
+    def _quantiles(self, column: str, fractions: Sequence[float], exact: bool) -> Dict[str, float]:
+        """
+        Get quantiles of a numeric column of the analysis.
+
+        Args:
+            column: Numeric column of the range indexes
+            fractions: Fractions of the records, between 0 and 1
+            exact: Whether the quantiles of the whole population are exact rather than read from its sketch
+
+        Returns:
+            Dict mapping each fraction, formatted as in the request, to its quantile
+        """
+        if self.cohort is None:
+            values = self.store.quantiles(column, fractions, exact=exact)
+        else:
+            values = np.quantile(self.columns[column], fractions).tolist()
+        return {f"{fraction:g}": value for fraction, value in zip(fractions, values)}
+
+    def _moments(self) -> Moments:
+        """
+        Get the moments of the numeric columns of the analysis.
+
+        The moments of the whole population are kept by the store. Those of a
+        cohort selected by the cube dimensions only (equality filters and age range)
+        are summed from the cells of the moment cube it covers, without reading its
+        records; other cohorts are summarized from their records.
+
+        Returns:
+            Moments: The moments of the numeric columns
+        """
+        if self.cohort is None:
+            return self.store.moments
+        bounds = self._cube_bounds(self.cohort)
+        if bounds is not None:
+            return self.store.moment_cube.select(bounds)
+        return Moments.from_columns(self.columns)
+
+    def _mean(self, column: str) -> float:
+        """
+        Get the mean of a numeric column of the analysis.
+
+        Args:
+            column: Numeric column of the moments
+
+        Returns:
+            float: The mean of the column
+        """
+        if self.cohort is None:
+            return self.store.moments.describe(column)['mean']
+        return float(np.mean(self.columns[column]))
+
+    def _cardio_breakdown(
+        self,
+        column: str,
+        labels: Optional[Dict[int, str]] = None,
+    ) -> List[Dict[str, Union[str, int]]]:
+        """
+        Count individuals with and without cardiovascular disease per value of a column.
+
+        Args:
+            column: Categorical column of the count cube
+            labels: Optional mapping of column values to descriptive labels
+
+        Returns:
+            List of records containing the column value, num_healthy_people and num_sick_people
+        """
+        levels, table = self.cube.breakdown(column, by='cardio')
+        by_cardio = dict(zip(self.cube.levels['cardio'].tolist(), table.T.tolist()))
+        no_cases = [0] * len(levels)
+
+        return [
+            {
+                column: labels[level] if labels else level,
+                'num_healthy_people': healthy,
+                'num_sick_people': sick
+            }
+            for level, healthy, sick in zip(levels.tolist(), by_cardio.get(0, no_cases), by_cardio.get(1, no_cases))
+        ]
 
-        # Load the dataset
-        self.data = pd.read_csv(dataset_path, sep=';', header=0)
+    def _scatter_sample(self) -> Dict[str, np.ndarray]:
+        """
+        Get the deterministic sample shared by the scatter charts.
 
-        # Preprocess the dataset
-        # 1. Remove the 'id' column
-        self.data.drop(columns=['id'], inplace=True)
+        The sample of the whole population is drawn once per dataset version and kept
+        with the store; cohort samples are drawn on demand.
 
-        # 2. Convert age from days to years
-        self.data['age'] = (self.data['age'] / 365.25).astype(int)
+        Returns:
+            Dict mapping column names to the values of the sampled records
+        """
+        if self.cohort is None:
+            return self.store.memoize('scatter_sample', lambda: _sample(self.columns))
+        return _sample(self.columns)
+
+    def _density_columns(self, x: str, y: str, bins: int) -> Dict[str, np.ndarray]:
+        """
+        Get the density grid of two columns over every record of the analysis.
 
-        # 3. Create a BMI feature from height and weight
-        self.data['IMC'] = self.data['weight'] / (self.data['height'] / 100) ** 2
+        The grid of the whole population is computed once per dataset version and
+        bin setting and kept with the store; cohort grids are computed on demand.
 
-        # 4. Remove height and weight columns
-        self.data.drop(columns=['weight', 'height'], inplace=True)
+        Args:
+            x: Column of the horizontal axis
+            y: Column of the vertical axis
+            bins: Number of cells per axis
 
-        # 5. Filter out outliers in blood pressure and BMI
-        self.data = self.data[(self.data['ap_hi'] >= 90) & (self.data['ap_hi'] <= 200)]
-        self.data = self.data[(self.data['ap_lo'] >= 60) & (self.data['ap_lo'] <= 140)]
-        self.data = self.data[(self.data['IMC'] >= 10) & (self.data['IMC'] <= 80)]
+        Returns:
+            Dict mapping the fields of the non-empty cells of the grid to their values
+        """
+        if self.cohort is None:
+            return self.store.memoize(('density', x, y, bins), lambda: _density(self.columns, x, y, bins))
+        return _density(self.columns, x, y, bins)
 
-    def get_dataset_statistics(self) -> DatasetStatistics:
+    def get_dataset_statistics(self, quantiles: Tuple[float, ...] = (), exact: bool = False) -> DatasetStatistics:
         """
         Get dataset statistics.
 
+        The medians and quantiles of the whole population are read from quantile
+        sketches unless exact is set; their rank is then within about 1% of the
+        number of records of the exact one (see api.services.quantile_sketch).
+        The requested quantiles are computed on each call rather than memoized
+        with the statistics, since any client can request distinct fractions.
+
+        Args:
+            quantiles: Fractions of the records whose quantiles are added to the statistics
+            exact: Whether to compute exact medians and quantiles
+
         Returns:
             DatasetStatistics: Dataset statistics.
         """
-        if self.data is None:
-            self.load_data()
+        statistics = self._statistics(exact)
+        if not quantiles:
+            return statistics
+        return statistics.model_copy(update={
+            'quantiles': {
+                column: self._quantiles(column, quantiles, exact) for column in ('age', 'IMC', 'ap_hi', 'ap_lo')
+            }
+        })
 
-        # Calculate statistics
-        total_records = len(self.data)
-        cardio_positive = len(self.data[self.data['cardio'] == 1])
-        cardio_negative = len(self.data[self.data['cardio'] == 0])
-
-        age_range = {
-            'min': float(self.data['age'].min()),
-            'max': float(self.data['age'].max()),
-            'mean': float(self.data['age'].mean()),
-            'median': float(self.data['age'].median())
-        }
+    @_population_artifact
+    def _statistics(self, exact: bool) -> DatasetStatistics:
+        """
+        Get the dataset statistics without quantiles.
 
-        bmi_range = {
-            'min': float(self.data['IMC'].min()),
-            'max': float(self.data['IMC'].max()),
-            'mean': float(self.data['IMC'].mean()),
-            'median': float(self.data['IMC'].median())
-        }
+        Args:
+            exact: Whether to compute exact medians
 
+        Returns:
+            DatasetStatistics: Dataset statistics.
+        """
+        # Calculate statistics from the count cube, moments and range indexes of the store
+        total_records = int(self.cube.counts.sum())
+        cardio_counts = dict(zip(self.cube.levels['cardio'].tolist(), self.cube.margin('cardio').tolist()))
+        cardio_positive = cardio_counts.get(1, 0)
+        cardio_negative = cardio_counts.get(0, 0)
+
+        age_range = self._describe('age', exact)
+        bmi_range = self._describe('IMC', exact)
         blood_pressure_range = {
-            'systolic': {
-                'min': float(self.data['ap_hi'].min()),
-                'max': float(self.data['ap_hi'].max()),
-                'mean': float(self.data['ap_hi'].mean()),
-                'median': float(self.data['ap_hi'].median())
-            },
-            'diastolic': {
-                'min': float(self.data['ap_lo'].min()),
-                'max': float(self.data['ap_lo'].max()),
-                'mean': float(self.data['ap_lo'].mean()),
-                'median': float(self.data['ap_lo'].median())
-            }
+            'systolic': self._describe('ap_hi', exact),
+            'diastolic': self._describe('ap_lo', exact)
         }
 
         return DatasetStatistics(
@@ -112,6 +539,7 @@ class CardioService:
             blood_pressure_range=blood_pressure_range
         )
 
+    @_population_artifact
     def get_age_distribution_chart(self) -> ChartData:
         """
         Returns age distribution chart data.
@@ -121,19 +549,8 @@ class CardioService:
           - num_sick_people: number of individuals with cardiovascular disease (cardio == 1),
           - num_healthy_people: number of individuals without cardiovascular disease (cardio == 0).
         """
-        if self.data is None:
-            self.load_data()
-
-        # Create a pivot table aggregating the data by age and cardio status
-        distribution = (
-            self.data
-            .pivot_table(index="age", columns="cardio", aggfunc="size", fill_value=0)
-            .reset_index()
-            .rename(columns={0: "num_healthy_people", 1: "num_sick_people"})
-        )
-
-        # Convert the DataFrame to a list of dictionaries
-        chart_data = distribution.to_dict(orient="records")
+        # Marginalize the count cube by age and cardio status
+        chart_data = self._cardio_breakdown("age")
 
         return ChartData(
             chart_type="histogram",
@@ -144,6 +561,7 @@ class CardioService:
             data=chart_data
         )
 
+    @_population_artifact
     def get_gender_distribution_chart(self) -> ChartData:
         """
         Returns gender distribution chart data.
@@ -153,22 +571,8 @@ class CardioService:
           - num_healthy_people: number of individuals without cardiovascular disease (cardio == 0),
           - num_sick_people: number of individuals with cardiovascular disease (cardio == 1).
         """
-        if self.data is None:
-            self.load_data()
-
-        # Create a pivot table to aggregate counts by gender and cardio status
-        distribution = (
-            self.data
-            .pivot_table(index="gender", columns="cardio", aggfunc="size", fill_value=0)
-            .reset_index()
-            .rename(columns={0: "num_healthy_people", 1: "num_sick_people"})
-        )
-
-        # Map numeric gender values to descriptive labels
-        distribution["gender"] = distribution["gender"].map({1: "Femme", 2: "Homme"})
-
-        # Convert the DataFrame to a list of dictionaries
-        chart_data = distribution.to_dict(orient="records")
+        # Marginalize the count cube by gender and cardio status, with descriptive gender labels
+        chart_data = self._cardio_breakdown("gender", labels={1: "Femme", 2: "Homme"})
 
         return ChartData(
             chart_type="histogram",
@@ -179,70 +583,109 @@ class CardioService:
             data=chart_data
         )
 
-    def get_blood_pressure_chart(self) -> ChartData:
+    @_population_artifact
+    def get_blood_pressure_chart(self, layout: Layout = Layout.ROWS) -> Union[ChartData, ColumnarChartData]:
         """
         Get blood pressure chart data.
 
-        Returns:
-            ChartData: Blood pressure chart data.
-        """
-        if self.data is None:
-            self.load_data()
-
-        # Sample data for the scatter plot (to avoid too many points)
-        sample_data = self.data.sample(n=min(5000, len(self.data)), random_state=42)
-
-        # Convert to list of dictionaries for the chart
-        chart_data = []
-        for _, row in sample_data.iterrows():
-            chart_data.append({
-                'ap_hi': int(row['ap_hi']),
-                'ap_lo': int(row['ap_lo']),
-                'cardio': int(row['cardio']),
-                'age': int(row['age']),
-                'gender': int(row['gender'])
-            })
+        Args:
+            layout: Layout of the chart data
 
-        return ChartData(
+        Returns:
+            ChartData: Blood pressure chart data, or ColumnarChartData in the columnar layout.
+        """
+        # Build the chart from the shared sample (to avoid too many points)
+        return _chart(
+            self._scatter_sample(),
+            ['ap_hi', 'ap_lo', 'cardio', 'age', 'gender'],
+            layout,
             chart_type="scatter",
             title="Pression artérielle (Systolique vs Diastolique)",
             description="Ce graphique en nuage de points montre la relation entre la pression systolique (ap_hi) et la pression diastolique (ap_lo) pour chaque individu.",
             x_label="Pression Systolique",
             y_label="Pression Diastolique",
-            data=chart_data
         )
 
-    def get_bmi_age_chart(self) -> ChartData:
+    @_population_artifact
+    def get_bmi_age_chart(self, layout: Layout = Layout.ROWS) -> Union[ChartData, ColumnarChartData]:
         """
         Get BMI vs age chart data.
 
+        Args:
+            layout: Layout of the chart data
+
         Returns:
-            ChartData: BMI vs age chart data.
+            ChartData: BMI vs age chart data, or ColumnarChartData in the columnar layout.
         """
-        if self.data is None:
-            self.load_data()
+        # Build the chart from the shared sample (to avoid too many points)
+        return _chart(
+            self._scatter_sample(),
+            ['age', 'IMC', 'cardio'],
+            layout,
+            chart_type="scatter",
+            title="IMC selon l'âge et présence de maladie cardiovasculaire",
+            description="Ce nuage de points présente la distribution de l'indice de masse corporelle (IMC) en fonction de l'âge, avec un code couleur indiquant la présence ou non de maladies cardiovasculaires.",
+            x_label="Âge",
+            y_label="Indice de Masse Corporelle",
+        )
 
-        # Sample data for the scatter plot (to avoid too many points)
-        sample_data = self.data.sample(n=min(5000, len(self.data)), random_state=42)
+    @_population_artifact
+    def get_blood_pressure_density_chart(
+        self,
+        bins: int = DEFAULT_DENSITY_BINS,
+        layout: Layout = Layout.ROWS,
+    ) -> Union[ChartData, ColumnarChartData]:
+        """
+        Get blood pressure density chart data.
 
-        # Convert to list of dictionaries for the chart
-        chart_data = []
-        for _, row in sample_data.iterrows():
-            chart_data.append({
-                'age': int(row['age']),
-                'IMC': float(row['IMC']),
-                'cardio': int(row['cardio'])
-            })
+        Args:
+            bins: Number of cells per axis
+            layout: Layout of the chart data
 
-        return ChartData(
-            chart_type="scatter",
+        Returns:
+            ChartData: Blood pressure density chart data over every record, or ColumnarChartData in the columnar layout.
+        """
+        density = self._density_columns('ap_hi', 'ap_lo', bins)
+        return _chart(
+            density,
+            list(density),
+            layout,
+            chart_type="density",
+            title="Pression artérielle (Systolique vs Diastolique)",
+            description=f"Ce graphique de densité compte, sur une grille de {bins}x{bins} cases, les {len(self.data)} individus selon leur pression systolique (ap_hi) et diastolique (ap_lo), séparément pour les individus avec et sans maladie cardiovasculaire.",
+            x_label="Pression Systolique",
+            y_label="Pression Diastolique",
+        )
+
+    @_population_artifact
+    def get_bmi_age_density_chart(
+        self,
+        bins: int = DEFAULT_DENSITY_BINS,
+        layout: Layout = Layout.ROWS,
+    ) -> Union[ChartData, ColumnarChartData]:
+        """
+        Get BMI vs age density chart data.
+
+        Args:
+            bins: Number of cells per axis
+            layout: Layout of the chart data
+
+        Returns:
+            ChartData: BMI vs age density chart data over every record, or ColumnarChartData in the columnar layout.
+        """
+        density = self._density_columns('age', 'IMC', bins)
+        return _chart(
+            density,
+            list(density),
+            layout,
+            chart_type="density",
             title="IMC selon l'âge et présence de maladie cardiovasculaire",
-            description="Ce nuage de points présente la distribution de l'indice de masse corporelle (IMC) en fonction de l'âge, avec un code couleur indiquant la présence ou non de maladies cardiovasculaires.",
+            description=f"Ce graphique de densité compte, sur une grille de {bins}x{bins} cases, les {len(self.data)} individus selon leur âge et leur indice de masse corporelle (IMC), séparément pour les individus avec et sans maladie cardiovasculaire.",
             x_label="Âge",
             y_label="Indice de Masse Corporelle",
-            data=chart_data
         )
 
+    @_population_artifact
     def get_cholesterol_chart(self) -> ChartData:
         """
         Get cholesterol chart data.
@@ -250,19 +693,8 @@ class CardioService:
         Returns:
             ChartData: Cholesterol chart data.
         """
-        if self.data is None:
-            self.load_data()
-
-        # Create a pivot table aggregating the data by cholesterol and cardio status
-        distribution = (
-            self.data
-            .pivot_table(index="cholesterol", columns="cardio", aggfunc="size", fill_value=0)
-            .reset_index()
-            .rename(columns={0: "num_healthy_people", 1: "num_sick_people"})
-        )
-
-        # Convert the DataFrame to a list of dictionaries
-        chart_data = distribution.to_dict(orient="records")
+        # Marginalize the count cube by cholesterol and cardio status
+        chart_data = self._cardio_breakdown("cholesterol")
 
         return ChartData(
             chart_type="box",
@@ -273,6 +705,7 @@ class CardioService:
             data=chart_data
         )
 
+    @_population_artifact
     def get_physical_activity_chart(self) -> ChartData:
         """
         Returns physical activity distribution chart data.
@@ -282,19 +715,8 @@ class CardioService:
           - num_healthy_people: number of individuals without cardiovascular disease (cardio == 0),
           - num_sick_people: number of individuals with cardiovascular disease (cardio == 1).
         """
-        if self.data is None:
-            self.load_data()
-
-        # Create a pivot table to aggregate counts by active and cardio status
-        distribution = (
-            self.data
-            .pivot_table(index="active", columns="cardio", aggfunc="size", fill_value=0)
-            .reset_index()
-            .rename(columns={0: "num_healthy_people", 1: "num_sick_people"})
-        )
-
-        # Convert the DataFrame to a list of dictionaries
-        chart_data = distribution.to_dict(orient="records")
+        # Marginalize the count cube by active and cardio status
+        chart_data = self._cardio_breakdown("active")
 
         return ChartData(
             chart_type="histogram",
@@ -305,31 +727,32 @@ class CardioService:
             data=chart_data
         )
 
+    @_population_artifact
     def get_correlation_analysis(self) -> CorrelationAnalysis:
         """
         Get correlation analysis.
 
+        Correlations involving a column that is constant over the cohort are
+        undefined: they are null in the matrix and left out of the top correlations.
+
         Returns:
             CorrelationAnalysis: Correlation analysis.
         """
-        if self.data is None:
-            self.load_data()
-
-        # Calculate correlation matrix
-        corr = self.data[
-            ['age', 'IMC', 'ap_hi', 'ap_lo', 'cholesterol', 'gluc', 'smoke', 'alco', 'active', 'cardio']].corr()
+        # Calculate correlation matrix from the sufficient statistics of the population or cohort
+        moments = self._moments()
+        corr = pd.DataFrame(moments.correlation(), index=list(moments.names), columns=list(moments.names))
 
         # Round correlation values to 2 decimal places
         corr_rounded = corr.round(2)
 
         # Convert to list of lists for the correlation matrix
-        correlation_matrix = corr_rounded.values.tolist()
+        correlation_matrix = corr_rounded.astype(object).where(corr_rounded.notna(), None).values.tolist()
 
         # Get feature names
         feature_names = corr.columns.tolist()
 
         # Get top correlations with cardio
-        cardio_corr = corr_rounded['cardio'].drop('cardio').sort_values(ascending=False)
+        cardio_corr = corr_rounded['cardio'].drop('cardio').dropna().sort_values(ascending=False)
         top_correlations = []
         for feature, value in cardio_corr.items():
             top_correlations.append({
@@ -343,6 +766,7 @@ class CardioService:
             top_correlations=top_correlations
         )
 
+    @_population_artifact
     def get_smoking_chart(self) -> ChartData:
         """
         Returns smoking distribution chart data.
@@ -352,19 +776,8 @@ class CardioService:
           - num_healthy_people: number of individuals without cardiovascular disease (cardio == 0),
           - num_sick_people: number of individuals with cardiovascular disease (cardio == 1).
         """
-        if self.data is None:
-            self.load_data()
-
-        # Create a pivot table to aggregate counts by smoke and cardio status
-        distribution = (
-            self.data
-            .pivot_table(index="smoke", columns="cardio", aggfunc="size", fill_value=0)
-            .reset_index()
-            .rename(columns={0: "num_healthy_people", 1: "num_sick_people"})
-        )
-
-        # Convert the DataFrame to a list of dictionaries
-        chart_data = distribution.to_dict(orient="records")
+        # Marginalize the count cube by smoke and cardio status
+        chart_data = self._cardio_breakdown("smoke")
 
         return ChartData(
             chart_type="histogram",
@@ -375,6 +788,7 @@ class CardioService:
             data=chart_data
         )
 
+    @_population_artifact
     def get_alcohol_chart(self) -> ChartData:
         """
         Returns alcohol consumption distribution chart data.
@@ -384,19 +798,8 @@ class CardioService:
           - num_healthy_people: number of individuals without cardiovascular disease (cardio == 0),
           - num_sick_people: number of individuals with cardiovascular disease (cardio == 1).
         """
-        if self.data is None:
-            self.load_data()
-
-        # Create a pivot table to aggregate counts by alco and cardio status
-        distribution = (
-            self.data
-            .pivot_table(index="alco", columns="cardio", aggfunc="size", fill_value=0)
-            .reset_index()
-            .rename(columns={0: "num_healthy_people", 1: "num_sick_people"})
-        )
-
-        # Convert the DataFrame to a list of dictionaries
-        chart_data = distribution.to_dict(orient="records")
+        # Marginalize the count cube by alco and cardio status
+        chart_data = self._cardio_breakdown("alco")
 
         return ChartData(
             chart_type="histogram",
@@ -407,6 +810,7 @@ class CardioService:
             data=chart_data
         )
 
+    @_population_artifact
     def get_glucose_chart(self) -> ChartData:
         """
         Get glucose chart data.
@@ -414,19 +818,8 @@ class CardioService:
         Returns:
             ChartData: Glucose chart data.
         """
-        if self.data is None:
-            self.load_data()
-
-        # Create a pivot table aggregating the data by glucose and cardio status
-        distribution = (
-            self.data
-            .pivot_table(index="gluc", columns="cardio", aggfunc="size", fill_value=0)
-            .reset_index()
-            .rename(columns={0: "num_healthy_people", 1: "num_sick_people"})
-        )
-
-        # Convert the DataFrame to a list of dictionaries
-        chart_data = distribution.to_dict(orient="records")
+        # Marginalize the count cube by glucose and cardio status
+        chart_data = self._cardio_breakdown("gluc")
 
         return ChartData(
             chart_type="box",
@@ -437,41 +830,76 @@ class CardioService:
             data=chart_data
         )
 
-    def get_blood_pressure_correlation_chart(self) -> ChartData:
+    @_population_artifact
+    def get_blood_pressure_correlation_chart(
+        self,
+        layout: Layout = Layout.ROWS,
+    ) -> Union[ChartData, ColumnarChartData]:
         """
         Get blood pressure correlation chart data.
 
+        Args:
+            layout: Layout of the chart data
+
         Returns:
-            ChartData: Blood pressure correlation chart data.
+            ChartData: Blood pressure correlation chart data, or ColumnarChartData in the columnar layout.
         """
-        if self.data is None:
-            self.load_data()
-
-        # Sample data for the scatter plot (to avoid too many points)
-        sample_data = self.data.sample(n=min(5000, len(self.data)), random_state=42)
+        # Use the shared sample (to avoid too many points)
+        sample = self._scatter_sample()
 
         # Calculate correlation coefficient
-        correlation = sample_data['ap_hi'].corr(sample_data['ap_lo'])
-        correlation_rounded = round(correlation, 2)
-
-        # Convert to list of dictionaries for the chart
-        chart_data = []
-        for _, row in sample_data.iterrows():
-            chart_data.append({
-                'ap_hi': int(row['ap_hi']),
-                'ap_lo': int(row['ap_lo']),
-                'cardio': int(row['cardio'])
-            })
-
-        return ChartData(
+        with np.errstate(invalid='ignore', divide='ignore'):
+            correlation = np.corrcoef(sample['ap_hi'].astype(np.float64), sample['ap_lo'].astype(np.float64))[0, 1]
+        correlation_rounded = round(float(correlation), 2)
+
+        # Build the chart from the sample
+        return _chart(
+            sample,
+            ['ap_hi', 'ap_lo', 'cardio'],
+            layout,
             chart_type="scatter",
             title="Corrélation entre pression systolique et diastolique",
             description=f"Ce nuage de points montre la relation entre la pression artérielle systolique (ap_hi) et la pression diastolique (ap_lo) pour chaque individu du dataset. La corrélation entre ces deux variables est de {correlation_rounded}.",
             x_label="Pression Systolique",
             y_label="Pression Diastolique",
-            data=chart_data
         )
 
+    @_population_artifact
+    def get_blood_pressure_correlation_density_chart(
+        self,
+        bins: int = DEFAULT_DENSITY_BINS,
+        layout: Layout = Layout.ROWS,
+    ) -> Union[ChartData, ColumnarChartData]:
+        """
+        Get blood pressure correlation density chart data.
+
+        Args:
+            bins: Number of cells per axis
+            layout: Layout of the chart data
+
+        Returns:
+            ChartData: Blood pressure correlation density chart data over every record, or ColumnarChartData in the columnar layout.
+        """
+        # Calculate correlation coefficient over every record
+        with np.errstate(invalid='ignore', divide='ignore'):
+            correlation = np.corrcoef(
+                self.columns['ap_hi'].astype(np.float64), self.columns['ap_lo'].astype(np.float64)
+            )[0, 1]
+        correlation_rounded = round(float(correlation), 2)
+
+        density = self._density_columns('ap_hi', 'ap_lo', bins)
+        return _chart(
+            density,
+            list(density),
+            layout,
+            chart_type="density",
+            title="Corrélation entre pression systolique et diastolique",
+            description=f"Ce graphique de densité compte, sur une grille de {bins}x{bins} cases, les individus du dataset selon leur pression artérielle systolique (ap_hi) et diastolique (ap_lo). La corrélation entre ces deux variables est de {correlation_rounded}.",
+            x_label="Pression Systolique",
+            y_label="Pression Diastolique",
+        )
+
+    @_population_artifact
     def get_risk_factors_radar_chart(self) -> ChartData:
         """
         Get risk factors radar chart data.
@@ -479,15 +907,12 @@ class CardioService:
         Returns:
             ChartData: Risk factors radar chart data.
         """
-        if self.data is None:
-            self.load_data()
-
         # Calculate average values for main risk factors
-        avg_age = float(self.data['age'].mean())
-        avg_imc = float(self.data['IMC'].mean())
-        avg_ap_hi = float(self.data['ap_hi'].mean())
-        avg_cholesterol = float(self.data['cholesterol'].mean())
-        avg_gluc = float(self.data['gluc'].mean())
+        avg_age = self._mean('age')
+        avg_imc = self._mean('IMC')
+        avg_ap_hi = self._mean('ap_hi')
+        avg_cholesterol = self._mean('cholesterol')
+        avg_gluc = self._mean('gluc')
 
         # Create data for the radar chart
         chart_data = [
@@ -522,6 +947,7 @@ class CardioService:
             data=chart_data
         )
 
+    @_population_artifact
     def get_all_charts(self) -> List[ChartData]:
         """
         Get all chart data.
@@ -543,20 +969,122 @@ class CardioService:
             self.get_risk_factors_radar_chart()
         ]
 
-    def get_complete_dataset(self) -> Dataset:
+    def _fields(self, fields: Optional[List[str]]) -> List[str]:
         """
-        Get the complete dataset.
+        Validate a projection of the dataset columns.
+
+        Args:
+            fields: Requested columns, all columns if None or empty
 
         Returns:
-            Dataset: The complete dataset with all patient records.
+            List of the requested columns, without duplicates
+
+        Raises:
+            ValueError: If a field is unknown
+        """
+        fields = list(dict.fromkeys(fields)) if fields else list(self.columns)
+        unknown = [field for field in fields if field not in self.columns]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return fields
+
+    def export_dataset(
+        self,
+        export_format: ExportFormat = ExportFormat.NDJSON,
+        chunk_size: int = DEFAULT_EXPORT_CHUNK_SIZE,
+        fields: Optional[List[str]] = None,
+    ) -> Iterator[bytes]:
         """
-        if self.data is None:
-            self.load_data()
+        Export the dataset as NDJSON, CSV or binary columns, one chunk at a time.
+
+        Each chunk is encoded from a slice of the store columns, so the memory used
+        by an export does not depend on the number of records. The binary format
+        (see api.utils.binary_columns) copies the column buffers as they are,
+        without converting the values one by one.
 
-        # Convert the DataFrame to a list of dictionaries
-        dataset_records = self.data.to_dict(orient="records")
+        Args:
+            export_format: Encoding of the records
+            chunk_size: Number of records encoded per chunk
+            fields: Columns to include in each record, all columns if None
 
-        return Dataset(
-            data=dataset_records,
-            total_records=len(dataset_records)
+        Yields:
+            bytes: The encoded chunks, starting with the header in CSV and binary formats
+
+        Raises:
+            ValueError: If a field is unknown
+        """
+        fields = self._fields(fields)
+        if export_format == ExportFormat.BINARY:
+            return iter_encoded({field: self.columns[field] for field in fields}, chunk_size)
+
+        # Every value is a plain int or finite float, whose repr is its JSON encoding
+        ndjson_row = "{" + ",".join(f"{json.dumps(field)}:%r" for field in fields) + "}\n"
+
+        def chunks() -> Iterator[bytes]:
+            if export_format == ExportFormat.CSV:
+                yield (",".join(fields) + "\n").encode()
+
+            for start in range(0, len(self.data), chunk_size):
+                rows = zip(*(self.columns[field][start:start + chunk_size].tolist() for field in fields))
+                if export_format == ExportFormat.CSV:
+                    buffer = io.StringIO()
+                    csv.writer(buffer, lineterminator="\n").writerows(rows)
+                    yield buffer.getvalue().encode()
+                else:
+                    yield "".join(ndjson_row % row for row in rows).encode()
+
+        # Fields are validated before the first chunk is requested
+        return chunks()
+
+    def get_complete_dataset(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        layout: Layout = Layout.ROWS,
+    ) -> Union[Dataset, ColumnarDataset]:
+        """
+        Get the complete dataset, or a page of it.
+
+        Pages are slices of the store columns, so only the requested records and
+        fields are converted. The cursor of the next page is bound to the dataset
+        version, which keeps pagination stable while the dataset does not change.
+        In the columnar layout, each column slice is converted to a list as a whole
+        instead of being split into records.
+
+        Args:
+            limit: Maximum number of records to return, all remaining records if None
+            cursor: Cursor returned as next_cursor by the previous page
+            fields: Columns to include in each record, all columns if None
+            layout: Layout of the records
+
+        Returns:
+            Dataset: The complete dataset with all patient records, or ColumnarDataset in the columnar layout.
+
+        Raises:
+            StaleCursorError: If the cursor was issued for another dataset version
+            ValueError: If the cursor is invalid or a field is unknown
+        """
+        fields = self._fields(fields)
+        total_records = len(self.data)
+        start = decode_cursor(cursor, self.store.version) if cursor else 0
+        stop = total_records if limit is None else min(start + limit, total_records)
+
+        page = {field: self.columns[field][start:stop] for field in fields}
+        next_cursor = encode_cursor(stop, self.store.version) if stop < total_records else None
+
+        # The values come straight from the typed store columns, so the models are
+        # built without validating every value again
+        if layout == Layout.COLUMNAR:
+            return ColumnarDataset.model_construct(
+                columns={field: values.tolist() for field, values in page.items()},
+                total_records=total_records,
+                next_cursor=next_cursor
+            )
+
+        # Convert the requested slice of the columns to a list of dictionaries
+        return Dataset.model_construct(
+            data=_records(page, fields),
+            total_records=total_records,
+            next_cursor=next_cursor
         )
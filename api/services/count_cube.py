@@ -0,0 +1,163 @@
+"""
+Count cube.
+
+This module provides a dense count cube over the categorical columns of the
+dataset. The cube is built in a single pass when the dataset is loaded, and every
+categorical chart is then a marginalization of this small array whose cost does
+not depend on the number of records.
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+CUBE_DIMENSIONS = ('age', 'gender', 'cholesterol', 'gluc', 'smoke', 'alco', 'active', 'cardio')
+
+
+class CountCube:
+    """Dense array counting the records of each combination of categorical values."""
+
+    def __init__(self, levels: Dict[str, np.ndarray], counts: np.ndarray):
+        """
+        Initialize the cube.
+
+        Args:
+            levels: Mapping of dimension name to the sorted values of the dimension
+            counts: Array of counts with one axis per dimension, in the order of levels
+        """
+        self.levels = levels
+        self.dimensions = tuple(levels)
+        self.counts = counts
+
+    @classmethod
+    def from_columns(
+        cls,
+        columns: Dict[str, np.ndarray],
+        dimensions: Sequence[str] = CUBE_DIMENSIONS,
+    ) -> "CountCube":
+        """
+        Build the cube from the dataset columns.
+
+        Args:
+            columns: Mapping of column name to column values
+            dimensions: Columns spanning the cube
+
+        Returns:
+            CountCube: The cube counting every combination of the dimension values
+        """
+        levels = {name: np.unique(columns[name]) for name in dimensions}
+        cube = cls(levels, np.zeros(tuple(len(values) for values in levels.values()), dtype=np.int64))
+        cube.counts = cube.count(cube.encode(columns))
+        return cube
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        """Number of levels of each dimension."""
+        return self.counts.shape
+
+    def encode(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Compute the flat cell index of each record.
+
+        Args:
+            columns: Mapping of column name to column values
+
+        Returns:
+            np.ndarray: Index of the cube cell of each record in the flattened cube
+        """
+        codes = [np.searchsorted(self.levels[name], columns[name]) for name in self.dimensions]
+        return np.ravel_multi_index(codes, self.shape)
+
+    def count(self, cells: np.ndarray) -> np.ndarray:
+        """
+        Count records per cell with the levels of this cube.
+
+        Args:
+            cells: Flat cell index of each record, as returned by encode
+
+        Returns:
+            np.ndarray: Array of counts shaped like the cube
+        """
+        return np.bincount(cells, minlength=self.counts.size).reshape(self.shape)
+
+    def merge(self, other: "CountCube") -> "CountCube":
+        """
+        Add the counts of another cube over the same dimensions.
+
+        The levels of the merged cube are the union of the levels of both cubes, so
+        cubes built from different slices of the dataset can be merged.
+
+        Args:
+            other: Cube counting other records
+
+        Returns:
+            CountCube: The cube counting the records of both cubes
+        """
+        levels = {name: np.union1d(self.levels[name], other.levels[name]) for name in self.dimensions}
+        merged = CountCube(levels, np.zeros(tuple(len(values) for values in levels.values()), dtype=np.int64))
+        for cube in (self, other):
+            cells = np.ix_(*(np.searchsorted(levels[name], cube.levels[name]) for name in self.dimensions))
+            merged.counts[cells] += cube.counts
+        return merged
+
+    def select(self, bounds: Dict[str, Tuple[Optional[float], Optional[float]]]) -> "CountCube":
+        """
+        Restrict the cube to the cells within bounds.
+
+        Args:
+            bounds: Mapping of dimension name to inclusive (low, high) bounds, None for no bound
+
+        Returns:
+            CountCube: The cube with the same levels, counting the records of the selected cells only
+
+        Raises:
+            KeyError: If a bounded column is not a dimension of the cube
+        """
+        unknown = set(bounds) - set(self.dimensions)
+        if unknown:
+            raise KeyError(f"Not a dimension of the cube: {', '.join(sorted(unknown))}")
+        counts = self.counts
+        for name, (low, high) in bounds.items():
+            values = self.levels[name]
+            selected = np.ones(len(values), dtype=bool)
+            if low is not None:
+                selected &= values >= low
+            if high is not None:
+                selected &= values <= high
+            shape = [1] * len(self.dimensions)
+            shape[self.dimensions.index(name)] = len(values)
+            counts = counts * selected.reshape(shape)
+        return CountCube(self.levels, counts)
+
+    def margin(self, *dimensions: str) -> np.ndarray:
+        """
+        Sum the cube over every dimension but the given ones.
+
+        Args:
+            dimensions: Dimensions to keep, in the order of the returned axes
+
+        Returns:
+            np.ndarray: Counts per combination of the kept dimensions
+        """
+        axes = [self.dimensions.index(name) for name in dimensions]
+        others = tuple(axis for axis in range(len(self.dimensions)) if axis not in axes)
+        kept = self.counts.sum(axis=others)
+        return np.transpose(kept, [sorted(axes).index(axis) for axis in axes])
+
+    def breakdown(self, dimension: str, by: str = 'cardio') -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cross-tabulate a dimension against another one.
+
+        Levels of the dimension without any record are left out, as a pivot table
+        of the records would do.
+
+        Args:
+            dimension: Dimension indexing the rows of the table
+            by: Dimension indexing the columns of the table
+
+        Returns:
+            Tuple of the row levels and the table of counts
+        """
+        table = self.margin(dimension, by)
+        present = table.sum(axis=1) > 0
+        return self.levels[dimension][present], table[present]
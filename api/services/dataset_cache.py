@@ -0,0 +1,137 @@
+"""
+Dataset cache.
+
+This module persists the preprocessed dataset as a binary columnar cache so that
+workers can start without parsing and preprocessing the CSV source again. Cached
+columns are memory-mapped read-only, so every worker of a host shares a single
+physical copy of the dataset through the page cache.
+
+A cache entry is a directory holding one ``.npy`` file per column and a
+``manifest.json`` file. Entries are keyed by the SHA-256 digest of the source file
+and the preprocessing version, so any change to either invalidates the cache.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.getenv(
+    "DATASET_CACHE_DIR",
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "dataset",
+        ".cache"
+    )
+)
+
+MANIFEST_FILE = "manifest.json"
+
+
+def source_digest(path: str) -> str:
+    """
+    Compute the SHA-256 digest of a source file.
+
+    Args:
+        path: Path to the source file
+
+    Returns:
+        str: Hexadecimal digest of the file content
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _entry_prefix(path: str) -> str:
+    # Entries are scoped to the source location so that sources sharing a file name do not evict each other
+    location = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:8]
+    return f"{os.path.splitext(os.path.basename(path))[0]}-{location}-"
+
+
+def _entry_dir(path: str, key: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, _entry_prefix(path) + key)
+
+
+def read_cache(path: str, key: str, cache_dir: Optional[str] = None) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Read the cached columns of a source file as read-only memory-mapped arrays.
+
+    Args:
+        path: Path to the source file
+        key: Cache key of the source (digest and preprocessing version)
+        cache_dir: Directory holding the cache entries, defaults to CACHE_DIR
+
+    Returns:
+        Dict mapping column names to their values, or None if the entry is missing or invalid
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    entry = _entry_dir(path, key, cache_dir)
+    try:
+        with open(os.path.join(entry, MANIFEST_FILE)) as manifest_file:
+            manifest = json.load(manifest_file)
+        if manifest["key"] != key:
+            return None
+
+        columns = {}
+        for column in manifest["columns"]:
+            values = np.load(os.path.join(entry, column["file"]), mmap_mode="r", allow_pickle=False)
+            if len(values) != manifest["rows"] or values.dtype.str != column["dtype"]:
+                return None
+            columns[column["name"]] = values
+        return columns
+    except (OSError, ValueError, KeyError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logger.warning("Ignoring invalid dataset cache entry %s: %s", entry, e)
+        return None
+
+
+def write_cache(path: str, key: str, columns: Dict[str, np.ndarray], cache_dir: Optional[str] = None) -> None:
+    """
+    Write the preprocessed columns of a source file to the cache.
+
+    The entry is written to a temporary directory and renamed into place, so that
+    concurrent workers never read a partially written entry. Entries of older
+    versions of the same source are removed.
+
+    Args:
+        path: Path to the source file
+        key: Cache key of the source (digest and preprocessing version)
+        columns: Mapping of column names to their values
+        cache_dir: Directory holding the cache entries, defaults to CACHE_DIR
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    entry = _entry_dir(path, key, cache_dir)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=cache_dir)
+        manifest = {"key": key, "rows": 0, "columns": []}
+        for position, (name, values) in enumerate(columns.items()):
+            file_name = f"{position:02d}.npy"
+            np.save(os.path.join(staging, file_name), np.ascontiguousarray(values), allow_pickle=False)
+            manifest["rows"] = len(values)
+            manifest["columns"].append({"name": name, "dtype": values.dtype.str, "file": file_name})
+        with open(os.path.join(staging, MANIFEST_FILE), "w") as manifest_file:
+            json.dump(manifest, manifest_file)
+
+        try:
+            os.rename(staging, entry)
+        except OSError:
+            # Another worker published the same entry first
+            shutil.rmtree(staging, ignore_errors=True)
+
+        for name in os.listdir(cache_dir):
+            stale = os.path.join(cache_dir, name)
+            if name.startswith(_entry_prefix(path)) and stale != entry:
+                shutil.rmtree(stale, ignore_errors=True)
+    except OSError as e:
+        logger.warning("Could not write dataset cache entry %s: %s", entry, e)
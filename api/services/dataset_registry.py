@@ -0,0 +1,159 @@
+"""
+Dataset registry.
+
+This module provides the registry of the dataset versions served side by side,
+such as the records of one hospital or one quarter. Each version is a
+semicolon-separated file of the registry directory, named after the file without
+its extension. Versions are loaded on first use and kept resident within a memory
+budget, the least recently used ones being evicted first; the default dataset is
+the process-wide store (see get_dataset_store) and is never evicted.
+"""
+
+import logging
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Union
+
+from api.services.dataset_store import DATASET_PATH, OUT_OF_CORE, DatasetStore, DatasetSummary, get_dataset_store
+from api.utils.lru import SizedLRUCache
+
+logger = logging.getLogger(__name__)
+
+# Directory holding the registered datasets, one file per dataset
+DATASET_REGISTRY_DIR = os.getenv("DATASET_REGISTRY_DIR", os.path.dirname(DATASET_PATH))
+
+# Memory budget of the registered datasets kept resident, besides the default one
+DATASET_REGISTRY_MAX_BYTES = int(os.getenv("DATASET_REGISTRY_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# Name of the dataset served when none is selected
+DEFAULT_DATASET = os.path.splitext(os.path.basename(DATASET_PATH))[0]
+
+DATASET_NAME_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]*")
+
+
+class UnknownDatasetError(LookupError):
+    """Raised when no registered dataset has the requested name."""
+
+
+class DatasetRegistry:
+    """Registry loading datasets lazily and keeping the recently used ones resident."""
+
+    def __init__(
+        self,
+        directory: str = DATASET_REGISTRY_DIR,
+        max_bytes: int = DATASET_REGISTRY_MAX_BYTES,
+        default: str = DEFAULT_DATASET,
+    ):
+        """
+        Initialize the registry.
+
+        Args:
+            directory: Directory holding the registered datasets
+            max_bytes: Memory budget of the resident datasets, in bytes
+            default: Name of the dataset served by the process-wide store
+        """
+        self.directory = directory
+        self.default = default
+        self.loads = 0
+        self.cache = SizedLRUCache(max_bytes, sizeof=lambda store: store.footprint_bytes)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def is_default(self, name: Optional[str]) -> bool:
+        """
+        Check whether a name selects the default dataset.
+
+        Args:
+            name: Name of a dataset, None for the default one
+
+        Returns:
+            bool: True if the name is None or the one of the default dataset
+        """
+        return name is None or name == self.default
+
+    def names(self) -> List[str]:
+        """
+        List the registered datasets.
+
+        Returns:
+            List of the names of the registered datasets, sorted
+        """
+        names = {self.default}
+        if os.path.isdir(self.directory):
+            names.update(
+                os.path.splitext(entry)[0] for entry in os.listdir(self.directory)
+                if entry.endswith(".csv") and DATASET_NAME_PATTERN.fullmatch(os.path.splitext(entry)[0])
+            )
+        return sorted(names)
+
+    def path(self, name: str) -> str:
+        """
+        Get the source file of a registered dataset.
+
+        Args:
+            name: Name of the dataset
+
+        Returns:
+            str: Path of the file holding the dataset
+
+        Raises:
+            UnknownDatasetError: If no file of the registry directory holds a dataset with this name
+        """
+        path = os.path.join(self.directory, f"{name}.csv")
+        if not DATASET_NAME_PATTERN.fullmatch(name) or not os.path.isfile(path):
+            raise UnknownDatasetError(f"Unknown dataset {name!r}, expected one of: {', '.join(self.names())}")
+        return path
+
+    def get(self, name: Optional[str] = None) -> Union[DatasetStore, DatasetSummary]:
+        """
+        Get a dataset, loading it on first use.
+
+        Concurrent requests for a dataset that is not resident wait for a single
+        load. A dataset larger than the whole budget is loaded for the request but
+        not kept resident.
+
+        Args:
+            name: Name of the dataset, None for the default one
+
+        Returns:
+            Union[DatasetStore, DatasetSummary]: The store of the dataset
+
+        Raises:
+            UnknownDatasetError: If no registered dataset has this name
+        """
+        if self.is_default(name):
+            return get_dataset_store()
+        if name in self.cache:
+            store = self.cache.get(name)
+            if store is not None:
+                return store
+
+        path = self.path(name)
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            store = self.cache.get(name)
+            if store is None:
+                store = DatasetSummary.load(path) if OUT_OF_CORE else DatasetStore.load(path)
+                self.loads += 1
+                logger.info(
+                    "Loaded dataset %s: %d records from %s in %.3fs (%d bytes)",
+                    name, len(store), path, store.load_time, store.footprint_bytes,
+                )
+                if not self.cache.put(name, store):
+                    logger.warning("Dataset %s exceeds the registry budget and is not kept resident", name)
+        return store
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Describe the residency of the registered datasets.
+
+        Returns:
+            Dict containing the number and size of the resident datasets, the budget, and the
+            hits, misses, evictions and loads
+        """
+        return {**self.cache.stats(), 'loads': self.loads}
+
+
+registry = DatasetRegistry()
@@ -0,0 +1,178 @@
+"""
+Dataset reloader.
+
+This module watches the source file of the dataset and the journal of the
+records appended to it, and reloads them when they change, without restarting
+the worker. The new version is loaded, preprocessed
+and warmed (see Warmup) on a background thread, then published with a single
+reference swap (see replace_store): requests already running finish on the
+previous snapshot, the next ones read the new one, and no request waits for the
+reload.
+"""
+
+import logging
+import os
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from api.services.dataset_store import (
+    DATASET_PATH, OUT_OF_CORE, DatasetStore, DatasetSummary, get_dataset_store, journal_path, replace_store
+)
+from api.services.warmup import Warmup
+
+logger = logging.getLogger(__name__)
+
+# Number of seconds between two checks of the source file, 0 to disable the reloads
+DATASET_RELOAD_INTERVAL = float(os.getenv("DATASET_RELOAD_INTERVAL", "0"))
+
+Signature = Optional[Tuple[int, int]]
+
+
+def file_signature(path: str) -> Signature:
+    """
+    Get the modification time and size of a file.
+
+    Args:
+        path: Path of the file
+
+    Returns:
+        Tuple of the modification time in nanoseconds and the size in bytes, None if the file is missing
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def dataset_signature(path: str) -> Optional[Tuple[Signature, Signature]]:
+    """
+    Get the signatures of a source file and of the journal of its appended records.
+
+    Args:
+        path: Path of the source file
+
+    Returns:
+        Tuple of the signatures of the source file and its journal, None if the source file is missing
+    """
+    signature = file_signature(path)
+    if signature is None:
+        return None
+    return signature, file_signature(journal_path(path))
+
+
+class DatasetReloader:
+    """Watcher reloading the process-wide dataset store when its source file or journal changes."""
+
+    def __init__(self, path: str = DATASET_PATH, interval: float = DATASET_RELOAD_INTERVAL):
+        """
+        Initialize the reloader.
+
+        Args:
+            path: Path of the watched source file
+            interval: Number of seconds between two checks of the file
+        """
+        self.path = path
+        self.interval = interval
+        self.checks = 0
+        self.reloads = 0
+        self.failures = 0
+        self._signature = dataset_signature(path)
+        self._pending: Optional[Tuple[Signature, Signature]] = None
+        self._on_reload: Optional[Callable[[Warmup], None]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check(self) -> bool:
+        """
+        Check the source file and its journal, and reload them if they changed.
+
+        A change is only reloaded once the file is left unchanged for a whole
+        interval, so that a file being copied is not read half-written.
+
+        Returns:
+            bool: True if a new version of the dataset was published
+        """
+        self.checks += 1
+        signature = dataset_signature(self.path)
+        if signature is None or signature == self._signature:
+            self._pending = None
+            return False
+        if signature != self._pending:
+            self._pending = signature
+            return False
+
+        self._signature, self._pending = signature, None
+        return self.reload()
+
+    def reload(self) -> bool:
+        """
+        Load, warm and publish the source file and its journal.
+
+        The store is warmed before it is published. It is not published if the
+        source file or its journal changed while it was loaded and warmed, for
+        instance by records appended by this worker: the next check reloads them
+        again.
+
+        Errors are logged and counted rather than raised, and leave the current
+        store in place.
+
+        Returns:
+            bool: True if a new version of the dataset was published
+        """
+        try:
+            signature = dataset_signature(self.path)
+            store = DatasetSummary.load(self.path) if OUT_OF_CORE else DatasetStore.load(self.path)
+            if store.version == get_dataset_store().version:
+                logger.info("Dataset source %s changed without changing its content", self.path)
+                return False
+            warmup = Warmup(store)
+            warmup.run()
+            if not replace_store(store, lambda: dataset_signature(self.path) == signature):
+                logger.info("Dataset source %s changed while it was reloaded", self.path)
+                return False
+        except Exception:
+            self.failures += 1
+            logger.exception("Failed to reload the dataset from %s", self.path)
+            return False
+
+        self.reloads += 1
+        logger.info("Reloaded %d records from %s, now version %s", len(store), self.path, store.version)
+        if self._on_reload is not None:
+            self._on_reload(warmup)
+        return True
+
+    def start(self, on_reload: Optional[Callable[[Warmup], None]] = None) -> None:
+        """
+        Start watching the source file on a background thread.
+
+        Args:
+            on_reload: Function called with the warm-up of each published version
+        """
+        self._on_reload = on_reload
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="dataset-reloader", daemon=True)
+        self._thread.start()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def stop(self) -> None:
+        """Stop watching the source file."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Describe the reloads.
+
+        Returns:
+            Dict containing the number of checks of the source file and its journal, reloads and failed reloads
+        """
+        return {'checks': self.checks, 'reloads': self.reloads, 'failures': self.failures}
+
+
+reloader = DatasetReloader()
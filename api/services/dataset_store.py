@@ -0,0 +1,858 @@
+"""
+Dataset store.
+
+This module provides the process-wide, read-only store holding the preprocessed
+cardiovascular disease dataset shared by every request of a worker.
+"""
+
+import hashlib
+import itertools
+import logging
+import os
+import threading
+import time
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+from api.services import dataset_cache
+from api.services.bitmap_index import RANGE_COLUMNS, BitmapIndex
+from api.services.count_cube import CountCube
+from api.services.dataset_cache import read_cache, source_digest, write_cache
+from api.services.moments import MomentCube, Moments, ValueCounts
+from api.services.quantile_sketch import QuantileSketch
+
+logger = logging.getLogger(__name__)
+
+DATASET_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "dataset",
+    "cardio_train.csv"
+)
+
+# Bump whenever preprocess() or compact_columns() changes so that cached datasets are rebuilt
+PREPROCESSING_VERSION = 2
+
+# Store the BMI as float32 instead of float64, trading exactness for memory
+IMC_FLOAT32 = os.getenv("DATASET_IMC_FLOAT32", "False").lower() in ("true", "1", "t")
+
+# Summarize the dataset chunk by chunk instead of holding its records in memory
+OUT_OF_CORE = os.getenv("DATASET_OUT_OF_CORE", "False").lower() in ("true", "1", "t")
+
+# Number of source rows read per chunk by the out-of-core mode
+CHUNK_SIZE = int(os.getenv("DATASET_CHUNK_SIZE", "100000"))
+
+# Directory holding the journals of the records appended to the datasets, defaults to DATASET_CACHE_DIR
+JOURNAL_DIR = os.getenv("DATASET_JOURNAL_DIR")
+
+INTEGER_DTYPES = (np.int8, np.int16, np.int32, np.int64)
+
+
+def preprocess(raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    Preprocess a raw slice of the cardio dataset.
+
+    The following preprocessing steps are applied:
+    1. Removes the 'id' column
+    2. Converts age from days to years
+    3. Creates a BMI feature from height and weight
+    4. Removes height and weight columns
+    5. Filters out outliers in blood pressure and BMI
+
+    Args:
+        raw: DataFrame read from the semicolon-separated source file
+
+    Returns:
+        pd.DataFrame: The preprocessed DataFrame
+    """
+    data = raw.drop(columns=['id'])
+
+    data['age'] = (data['age'] / 365.25).astype(int)
+    return derive_features(data)
+
+
+def derive_features(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Derive the BMI of records and filter out outliers (steps 3 to 5 of preprocess).
+
+    Args:
+        data: DataFrame of records with their age in years, height and weight
+
+    Returns:
+        pd.DataFrame: The records with a BMI, without height and weight, and without outliers
+    """
+    data = data.assign(IMC=data['weight'] / (data['height'] / 100) ** 2)
+    data = data.drop(columns=['weight', 'height'])
+
+    data = data[(data['ap_hi'] >= 90) & (data['ap_hi'] <= 200)]
+    data = data[(data['ap_lo'] >= 60) & (data['ap_lo'] <= 140)]
+    data = data[(data['IMC'] >= 10) & (data['IMC'] <= 80)]
+    return data
+
+
+def compact_columns(columns: Dict[str, np.ndarray], imc_float32: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Convert preprocessed columns to the narrowest dtype holding their values exactly.
+
+    Integer columns are narrowed to the smallest signed integer dtype covering their
+    range (int8 for the categorical columns and age, int16 for blood pressures).
+    Float columns keep float64 unless imc_float32 is set, in which case the BMI is
+    stored as float32.
+
+    Args:
+        columns: Mapping of column name to column values
+        imc_float32: Whether to store the BMI as float32
+
+    Returns:
+        Dict mapping column names to their compacted values
+    """
+    compacted = {}
+    for name, values in columns.items():
+        if np.issubdtype(values.dtype, np.integer):
+            low, high = (int(values.min()), int(values.max())) if len(values) else (0, 0)
+            dtype = next(
+                dtype for dtype in INTEGER_DTYPES
+                if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max
+            )
+            compacted[name] = values.astype(dtype)
+        elif name == 'IMC' and imc_float32:
+            compacted[name] = values.astype(np.float32)
+        else:
+            compacted[name] = values
+    return compacted
+
+
+def journal_path(path: str) -> str:
+    """
+    Get the journal of the records appended to a source file.
+
+    The source file is left unchanged by the appends: the records are written to
+    the journal, in the layout of the source, and read after it by every load.
+
+    Args:
+        path: Path to the source file
+
+    Returns:
+        str: Path of the journal, in DATASET_JOURNAL_DIR or else DATASET_CACHE_DIR
+    """
+    location = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:8]
+    name = f"{os.path.splitext(os.path.basename(path))[0]}-{location}.journal.csv"
+    return os.path.join(JOURNAL_DIR or dataset_cache.CACHE_DIR, name)
+
+
+def read_journal(path: str, **kwargs: Any) -> Union[pd.DataFrame, Iterator[pd.DataFrame], None]:
+    """
+    Read the journal of the records appended to a source file.
+
+    Args:
+        path: Path to the source file
+        kwargs: Options of pandas.read_csv, such as chunksize
+
+    Returns:
+        The raw records of the journal as read_csv returns them, None if no record was appended
+    """
+    journal = journal_path(path)
+    if not os.path.isfile(journal):
+        return None
+    return pd.read_csv(journal, sep=';', header=0, **kwargs)
+
+
+def append_to_journal(path: str, data: pd.DataFrame) -> None:
+    """
+    Append raw records to the journal of a semicolon-separated source file.
+
+    The records are written in the layout of the source (age in days, booleans as
+    0 and 1) with ids following the last one of the source and journal, so that
+    preprocessing the journal yields them again. The journal is locked while it is
+    written, so that the workers of a host appending at the same time neither
+    interleave their rows nor reuse ids.
+
+    Args:
+        path: Path to the source file
+        data: DataFrame of records with their age in years, height and weight
+    """
+    journal = journal_path(path)
+    os.makedirs(os.path.dirname(journal), exist_ok=True)
+    with open(journal, 'a+b') as log:
+        if fcntl is not None:
+            fcntl.flock(log, fcntl.LOCK_EX)
+        if log.seek(0, os.SEEK_END) == 0:
+            with open(path, 'rb') as source:
+                header = source.readline()
+                source.seek(max(0, source.seek(0, os.SEEK_END) - 4096))
+                tail = source.read()
+            log.write(header if header.endswith(b'\n') else header + b'\n')
+        else:
+            log.seek(0)
+            header = log.readline()
+            log.seek(max(0, log.seek(0, os.SEEK_END) - 4096))
+            tail = log.read()
+        try:
+            last_id = int(tail.rstrip().rsplit(b'\n', 1)[-1].split(b';', 1)[0])
+        except ValueError:
+            # The file holds no record yet, its last line is the header
+            last_id = -1
+
+        rows = data.assign(
+            id=np.arange(last_id + 1, last_id + 1 + len(data)),
+            age=np.ceil(data['age'] * 365.25).astype(np.int64),
+        )
+        rows = rows.astype({name: np.int64 for name in rows.columns if rows[name].dtype == bool})
+        text = rows[header.decode().strip().split(';')].to_csv(
+            sep=';', header=False, index=False, lineterminator='\n'
+        )
+        log.write(text.encode())
+
+
+class RecordsUnavailableError(RuntimeError):
+    """Raised when an analysis needs the records of a dataset summarized out of core."""
+
+
+class UnavailableRecords(Mapping):
+    """Stand-in for the records of a dataset summarized out of core, raising RecordsUnavailableError on any use."""
+
+    def _unavailable(self) -> RecordsUnavailableError:
+        return RecordsUnavailableError(
+            "This analysis needs the dataset records, which are not held in memory in out-of-core mode"
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        raise self._unavailable()
+
+    def __getitem__(self, key: Any) -> Any:
+        raise self._unavailable()
+
+    def __iter__(self) -> Iterator[str]:
+        raise self._unavailable()
+
+    def __len__(self) -> int:
+        raise self._unavailable()
+
+
+class Snapshot:
+    """Version of a dataset, memoizing the values derived from it."""
+
+    def __init__(self):
+        """Initialize the memoized values."""
+        self._memo: Dict[Hashable, Any] = {}
+        self._memo_locks: Dict[Hashable, threading.Lock] = {}
+        self._memo_lock = threading.Lock()
+
+    def memoize(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Get a value derived from the dataset, computing it on first use.
+
+        Concurrent callers asking for the same key wait for a single computation,
+        while different keys are computed in parallel.
+
+        Args:
+            key: Key identifying the derived value
+            factory: Function computing the value
+
+        Returns:
+            The memoized value
+        """
+        if key in self._memo:
+            return self._memo[key]
+
+        with self._memo_lock:
+            key_lock = self._memo_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._memo:
+                self._memo[key] = factory()
+        return self._memo[key]
+
+
+class DatasetStore(Snapshot):
+    """
+    Read-only snapshot of the preprocessed dataset.
+
+    A store is built once per worker and shared by every request. Its columns are
+    flagged as non-writeable so that no request can alter what others read. When the
+    binary cache is available, the columns are memory-mapped views of the cache
+    files and ``data`` is a zero-copy DataFrame over them. Aggregates shared by the
+    categorical charts (the count cube), the moments and quantile sketches of the
+    numeric columns, their moments per cell of the count cube (the moment cube) and
+    the indexes used to select cohorts are computed once when the store is built,
+    and other derived values are memoized with the store (see memoize), so they
+    live exactly as long as the dataset version they are derived from.
+
+    Records are added by building a new store (see append), whose aggregates and
+    indexes are updated from the ones of this store rather than recomputed.
+    """
+
+    def __init__(
+        self,
+        columns: Dict[str, np.ndarray],
+        source: str,
+        version: str,
+        load_time: float,
+        from_cache: bool = False,
+        appended_records: int = 0,
+        cube: Optional[CountCube] = None,
+        cells: Optional[np.ndarray] = None,
+        index: Optional[BitmapIndex] = None,
+        moments: Optional[Moments] = None,
+        sketches: Optional[Dict[str, QuantileSketch]] = None,
+        moment_cube: Optional[MomentCube] = None,
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            columns: Mapping of column name to column values
+            source: Path of the file the dataset was loaded from
+            version: Identifier of the dataset content and preprocessing version
+            load_time: Time spent loading the dataset, in seconds
+            from_cache: Whether the columns were read from the binary cache
+            appended_records: Number of records appended after loading the source file
+            cube: Count cube of the columns, computed when not given
+            cells: Cell of the count cube of each record, computed when not given
+            index: Indexes of the columns, computed when not given
+            moments: Moments of the columns, computed when not given
+            sketches: Quantile sketch of each range column, computed when not given
+            moment_cube: Moments of the columns per cell of the count cube, computed when not given
+        """
+        super().__init__()
+        for values in columns.values():
+            values.setflags(write=False)
+
+        self.columns = columns
+        self.source = source
+        self.version = version
+        self.load_time = load_time
+        self.from_cache = from_cache
+        self.appended_records = appended_records
+        self.loaded_at = time.time()
+        self.data = pd.DataFrame(columns, copy=False)
+        self.cube = CountCube.from_columns(columns) if cube is None else cube
+        self.cells = self.cube.encode(columns) if cells is None else cells
+        self.index = BitmapIndex(columns) if index is None else index
+        self.moments = Moments.from_columns(columns) if moments is None else moments
+        self.sketches = sketches if sketches is not None else {
+            name: QuantileSketch.from_values(columns[name]) for name in RANGE_COLUMNS
+        }
+        self.moment_cube = (
+            MomentCube.from_cells(self.cube.levels, self.cells, columns) if moment_cube is None else moment_cube
+        )
+
+    @classmethod
+    def load(
+        cls,
+        path: str = DATASET_PATH,
+        cache_dir: Optional[str] = None,
+        imc_float32: Optional[bool] = None,
+    ) -> "DatasetStore":
+        """
+        Load the dataset, from the binary cache when it matches the source file.
+
+        The CSV source is only parsed and preprocessed when the cache holds no entry
+        for its content and the current preprocessing version, in which case the
+        entry is written and mapped back, so that the process does not keep a
+        private copy of the columns. The records of the journal of the source (see
+        append_to_journal) are then preprocessed and appended to the store.
+
+        Args:
+            path: Path to the semicolon-separated dataset file
+            cache_dir: Directory holding the binary cache, defaults to DATASET_CACHE_DIR
+            imc_float32: Whether to store the BMI as float32, defaults to DATASET_IMC_FLOAT32
+
+        Returns:
+            DatasetStore: The loaded store
+
+        Raises:
+            ValueError: If the file holds no record
+        """
+        start = time.perf_counter()
+        imc_float32 = IMC_FLOAT32 if imc_float32 is None else imc_float32
+        version = f"{source_digest(path)[:16]}-v{PREPROCESSING_VERSION}"
+        if imc_float32:
+            version += "-f32"
+
+        columns = read_cache(path, version, cache_dir)
+        from_cache = columns is not None
+        if columns is None:
+            raw = pd.read_csv(path, sep=';', header=0)
+            if raw.empty:
+                raise ValueError(f"The dataset file {path} holds no record")
+            data = preprocess(raw)
+            columns = compact_columns({name: data[name].to_numpy() for name in data.columns}, imc_float32)
+            write_cache(path, version, columns, cache_dir)
+            columns = read_cache(path, version, cache_dir) or columns
+
+        store = cls(columns, source=path, version=version, load_time=0.0, from_cache=from_cache)
+        journal = read_journal(path)
+        if journal is not None:
+            data = preprocess(journal)
+            store = store.append({name: data[name].to_numpy() for name in data.columns})
+        store.load_time = time.perf_counter() - start
+        return store
+
+    def append(self, columns: Dict[str, np.ndarray]) -> "DatasetStore":
+        """
+        Build the store of the dataset followed by preprocessed records.
+
+        This store is left unchanged, so that requests reading it are not affected.
+        The count cube, the moments, the quantile sketches, the moment cube and the
+        indexes of the new store are updated with the appended records only; the
+        cubes are rebuilt when the records bring a categorical value they do not hold.
+
+        Args:
+            columns: Mapping of every column name to the values of the appended records
+
+        Returns:
+            DatasetStore: The store holding the records of this store and the appended ones
+        """
+        start = time.perf_counter()
+        appended = {}
+        for name, values in self.columns.items():
+            new_values = np.asarray(columns[name])
+            if np.issubdtype(values.dtype, np.floating):
+                appended[name] = new_values.astype(values.dtype)
+            else:
+                appended[name] = compact_columns({name: new_values.astype(np.int64)})[name]
+        count = len(appended[next(iter(appended))])
+        if count == 0:
+            return self
+        combined = {name: np.concatenate([values, appended[name]]) for name, values in self.columns.items()}
+
+        if all(np.isin(appended[name], self.cube.levels[name]).all() for name in self.cube.dimensions):
+            appended_cells = self.cube.encode(appended)
+            cube = CountCube(self.cube.levels, self.cube.counts + self.cube.count(appended_cells))
+            cells = np.concatenate([self.cells, appended_cells])
+            moment_cube = self.moment_cube.merge(MomentCube.from_cells(cube.levels, appended_cells, appended))
+        else:
+            cube = CountCube.from_columns(combined)
+            cells = cube.encode(combined)
+            moment_cube = MomentCube.from_cells(cube.levels, cells, combined)
+
+        # The version depends on the appended records only, not on how many appends brought them
+        total = self.appended_records + count
+        base = self.version.split('+')[0]
+        digest = hashlib.sha256(base.encode())
+        for name in combined:
+            digest.update(name.encode() + np.ascontiguousarray(combined[name][-total:]).tobytes())
+        store = DatasetStore(
+            combined,
+            source=self.source,
+            version=f"{base}+{digest.hexdigest()[:12]}",
+            load_time=self.load_time,
+            appended_records=total,
+            cube=cube,
+            cells=cells,
+            index=self.index.extend(appended),
+            moments=self.moments.merge(Moments.from_columns(appended)),
+            sketches={
+                name: sketch.merge(QuantileSketch.from_values(appended[name]))
+                for name, sketch in self.sketches.items()
+            },
+            moment_cube=moment_cube,
+        )
+        logger.info(
+            "Appended %d records to dataset %s in %.3fs, now version %s",
+            count, self.version, time.perf_counter() - start, store.version,
+        )
+        return store
+
+    @property
+    def memory_bytes(self) -> int:
+        """Number of bytes held by the dataset columns."""
+        return int(sum(values.nbytes for values in self.columns.values()))
+
+    @property
+    def footprint_bytes(self) -> int:
+        """
+        Number of bytes held by the columns and every structure derived from them.
+
+        The records share the memory of the columns. The analyses memoized with the
+        store are not counted, as they are computed after it is loaded.
+        """
+        sketches = sum(sketch.nbytes for sketch in self.sketches.values())
+        return int(
+            self.memory_bytes + self.index.memory_bytes + self.cells.nbytes + self.cube.counts.nbytes
+            + self.moments.nbytes + self.moment_cube.nbytes + sketches
+        )
+
+    @property
+    def original_memory_bytes(self) -> int:
+        """Number of bytes the columns would hold with the int64/float64 dtypes produced by pandas."""
+        return int(sum(len(values) * 8 for values in self.columns.values()))
+
+    @property
+    def memory_mapped(self) -> bool:
+        """Whether the columns are memory-mapped from the binary cache."""
+        return all(isinstance(values, np.memmap) for values in self.columns.values())
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def median(self, column: str) -> float:
+        """
+        Get the median of a numeric column.
+
+        Args:
+            column: Column of the range indexes
+
+        Returns:
+            float: The median of the column
+        """
+        return self.index.median(column)
+
+    def quantiles(self, column: str, fractions: Sequence[float], exact: bool = False) -> List[float]:
+        """
+        Get quantiles of a numeric column.
+
+        Args:
+            column: Column of the range indexes
+            fractions: Fractions of the records, between 0 and 1
+            exact: Whether to compute the quantiles from the range index rather than the sketch
+
+        Returns:
+            List of the quantiles of the column
+        """
+        if exact:
+            return self.index.quantiles(column, fractions)
+        return self.sketches[column].quantiles(fractions)
+
+    def info(self) -> Dict[str, object]:
+        """
+        Describe the store.
+
+        Returns:
+            Dict containing the source, size, load time and memory footprint of the store
+        """
+        return {
+            'source': self.source,
+            'version': self.version,
+            'from_cache': self.from_cache,
+            'out_of_core': False,
+            'total_records': len(self),
+            'appended_records': self.appended_records,
+            'columns': list(self.columns),
+            'dtypes': {name: values.dtype.name for name, values in self.columns.items()},
+            'load_time': self.load_time,
+            'loaded_at': self.loaded_at,
+            'memory_bytes': self.memory_bytes,
+            'footprint_bytes': self.footprint_bytes,
+            'original_memory_bytes': self.original_memory_bytes,
+            'memory_mapped': self.memory_mapped,
+            'load_count': _load_count,
+            'pid': os.getpid(),
+        }
+
+
+class DatasetSummary(Snapshot):
+    """
+    Mergeable aggregates of a dataset whose records are not held in memory.
+
+    The source file is read one chunk at a time, each chunk is preprocessed as the
+    whole file would be, and its aggregates are folded into the summary: the count
+    cube of the categorical columns, the moments of the numeric columns and their
+    moments per cell of the count cube, and the quantile sketches and counts of the
+    distinct values of the range columns. The memory used is bounded by the chunk
+    size and the number of distinct values rather than by the number of records.
+    Analyses reading only these aggregates (statistics, categorical charts,
+    correlation analysis, of the population or of a cohort selected by the cube
+    dimensions) are served as from a DatasetStore; the columns, data, cells and
+    index of a summary raise RecordsUnavailableError when the others use them.
+    """
+
+    def __init__(
+        self,
+        cube: CountCube,
+        moments: Moments,
+        moment_cube: MomentCube,
+        distributions: Dict[str, ValueCounts],
+        sketches: Dict[str, QuantileSketch],
+        source: str,
+        version: str,
+        load_time: float = 0.0,
+        chunks: int = 1,
+    ):
+        """
+        Initialize the summary.
+
+        Args:
+            cube: Count cube of the categorical columns
+            moments: Moments of the numeric columns
+            moment_cube: Moments of the numeric columns per cell of the count cube
+            distributions: Counts of the distinct values of each range column
+            sketches: Quantile sketch of each range column
+            source: Path of the file the dataset was read from
+            version: Identifier of the dataset content and preprocessing version
+            load_time: Time spent reading the dataset, in seconds
+            chunks: Number of chunks folded into the summary
+        """
+        super().__init__()
+        self.cube = cube
+        self.moments = moments
+        self.moment_cube = moment_cube
+        self.distributions = distributions
+        self.sketches = sketches
+        self.source = source
+        self.version = version
+        self.load_time = load_time
+        self.chunks = chunks
+        self.from_cache = False
+        self.loaded_at = time.time()
+        self.columns = self.data = self.index = self.cells = UnavailableRecords()
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray], source: str, version: str) -> "DatasetSummary":
+        """
+        Summarize preprocessed columns.
+
+        Args:
+            columns: Mapping of column name to column values
+            source: Path of the file the columns were read from
+            version: Identifier of the dataset content and preprocessing version
+
+        Returns:
+            DatasetSummary: The summary of the columns
+        """
+        cube = CountCube.from_columns(columns)
+        return cls(
+            cube,
+            Moments.from_columns(columns),
+            MomentCube.from_cells(cube.levels, cube.encode(columns), columns),
+            {name: ValueCounts.from_values(columns[name]) for name in RANGE_COLUMNS},
+            {name: QuantileSketch.from_values(columns[name]) for name in RANGE_COLUMNS},
+            source=source,
+            version=version,
+        )
+
+    @classmethod
+    def load(cls, path: str = DATASET_PATH, chunk_size: int = CHUNK_SIZE) -> "DatasetSummary":
+        """
+        Read and summarize the dataset one chunk at a time.
+
+        The chunks of the journal of the source (see append_to_journal) are folded
+        after the ones of the source.
+
+        Args:
+            path: Path to the semicolon-separated dataset file
+            chunk_size: Number of source rows read per chunk
+
+        Returns:
+            DatasetSummary: The summary of the whole dataset
+
+        Raises:
+            ValueError: If the file holds no record
+        """
+        start = time.perf_counter()
+        version = f"{source_digest(path)[:16]}-v{PREPROCESSING_VERSION}-summary"
+        journal = read_journal(path, chunksize=chunk_size)
+        if journal is not None:
+            version += f"+{source_digest(journal_path(path))[:12]}"
+
+        summary = None
+        for raw in itertools.chain(pd.read_csv(path, sep=';', header=0, chunksize=chunk_size), journal or ()):
+            if raw.empty:
+                continue
+            data = preprocess(raw)
+            chunk = cls.from_columns({name: data[name].to_numpy() for name in data.columns}, path, version)
+            summary = chunk if summary is None else summary.merge(chunk)
+
+        if summary is None:
+            raise ValueError(f"The dataset file {path} holds no record")
+        summary.load_time = time.perf_counter() - start
+        return summary
+
+    def merge(self, other: "DatasetSummary") -> "DatasetSummary":
+        """
+        Combine the summaries of two disjoint sets of records.
+
+        Args:
+            other: Summary of other records of the same dataset
+
+        Returns:
+            DatasetSummary: The summary of the records of both summaries
+        """
+        return DatasetSummary(
+            self.cube.merge(other.cube),
+            self.moments.merge(other.moments),
+            self.moment_cube.merge(other.moment_cube),
+            {name: counts.merge(other.distributions[name]) for name, counts in self.distributions.items()},
+            {name: sketch.merge(other.sketches[name]) for name, sketch in self.sketches.items()},
+            source=self.source,
+            version=self.version,
+            load_time=self.load_time + other.load_time,
+            chunks=self.chunks + other.chunks,
+        )
+
+    @property
+    def memory_bytes(self) -> int:
+        """Number of bytes held by the aggregates."""
+        distributions = sum(counts.values.nbytes + counts.counts.nbytes for counts in self.distributions.values())
+        sketches = sum(sketch.nbytes for sketch in self.sketches.values())
+        return int(
+            self.cube.counts.nbytes + self.moments.nbytes + self.moment_cube.nbytes + distributions + sketches
+        )
+
+    @property
+    def footprint_bytes(self) -> int:
+        """Number of bytes held by the summary, which keeps its aggregates only."""
+        return self.memory_bytes
+
+    def __len__(self) -> int:
+        return self.moments.count
+
+    def median(self, column: str) -> float:
+        """
+        Get the median of a numeric column.
+
+        Args:
+            column: Column of the range indexes
+
+        Returns:
+            float: The median of the column
+        """
+        return self.distributions[column].median()
+
+    def quantiles(self, column: str, fractions: Sequence[float], exact: bool = False) -> List[float]:
+        """
+        Get quantiles of a numeric column.
+
+        Args:
+            column: Column of the range indexes
+            fractions: Fractions of the records, between 0 and 1
+            exact: Whether to compute the quantiles from the counts of the distinct values rather than the sketch
+
+        Returns:
+            List of the quantiles of the column
+        """
+        if exact:
+            return self.distributions[column].quantiles(fractions)
+        return self.sketches[column].quantiles(fractions)
+
+    def info(self) -> Dict[str, object]:
+        """
+        Describe the summary.
+
+        Returns:
+            Dict containing the source, size, load time and memory footprint of the summary
+        """
+        columns = list(dict.fromkeys([*self.cube.dimensions, *self.moments.names]))
+        return {
+            'source': self.source,
+            'version': self.version,
+            'from_cache': False,
+            'out_of_core': True,
+            'total_records': len(self),
+            'columns': columns,
+            'dtypes': {},
+            'load_time': self.load_time,
+            'loaded_at': self.loaded_at,
+            'memory_bytes': self.memory_bytes,
+            'footprint_bytes': self.footprint_bytes,
+            'original_memory_bytes': len(self) * 8 * len(columns),
+            'memory_mapped': False,
+            'load_count': _load_count,
+            'pid': os.getpid(),
+        }
+
+
+_store: Optional[Union[DatasetStore, DatasetSummary]] = None
+_store_lock = threading.Lock()
+_append_lock = threading.Lock()
+_load_count = 0
+
+
+def get_dataset_store() -> Union[DatasetStore, DatasetSummary]:
+    """
+    Get the process-wide dataset store, loading it on first use.
+
+    With DATASET_OUT_OF_CORE, the dataset is summarized chunk by chunk (see
+    DatasetSummary) instead of being held in memory.
+
+    Returns:
+        Union[DatasetStore, DatasetSummary]: The shared dataset store.
+    """
+    global _store, _load_count
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = DatasetSummary.load() if OUT_OF_CORE else DatasetStore.load()
+                _load_count += 1
+                logger.info(
+                    "Loaded %d records from %s%s in %.3fs (%d bytes)",
+                    len(store), store.source, " (cached)" if store.from_cache else "",
+                    store.load_time, store.memory_bytes
+                )
+                _store = store
+    return _store
+
+
+def replace_store(
+    store: Union[DatasetStore, DatasetSummary],
+    is_current: Callable[[], bool] = lambda: True,
+) -> bool:
+    """
+    Publish a reloaded dataset as the process-wide store.
+
+    The store is swapped in a single reference assignment: requests already
+    running keep reading the previous store, and the next ones read the new one.
+    Records appended to the previous store were written to the journal of its
+    source file (see append_records), so the reloaded one holds them, unless they
+    were appended after the journal was read: the store is then left unpublished,
+    as checked by is_current under the lock taken by the appends.
+
+    Args:
+        store: Store of the reloaded source file
+        is_current: Function checking that the source file and its journal did not change since the store was read
+
+    Returns:
+        bool: True if the store was published
+    """
+    global _store, _load_count
+
+    with _append_lock:
+        if not is_current():
+            return False
+        _store = store
+        _load_count += 1
+    return True
+
+
+def append_records(data: pd.DataFrame) -> Tuple[DatasetStore, int]:
+    """
+    Append records to the process-wide dataset store.
+
+    The records are written to the journal of the source file of the store (see
+    append_to_journal), so that they survive a restart and are read by the other
+    workers when they reload the dataset (see api.services.dataset_reloader).
+    They then go through the preprocessing of the source file (BMI and outlier
+    filters), and the store of this worker is replaced by a new version holding
+    them; requests already running keep reading the previous version.
+
+    Args:
+        data: DataFrame of records with their age in years, height and weight
+
+    Returns:
+        Tuple of the new store and the number of records kept by the preprocessing
+
+    Raises:
+        ValueError: If a column of the store is missing or an age is negative
+    """
+    global _store
+
+    if (data['age'] < 0).any():
+        # Ages are written to the journal in days and read back rounded toward zero
+        raise ValueError("Ages must not be negative")
+    records = derive_features(data)
+    with _append_lock:
+        store = get_dataset_store()
+        missing = set(store.columns) - set(records.columns)
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(sorted(missing))}")
+        append_to_journal(store.source, data)
+        _store = store.append({name: records[name].to_numpy() for name in store.columns})
+        return _store, len(records)
@@ -0,0 +1,404 @@
+"""
+Moments.
+
+This module provides the sufficient statistics of the numeric columns of the
+dataset: count, minimum, maximum, mean and co-moments (sums of products of the
+deviations from the mean). They are computed once when the dataset is loaded and
+merged with the moments of appended records, so that means, variances and
+correlations stay exact without another pass over the records. The same moments
+are kept per cell of the count cube (see MomentCube), so that the moments of any
+cohort selected by the cube dimensions are combined from those of its cells.
+Exact medians and quantiles are computed from the counts of the distinct values
+of a column, which merge the same way.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MOMENT_COLUMNS = ('age', 'IMC', 'ap_hi', 'ap_lo', 'cholesterol', 'gluc', 'smoke', 'alco', 'active', 'cardio')
+
+
+class Moments:
+    """Count, extrema, means and co-moments of a set of columns."""
+
+    def __init__(
+        self,
+        names: Sequence[str],
+        count: int,
+        minimum: np.ndarray,
+        maximum: np.ndarray,
+        mean: np.ndarray,
+        comoments: np.ndarray,
+    ):
+        """
+        Initialize the moments.
+
+        Args:
+            names: Names of the columns
+            count: Number of records
+            minimum: Minimum of each column
+            maximum: Maximum of each column
+            mean: Mean of each column
+            comoments: Sums of the products of the deviations from the mean of each pair of columns
+        """
+        self.names = tuple(names)
+        self.count = count
+        self.minimum = minimum
+        self.maximum = maximum
+        self.mean = mean
+        self.comoments = comoments
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray], names: Sequence[str] = MOMENT_COLUMNS) -> "Moments":
+        """
+        Compute the moments of columns.
+
+        Args:
+            columns: Mapping of column name to column values
+            names: Columns to summarize
+
+        Returns:
+            Moments: The moments of the columns
+        """
+        count = len(columns[names[0]])
+        if count == 0:
+            empty = np.full(len(names), np.nan)
+            return cls(names, 0, empty, empty, empty, np.zeros((len(names), len(names))))
+
+        mean = np.array([np.mean(columns[name]) for name in names], dtype=np.float64)
+        deviations = np.column_stack([columns[name].astype(np.float64) for name in names]) - mean
+        return cls(
+            names,
+            count,
+            np.array([np.min(columns[name]) for name in names], dtype=np.float64),
+            np.array([np.max(columns[name]) for name in names], dtype=np.float64),
+            mean,
+            deviations.T @ deviations,
+        )
+
+    def merge(self, other: "Moments") -> "Moments":
+        """
+        Combine the moments of two disjoint sets of records.
+
+        The means and co-moments are combined with the pairwise update of Chan et
+        al., which is exact up to rounding and does not read the records.
+
+        Args:
+            other: Moments of the same columns over other records
+
+        Returns:
+            Moments: The moments of the union of both sets of records
+        """
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            return other
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        return Moments(
+            self.names,
+            count,
+            np.fmin(self.minimum, other.minimum),
+            np.fmax(self.maximum, other.maximum),
+            self.mean + delta * (other.count / count),
+            self.comoments + other.comoments + np.outer(delta, delta) * (self.count * other.count / count),
+        )
+
+    def variance(self) -> np.ndarray:
+        """
+        Compute the population variance of each column.
+
+        Returns:
+            np.ndarray: Variance of each column, NaN without records
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.diag(self.comoments) / self.count
+
+    def correlation(self) -> np.ndarray:
+        """
+        Compute the Pearson correlation matrix of the columns.
+
+        Returns:
+            np.ndarray: Correlation of each pair of columns, NaN for constant columns
+        """
+        scale = np.sqrt(np.diag(self.comoments))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            correlation = self.comoments / np.outer(scale, scale)
+        return np.clip(correlation, -1, 1)
+
+    def describe(self, name: str) -> Dict[str, float]:
+        """
+        Summarize a column.
+
+        Args:
+            name: Column to summarize
+
+        Returns:
+            Dict containing the min, max and mean of the column
+        """
+        position = self.names.index(name)
+        return {
+            'min': float(self.minimum[position]),
+            'max': float(self.maximum[position]),
+            'mean': float(self.mean[position]),
+        }
+
+    @property
+    def nbytes(self) -> int:
+        """Number of bytes held by the moments."""
+        return int(self.minimum.nbytes + self.maximum.nbytes + self.mean.nbytes + self.comoments.nbytes)
+
+
+class MomentCube:
+    """
+    Count, means and co-moments of a set of columns per cell of a count cube.
+
+    Only the occupied cells are kept, with the upper triangle of their co-moment
+    matrix, so the memory of the cube is bounded by the number of occupied cells
+    rather than by the number of records. The moments of a cohort covering a set
+    of cells are combined from those of its cells as Moments.merge does, so
+    columns that are constant over the cohort keep a variance of exactly zero.
+    """
+
+    def __init__(
+        self,
+        levels: Dict[str, np.ndarray],
+        names: Sequence[str],
+        cells: np.ndarray,
+        counts: np.ndarray,
+        means: np.ndarray,
+        comoments: np.ndarray,
+    ):
+        """
+        Initialize the cube.
+
+        Args:
+            levels: Mapping of dimension name to the sorted values of the dimension
+            names: Names of the summarized columns
+            cells: Sorted flat indices of the occupied cells in the count cube
+            counts: Number of records of each occupied cell
+            means: Means of the columns per occupied cell, with a trailing axis per column
+            comoments: Co-moments of each pair of columns per occupied cell, in the order of numpy.triu_indices
+        """
+        self.levels = levels
+        self.dimensions = tuple(levels)
+        self.names = tuple(names)
+        self.cells = cells
+        self.counts = counts
+        self.means = means
+        self.comoments = comoments
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        """Number of levels of each dimension."""
+        return tuple(len(values) for values in self.levels.values())
+
+    @classmethod
+    def from_cells(
+        cls,
+        levels: Dict[str, np.ndarray],
+        cells: np.ndarray,
+        columns: Dict[str, np.ndarray],
+        names: Sequence[str] = MOMENT_COLUMNS,
+    ) -> "MomentCube":
+        """
+        Compute the moments of the columns per cell of a count cube.
+
+        Args:
+            levels: Levels of the count cube
+            cells: Flat cell index of each record, as returned by CountCube.encode
+            columns: Mapping of column name to column values
+            names: Columns to summarize
+
+        Returns:
+            MomentCube: The moments of the columns per cell
+        """
+        occupied, inverse, counts = np.unique(cells, return_inverse=True, return_counts=True)
+        values = [columns[name].astype(np.float64) for name in names]
+        sums = np.column_stack([np.bincount(inverse, weights=column, minlength=len(occupied)) for column in values])
+        means = sums / counts[:, np.newaxis]
+
+        deviations = [column - means[inverse, position] for position, column in enumerate(values)]
+        comoments = np.column_stack([
+            np.bincount(inverse, weights=deviations[i] * deviations[j], minlength=len(occupied))
+            for i, j in zip(*np.triu_indices(len(names)))
+        ])
+        return cls(levels, names, occupied.astype(np.int64), counts.astype(np.int64), means, comoments)
+
+    def _moved(self, levels: Dict[str, np.ndarray]) -> np.ndarray:
+        # Flat indices of the occupied cells in a cube whose levels include the ones of this cube
+        codes = np.unravel_index(self.cells, self.shape)
+        return np.ravel_multi_index(
+            [np.searchsorted(levels[name], self.levels[name])[code] for name, code in zip(self.dimensions, codes)],
+            tuple(len(values) for values in levels.values()),
+        )
+
+    def merge(self, other: "MomentCube") -> "MomentCube":
+        """
+        Combine the moments of another cube over the same dimensions and columns.
+
+        The levels of the merged cube are the union of the levels of both cubes, as
+        in CountCube.merge, and the moments of each cell are combined with the
+        pairwise update of Moments.merge.
+
+        Args:
+            other: Cube summarizing other records
+
+        Returns:
+            MomentCube: The cube summarizing the records of both cubes
+        """
+        levels = {name: np.union1d(self.levels[name], other.levels[name]) for name in self.dimensions}
+        positions = [cube._moved(levels) for cube in (self, other)]
+        cells = np.union1d(*positions)
+        width = len(self.names)
+
+        expanded = []
+        for cube, moved in zip((self, other), positions):
+            slots = np.searchsorted(cells, moved)
+            counts = np.zeros(len(cells), dtype=np.int64)
+            means = np.zeros((len(cells), width))
+            comoments = np.zeros((len(cells), cube.comoments.shape[1]))
+            counts[slots], means[slots], comoments[slots] = cube.counts, cube.means, cube.comoments
+            expanded.append((counts, means, comoments))
+        (counts, means, comoments), (other_counts, other_means, other_comoments) = expanded
+
+        total = counts + other_counts
+        weight = (other_counts / total)[:, np.newaxis]
+        delta = other_means - means
+        upper = np.triu_indices(width)
+        return MomentCube(
+            levels,
+            self.names,
+            cells,
+            total,
+            means + delta * weight,
+            comoments + other_comoments + delta[:, upper[0]] * delta[:, upper[1]] * (counts[:, np.newaxis] * weight),
+        )
+
+    def select(self, bounds: Dict[str, Tuple[Optional[float], Optional[float]]]) -> Moments:
+        """
+        Compute the moments of the records of the cells within bounds.
+
+        The extrema of the columns are not kept per cell, so they are NaN in the
+        returned moments.
+
+        Args:
+            bounds: Mapping of dimension name to inclusive (low, high) bounds, None for no bound
+
+        Returns:
+            Moments: The count, means and co-moments of the selected records
+
+        Raises:
+            KeyError: If a bounded column is not a dimension of the cube
+        """
+        unknown = set(bounds) - set(self.dimensions)
+        if unknown:
+            raise KeyError(f"Not a dimension of the cube: {', '.join(sorted(unknown))}")
+        selected = np.ones(len(self.cells), dtype=bool)
+        codes = np.unravel_index(self.cells, self.shape)
+        for name, (low, high) in bounds.items():
+            values = self.levels[name][codes[self.dimensions.index(name)]]
+            if low is not None:
+                selected &= values >= low
+            if high is not None:
+                selected &= values <= high
+
+        width = len(self.names)
+        counts = self.counts[selected].astype(np.float64)
+        extrema = np.full(width, np.nan)
+        if len(counts) == 0:
+            return Moments(self.names, 0, extrema, extrema, extrema, np.zeros((width, width)))
+
+        count = counts.sum()
+        means = self.means[selected]
+        mean = counts @ means / count
+        deviations = means - mean
+        comoments = np.zeros((width, width))
+        comoments[np.triu_indices(width)] = self.comoments[selected].sum(axis=0)
+        comoments = comoments + np.triu(comoments, 1).T
+        return Moments(
+            self.names,
+            int(count),
+            extrema,
+            extrema,
+            mean,
+            comoments + (deviations.T * counts) @ deviations,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Number of bytes held by the moments."""
+        return int(self.cells.nbytes + self.counts.nbytes + self.means.nbytes + self.comoments.nbytes)
+
+
+class ValueCounts:
+    """Number of records of each distinct value of a column."""
+
+    def __init__(self, values: np.ndarray, counts: np.ndarray):
+        """
+        Initialize the counts.
+
+        Args:
+            values: Sorted distinct values
+            counts: Number of records of each value
+        """
+        self.values = values
+        self.counts = counts
+
+    @classmethod
+    def from_values(cls, values: np.ndarray) -> "ValueCounts":
+        """
+        Count the distinct values of a column.
+
+        Args:
+            values: Column values
+
+        Returns:
+            ValueCounts: The counts of the column
+        """
+        return cls(*np.unique(values, return_counts=True))
+
+    def merge(self, other: "ValueCounts") -> "ValueCounts":
+        """
+        Add the counts of another set of records.
+
+        Args:
+            other: Counts of the same column over other records
+
+        Returns:
+            ValueCounts: The counts of the union of both sets of records
+        """
+        values, inverse = np.unique(np.concatenate([self.values, other.values]), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate([self.counts, other.counts]), minlength=len(values))
+        return ValueCounts(values, counts.astype(np.int64))
+
+    def median(self) -> float:
+        """
+        Compute the median of the counted records.
+
+        Returns:
+            float: The median, as numpy.median computes it over the records
+        """
+        cumulative = np.cumsum(self.counts)
+        total = int(cumulative[-1])
+        middle = np.searchsorted(cumulative, [(total - 1) // 2, total // 2], side='right')
+        return float(np.mean(self.values[middle]))
+
+    def quantiles(self, fractions: Sequence[float]) -> List[float]:
+        """
+        Compute exact quantiles of the counted records.
+
+        Args:
+            fractions: Fractions of the records, between 0 and 1
+
+        Returns:
+            List of the quantiles, interpolated linearly as numpy.quantile does over the records
+        """
+        cumulative = np.cumsum(self.counts)
+        positions = (int(cumulative[-1]) - 1) * np.asarray(fractions, dtype=np.float64)
+        below = np.floor(positions)
+        lower = self.values[np.searchsorted(cumulative, below, side='right')].astype(np.float64)
+        upper = self.values[np.searchsorted(cumulative, np.ceil(positions), side='right')].astype(np.float64)
+        return (lower + (upper - lower) * (positions - below)).tolist()
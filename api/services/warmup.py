@@ -0,0 +1,135 @@
+"""
+Analytics warm-up.
+
+This module computes every analytics artifact of the whole population (statistics,
+charts and correlation analysis) when a worker starts, in parallel on a thread
+pool. The artifacts are memoized with the dataset store (see CardioService), so
+they are held once per dataset version and the first request is served without
+computing them.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from api.services.cardio_service import CardioService
+from api.services.dataset_store import DatasetStore, DatasetSummary
+
+logger = logging.getLogger(__name__)
+
+# Artifacts computed from the count cube and moments only, available in out-of-core mode
+SUMMARY_ARTIFACTS = (
+    'statistics', 'correlation', 'age', 'gender', 'cholesterol', 'glucose', 'physical_activity', 'smoking', 'alcohol',
+    'risk_factors',
+)
+
+# Number of threads computing the artifacts
+WARMUP_WORKERS = int(os.getenv("WARMUP_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+
+def artifact_factories(cardio_service: CardioService) -> Dict[str, Callable[[], Any]]:
+    """
+    List the artifacts served by the analytics endpoints without parameters.
+
+    In out-of-core mode, only the artifacts computed from the dataset summary are
+    listed.
+
+    Args:
+        cardio_service: Service of the whole population
+
+    Returns:
+        Dict mapping artifact names to the functions computing them
+    """
+    factories = {
+        'statistics': cardio_service.get_dataset_statistics,
+        'correlation': cardio_service.get_correlation_analysis,
+        'age': cardio_service.get_age_distribution_chart,
+        'gender': cardio_service.get_gender_distribution_chart,
+        'blood_pressure': cardio_service.get_blood_pressure_chart,
+        'blood_pressure_density': cardio_service.get_blood_pressure_density_chart,
+        'blood_pressure_correlation': cardio_service.get_blood_pressure_correlation_chart,
+        'blood_pressure_correlation_density': cardio_service.get_blood_pressure_correlation_density_chart,
+        'bmi_age': cardio_service.get_bmi_age_chart,
+        'bmi_age_density': cardio_service.get_bmi_age_density_chart,
+        'cholesterol': cardio_service.get_cholesterol_chart,
+        'glucose': cardio_service.get_glucose_chart,
+        'physical_activity': cardio_service.get_physical_activity_chart,
+        'smoking': cardio_service.get_smoking_chart,
+        'alcohol': cardio_service.get_alcohol_chart,
+        'risk_factors': cardio_service.get_risk_factors_radar_chart,
+        'charts': cardio_service.get_all_charts,
+    }
+    if isinstance(cardio_service.store, DatasetSummary):
+        return {name: factories[name] for name in SUMMARY_ARTIFACTS}
+    return factories
+
+
+class Warmup:
+    """Warm-up of the analytics artifacts of a dataset store."""
+
+    def __init__(self, store: DatasetStore):
+        """
+        Initialize the warm-up.
+
+        Args:
+            store: Dataset store whose artifacts are computed
+        """
+        self.store = store
+        self.durations: Dict[str, float] = {}
+        self.elapsed: Optional[float] = None
+        self.error: Optional[str] = None
+        self._done = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        """Whether every artifact was computed."""
+        return self._done.is_set() and self.error is None
+
+    def run(self, workers: int = WARMUP_WORKERS) -> None:
+        """
+        Compute every artifact, in parallel.
+
+        Errors are recorded in the error attribute rather than raised, so that a
+        failed warm-up leaves the worker serving requests, just not ready.
+
+        Args:
+            workers: Number of threads computing the artifacts
+        """
+        start = time.perf_counter()
+
+        def timed(factory: Callable[[], Any]) -> float:
+            began = time.perf_counter()
+            factory()
+            return time.perf_counter() - began
+
+        try:
+            factories = artifact_factories(CardioService(self.store))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="warmup") as pool:
+                futures = {name: pool.submit(timed, factory) for name, factory in factories.items()}
+                self.durations = {name: future.result() for name, future in futures.items()}
+            self.elapsed = time.perf_counter() - start
+            logger.info(
+                "Computed %d analytics artifacts of dataset %s in %.2fs with %d threads",
+                len(self.durations), self.store.version, self.elapsed, workers,
+            )
+        except Exception as e:
+            self.error = f"Failed to compute the analytics artifacts: {e}"
+            logger.exception("Failed to compute the analytics artifacts of dataset %s", self.store.version)
+        finally:
+            self._done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the warm-up to finish.
+
+        Args:
+            timeout: Maximum number of seconds to wait, forever if None
+
+        Returns:
+            bool: True if every artifact was computed
+        """
+        self._done.wait(timeout)
+        return self.ready
@@ -1,6 +1,9 @@
+import shutil
+
 import pytest
 from starlette.testclient import TestClient
 from api.main import app
+from api.services import dataset_cache, dataset_store
 
 @pytest.fixture
 def client():
@@ -28,3 +31,19 @@ def client():
         )
 
     return client
+
+
+@pytest.fixture
+def dataset_copy(tmp_path, monkeypatch):
+    """
+    Serve a copy of the dataset file as the process-wide store.
+
+    Records appended by a test are written to the journal of the copy, in the test
+    directory, rather than to the journal of the dataset file of the repository.
+    """
+    monkeypatch.setattr(dataset_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "cardio_train.csv"
+    shutil.copyfile(dataset_store.DATASET_PATH, path)
+    monkeypatch.setattr(dataset_store, "_store", dataset_store.DatasetStore.load(str(path)))
+    monkeypatch.setattr(dataset_store, "_load_count", dataset_store._load_count)
+    return path
@@ -0,0 +1,119 @@
+"""
+Tests for the aggregation engine.
+
+This module contains tests for the group-by engine and the /cardio/aggregate endpoint.
+"""
+
+import numpy as np
+import pytest
+
+from api.services.aggregation import AggregationEngine, parse_metrics, parse_where
+from api.services.dataset_store import get_dataset_store
+from api.utils.lru import SizedLRUCache
+
+
+@pytest.fixture
+def store():
+    """The shared dataset store."""
+    return get_dataset_store()
+
+
+@pytest.fixture
+def engine(store):
+    """An engine with a private result cache."""
+    return AggregationEngine(store, cache=SizedLRUCache(1024 * 1024, sizeof=lambda result: 1))
+
+
+@pytest.mark.parametrize("group_by", [["gender"], ["gender", "cholesterol"], ["age", "gluc", "smoke"]])
+def test_aggregate_matches_groupby(store, engine, group_by):
+    """Test that the engine computes the metrics of a pandas groupby."""
+    result = engine.aggregate(group_by, "count,sum(ap_lo),mean(ap_hi),std(IMC),rate(cardio)")
+    expected = store.data.groupby(group_by).agg(
+        count=("cardio", "size"),
+        sum_ap_lo=("ap_lo", "sum"),
+        mean_ap_hi=("ap_hi", "mean"),
+        std_imc=("IMC", lambda values: values.std(ddof=0)),
+        rate_cardio=("cardio", "mean"),
+    ).reset_index()
+
+    assert result.metrics == ["count", "sum(ap_lo)", "mean(ap_hi)", "std(IMC)", "rate(cardio)"]
+    assert result.total_records == len(store)
+    assert [[row[column] for column in group_by] for row in result.data] == expected[group_by].values.tolist()
+    assert [row["count"] for row in result.data] == expected["count"].tolist()
+    for metric, column in (("sum(ap_lo)", "sum_ap_lo"), ("mean(ap_hi)", "mean_ap_hi"),
+                           ("std(IMC)", "std_imc"), ("rate(cardio)", "rate_cardio")):
+        np.testing.assert_allclose([row[metric] for row in result.data], expected[column].to_numpy())
+
+
+def test_aggregate_where(store, engine):
+    """Test that the conditions select the records before grouping."""
+    result = engine.aggregate(["cardio"], "count", "gender=1,age>=50,ap_hi<=140")
+    data = store.data
+    selected = data[(data["gender"] == 1) & (data["age"] >= 50) & (data["ap_hi"] <= 140)]
+
+    assert result.total_records == len(selected)
+    assert [(row["cardio"], row["count"]) for row in result.data] == list(selected.groupby("cardio").size().items())
+
+
+def test_aggregate_without_group_by(store, engine):
+    """Test that the records form a single group without grouping columns."""
+    result = engine.aggregate(None, "count,rate(cardio)")
+    assert result.data == [{"count": len(store), "rate(cardio)": pytest.approx(store.data["cardio"].mean())}]
+
+
+def test_aggregate_results_are_cached(store):
+    """Test that results are cached per dataset version and canonical query."""
+    cache = SizedLRUCache(1024 * 1024, sizeof=lambda result: 1)
+    engine = AggregationEngine(store, cache=cache)
+    first = engine.aggregate(["gender"], "count", "age>=50,gender=1")
+    second = engine.aggregate(["gender"], "count", "gender=1, age>=50")
+
+    assert second == first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+@pytest.mark.parametrize("group_by, metrics, where", [
+    (["IMC"], None, None),
+    (["unknown"], None, None),
+    (["gender"], "median(age)", None),
+    (["gender"], "mean", None),
+    (["gender"], "mean(unknown)", None),
+    (["gender"], "rate(ap_hi)", None),
+    (["gender"], None, "age>>50"),
+    (["gender"], None, "gender>=1"),
+])
+def test_aggregate_rejects_invalid_queries(engine, group_by, metrics, where):
+    """Test that invalid grouping columns, metrics and conditions are rejected."""
+    with pytest.raises(ValueError):
+        engine.aggregate(group_by, metrics, where)
+
+
+def test_parse_where_merges_ranges():
+    """Test that conditions on the same column are intersected."""
+    filters = parse_where("age>=40,age<=60,age>=45,ap_hi=120")
+    assert filters.ranges == {"age": (45.0, 60.0), "ap_hi": (120.0, 120.0)}
+
+
+def test_parse_metrics_defaults_to_count(store):
+    """Test that count is computed when no metric is given."""
+    assert [metric.name for metric in parse_metrics(None, store.columns)] == ["count"]
+
+
+def test_aggregate_endpoint(client):
+    """Test the /cardio/aggregate endpoint."""
+    response = client.get("/cardio/aggregate", params={
+        "group_by": "gender,cholesterol",
+        "metrics": "count,mean(ap_hi),rate(cardio)",
+        "where": "age>=50",
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert body["group_by"] == ["gender", "cholesterol"]
+    assert set(body["data"][0]) == {"gender", "cholesterol", "count", "mean(ap_hi)", "rate(cardio)"}
+    assert sum(row["count"] for row in body["data"]) == body["total_records"]
+
+
+def test_aggregate_endpoint_rejects_invalid_query(client):
+    """Test that an invalid aggregation query returns 400."""
+    response = client.get("/cardio/aggregate", params={"group_by": "IMC"})
+    assert response.status_code == 400
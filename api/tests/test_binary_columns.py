@@ -0,0 +1,76 @@
+"""
+Tests for the binary column format.
+
+This module contains tests for the encoding and zero-copy reading of binary column documents.
+"""
+
+import numpy as np
+import pytest
+
+from api.utils.binary_columns import MAGIC, encode_columns, encode_header, iter_encoded, read_columns
+
+
+@pytest.fixture
+def columns():
+    """Columns of various dtypes and sizes."""
+    return {
+        "age": np.array([50, 55, 61], dtype=np.int8),
+        "ap_hi": np.array([110, 140, 130], dtype=np.int16),
+        "IMC": np.array([21.9, 34.9, 23.5], dtype=np.float64),
+    }
+
+
+def test_round_trip(columns):
+    """Test that reading a document gives back the encoded columns and dtypes."""
+    document = encode_columns(columns)
+    assert document.startswith(MAGIC)
+
+    decoded = read_columns(document)
+    assert list(decoded) == list(columns)
+    for name, values in columns.items():
+        assert decoded[name].dtype == values.dtype
+        np.testing.assert_array_equal(decoded[name], values)
+
+
+def test_buffers_are_aligned(columns):
+    """Test that the column buffers start on 8-byte boundaries."""
+    document = encode_columns(columns)
+    assert len(encode_header(columns)) % 8 == 0
+    assert len(document) % 8 == 0
+
+    address = np.frombuffer(document, dtype=np.uint8).ctypes.data
+    for values in read_columns(document).values():
+        assert (values.ctypes.data - address) % 8 == 0
+
+
+def test_read_does_not_copy(columns):
+    """Test that the decoded columns are views on the document."""
+    buffer = np.frombuffer(encode_columns(columns), dtype=np.uint8)
+    decoded = read_columns(buffer)
+    assert all(np.shares_memory(values, buffer) for values in decoded.values())
+    assert not decoded["age"].flags.writeable
+
+
+def test_chunks_match_document(columns):
+    """Test that encoding in small chunks gives the same document."""
+    assert b"".join(iter_encoded(columns, chunk_size=2)) == encode_columns(columns)
+
+
+def test_big_endian_columns_are_stored_little_endian():
+    """Test that columns are stored in little-endian order whatever their byte order."""
+    values = np.array([1, 256], dtype=">i4")
+    decoded = read_columns(encode_columns({"value": values}))["value"]
+    assert decoded.dtype.str == "<i4"
+    assert decoded.tolist() == [1, 256]
+
+
+def test_invalid_documents():
+    """Test that invalid columns and documents are rejected."""
+    with pytest.raises(ValueError):
+        encode_columns({"a": np.arange(3), "b": np.arange(2)})
+    with pytest.raises(ValueError):
+        encode_columns({"a": np.array(["x"])})
+    with pytest.raises(ValueError):
+        read_columns(b"not a document")
+    with pytest.raises(ValueError):
+        read_columns(encode_columns({"a": np.arange(3)})[:-8])
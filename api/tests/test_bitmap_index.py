@@ -0,0 +1,70 @@
+"""
+Tests for the bitmap index.
+
+This module contains tests for the indexes used to select cohorts of records.
+"""
+
+import numpy as np
+import pytest
+
+from api.services.bitmap_index import BitmapIndex
+from api.services.dataset_store import get_dataset_store
+
+
+@pytest.fixture
+def store():
+    """The shared dataset store."""
+    return get_dataset_store()
+
+
+def test_select_without_filter_returns_every_row(store):
+    """Test that an empty conjunction selects the whole dataset."""
+    np.testing.assert_array_equal(store.index.select(), np.arange(len(store)))
+
+
+def test_select_matches_boolean_mask(store):
+    """Test that bitmap and range filters select the same rows as a boolean mask."""
+    columns = store.columns
+    expected = np.flatnonzero(
+        (columns["gender"] == 2)
+        & (columns["cholesterol"] == 3)
+        & (columns["age"] >= 50)
+        & (columns["IMC"] >= 25.5)
+        & (columns["IMC"] <= 35.0)
+    )
+
+    rows = store.index.select(
+        equal={"gender": 2, "cholesterol": 3},
+        ranges={"age": (50, None), "IMC": (25.5, 35.0)},
+    )
+    np.testing.assert_array_equal(rows, expected)
+
+
+def test_select_unknown_value_is_empty():
+    """Test that a value absent from the dataset selects no row."""
+    index = BitmapIndex({"gender": np.array([1, 2, 1]), "age": np.array([40, 50, 60])})
+
+    assert index.select(equal={"gender": 3}).size == 0
+    assert index.select(ranges={"age": (45, 55)}).tolist() == [1]
+
+
+def test_extend_matches_rebuilt_index(store):
+    """Test that extending the index with appended rows gives the index of every row."""
+    head = {name: values[:40000] for name, values in store.columns.items()}
+    tail = {name: values[40000:] for name, values in store.columns.items()}
+    extended = BitmapIndex(head).extend(tail)
+
+    assert extended.size == store.index.size
+    for name, (order, values) in store.index.ranges.items():
+        np.testing.assert_array_equal(extended.ranges[name][0], order)
+        np.testing.assert_array_equal(extended.ranges[name][1], values)
+    np.testing.assert_array_equal(
+        extended.select({"gender": 2, "cardio": 1}, {"age": (50, 60)}),
+        store.index.select({"gender": 2, "cardio": 1}, {"age": (50, 60)}),
+    )
+
+
+@pytest.mark.parametrize("column", ["age", "ap_hi", "ap_lo", "IMC"])
+def test_median_matches_numpy(store, column):
+    """Test that the median read from the range index is the one numpy computes."""
+    assert store.index.median(column) == float(np.median(store.columns[column]))
@@ -4,10 +4,19 @@ Tests for the cardio router.
 This module contains tests for the cardio router endpoints.
 """
 
+import csv
+import io
+import json
+
+import pandas as pd
 import pytest
 from starlette.testclient import TestClient
 
 from api.models.cardio import ChartData, CorrelationAnalysis, Dataset, DatasetStatistics
+from api.routers.cardio import MAX_APPEND_RECORDS
+from api.services import dataset_store
+from api.services.cardio_service import encode_cursor
+from api.utils.binary_columns import read_columns
 
 
 def test_get_dataset_statistics(client: TestClient):
@@ -422,3 +431,284 @@ def test_get_complete_dataset(client: TestClient):
         assert "active" in first_record
         assert "cardio" in first_record
         assert "IMC" in first_record
+
+
+def test_get_chart_for_cohort(client: TestClient):
+    """Test that chart endpoints can be restricted to a cohort."""
+    response = client.get("/cardio/charts/gender", params={"gender": 2, "age_min": 50, "smoke": 1})
+    assert response.status_code == 200
+    data = response.json()
+
+    assert [item["gender"] for item in data["data"]] == ["Homme"]
+
+    full = client.get("/cardio/charts/gender").json()
+    men = next(item for item in full["data"] if item["gender"] == "Homme")
+    cohort = data["data"][0]
+    assert 0 < cohort["num_sick_people"] < men["num_sick_people"]
+    assert 0 < cohort["num_healthy_people"] < men["num_healthy_people"]
+
+
+def test_get_correlation_for_cohort(client: TestClient):
+    """Test that the correlation analysis is restricted to a cohort, with or without cube dimensions only."""
+    data = dataset_store.get_dataset_store().data
+    for params, selected in (
+        ({"gender": 1, "age_min": 40}, (data["gender"] == 1) & (data["age"] >= 40)),
+        ({"gender": 1, "ap_hi_min": 140}, (data["gender"] == 1) & (data["ap_hi"] >= 140)),
+    ):
+        response = client.get("/cardio/correlation", params=params)
+        assert response.status_code == 200
+        expected = data.loc[selected, response.json()["feature_names"]].corr().round(2)
+        assert response.json()["correlation_matrix"] == expected.values.tolist()
+
+    constant = client.get("/cardio/correlation", params={"cardio": True}).json()
+    assert constant["correlation_matrix"][-1] == [None] * len(constant["feature_names"])
+    assert constant["top_correlations"] == []
+
+
+def test_get_age_chart_for_age_range(client: TestClient):
+    """Test that the age range filters bound the age distribution."""
+    response = client.get("/cardio/charts/age", params={"age_min": 40, "age_max": 50})
+    assert response.status_code == 200
+    ages = [item["age"] for item in response.json()["data"]]
+
+    assert ages
+    assert min(ages) >= 40
+    assert max(ages) <= 50
+
+
+def test_get_chart_for_empty_cohort(client: TestClient):
+    """Test that a cohort without records is reported as not found."""
+    response = client.get("/cardio/charts/age", params={"age_min": 90})
+    assert response.status_code == 404
+
+
+def test_get_chart_for_invalid_cohort(client: TestClient):
+    """Test that invalid cohort filters are rejected."""
+    response = client.get("/cardio/charts/age", params={"gender": 3})
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("path, x, y", [
+    ("/cardio/charts/blood-pressure", "ap_hi", "ap_lo"),
+    ("/cardio/charts/blood-pressure-correlation", "ap_hi", "ap_lo"),
+    ("/cardio/charts/bmi-age", "age", "IMC"),
+])
+def test_get_density_chart(client: TestClient, path, x, y):
+    """Test that scatter charts can be returned as density grids over every record."""
+    total_records = client.get("/cardio/statistics").json()["total_records"]
+
+    response = client.get(path, params={"mode": "density", "bins": 10})
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["chart_type"] == "density"
+    assert sum(item["count"] for item in data["data"]) == total_records
+    for item in data["data"]:
+        assert item[f"{x}_min"] < item[f"{x}_max"]
+        assert item[f"{y}_min"] < item[f"{y}_max"]
+        assert item["cardio"] in [0, 1]
+    assert len({(item[f"{x}_min"], item[f"{y}_min"]) for item in data["data"]}) <= 10 * 10
+
+
+def test_get_density_chart_invalid_bins(client: TestClient):
+    """Test that the number of bins is bounded."""
+    response = client.get("/cardio/charts/bmi-age", params={"mode": "density", "bins": 1})
+    assert response.status_code == 422
+
+
+def test_get_dataset_pages(client: TestClient):
+    """Test that paging through the dataset with cursors returns every record once."""
+    full = client.get("/cardio/dataset").json()
+    assert full["next_cursor"] is None
+
+    assert client.get("/cardio/dataset", params={"limit": 20000}).status_code == 422
+
+    records = []
+    params = {"limit": 10000}
+    while True:
+        response = client.get("/cardio/dataset", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert page["total_records"] == full["total_records"]
+        assert len(page["data"]) <= 10000
+        records.extend(page["data"])
+        if page["next_cursor"] is None:
+            break
+        params["cursor"] = page["next_cursor"]
+
+    assert records == full["data"]
+
+
+def test_get_dataset_fields(client: TestClient):
+    """Test that the dataset records can be projected on a subset of columns."""
+    response = client.get("/cardio/dataset", params={"limit": 5, "fields": "age,ap_hi"})
+    assert response.status_code == 200
+    data = response.json()
+
+    assert len(data["data"]) == 5
+    for record in data["data"]:
+        assert list(record) == ["age", "ap_hi"]
+
+
+def test_get_dataset_invalid_parameters(client: TestClient):
+    """Test that unknown fields and invalid cursors are rejected."""
+    assert client.get("/cardio/dataset", params={"fields": "age,height"}).status_code == 400
+    assert client.get("/cardio/dataset", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_get_dataset_stale_cursor(client: TestClient):
+    """Test that a cursor issued for another dataset version is reported as a conflict."""
+    response = client.get("/cardio/dataset", params={"limit": 10, "cursor": encode_cursor(10, "old-version")})
+    assert response.status_code == 409
+
+
+def test_export_dataset_ndjson(client: TestClient):
+    """Test that the NDJSON export streams every record of the dataset."""
+    response = client.get("/cardio/dataset/export", params={"chunk_size": 1000})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert "cardio_dataset.ndjson" in response.headers["content-disposition"]
+
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert records == client.get("/cardio/dataset").json()["data"]
+
+
+def test_export_dataset_csv(client: TestClient):
+    """Test that the CSV export starts with a header and has one line per record."""
+    response = client.get("/cardio/dataset/export", params={"format": "csv", "fields": "age,IMC"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["age", "IMC"]
+    assert len(rows) - 1 == client.get("/cardio/statistics").json()["total_records"]
+
+
+def test_export_dataset_invalid_parameters(client: TestClient):
+    """Test that unknown fields, formats and chunk sizes are rejected."""
+    assert client.get("/cardio/dataset/export", params={"fields": "height"}).status_code == 400
+    assert client.get("/cardio/dataset/export", params={"format": "xml"}).status_code == 422
+    assert client.get("/cardio/dataset/export", params={"chunk_size": 10}).status_code == 422
+
+
+def test_get_dataset_columnar(client: TestClient):
+    """Test that the columnar layout holds the same values as the records."""
+    rows = client.get("/cardio/dataset", params={"limit": 100, "fields": "age,IMC"}).json()
+    response = client.get("/cardio/dataset", params={"limit": 100, "fields": "age,IMC", "layout": "columnar"})
+    assert response.status_code == 200
+    columnar = response.json()
+
+    assert "data" not in columnar
+    assert columnar["total_records"] == rows["total_records"]
+    assert columnar["next_cursor"] == rows["next_cursor"]
+    assert columnar["columns"] == {
+        "age": [record["age"] for record in rows["data"]],
+        "IMC": [record["IMC"] for record in rows["data"]],
+    }
+
+
+@pytest.mark.parametrize("mode", ["points", "density"])
+def test_get_scatter_chart_columnar(client: TestClient, mode: str):
+    """Test that the scatter charts can be returned in the columnar layout."""
+    rows = client.get("/cardio/charts/bmi-age", params={"mode": mode}).json()
+    response = client.get("/cardio/charts/bmi-age", params={"mode": mode, "layout": "columnar"})
+    assert response.status_code == 200
+    columnar = response.json()
+
+    assert columnar["title"] == rows["title"]
+    assert list(columnar["columns"]) == list(rows["data"][0])
+    assert [dict(zip(columnar["columns"], values)) for values in zip(*columnar["columns"].values())] == rows["data"]
+
+
+def test_get_chart_invalid_layout(client: TestClient):
+    """Test that unknown layouts are rejected."""
+    assert client.get("/cardio/charts/blood-pressure", params={"layout": "table"}).status_code == 422
+
+
+def test_export_dataset_binary(client: TestClient):
+    """Test that the binary export holds the columns of the dataset."""
+    response = client.get("/cardio/dataset/export", params={"format": "binary", "fields": "age,IMC"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+
+    columns = read_columns(response.content)
+    records = client.get("/cardio/dataset", params={"fields": "age,IMC", "layout": "columnar"}).json()["columns"]
+    assert {name: values.tolist() for name, values in columns.items()} == records
+
+
+@pytest.mark.parametrize("accept, content_type", [
+    ("application/octet-stream", "application/octet-stream"),
+    ("text/csv;q=0.5, application/x-ndjson;q=0.8", "application/x-ndjson"),
+    ("text/csv", "text/csv"),
+    ("*/*", "application/x-ndjson"),
+])
+def test_export_dataset_negotiates_format(client: TestClient, accept: str, content_type: str):
+    """Test that the export format is taken from the Accept header when not given."""
+    response = client.get("/cardio/dataset/export", params={"fields": "age"}, headers={"Accept": accept})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(content_type)
+
+
+PATIENT_RECORD = {
+    "age": 45, "gender": 2, "height": 180.0, "weight": 81.0, "ap_hi": 130, "ap_lo": 85,
+    "cholesterol": 2, "gluc": 1, "smoke": True, "alco": False, "active": True, "cardio": True,
+}
+
+
+def test_add_records(client: TestClient, dataset_copy):
+    """Test that appended records are reflected by the statistics and charts."""
+    before = client.get("/cardio/statistics").json()
+    gender = client.get("/cardio/charts/gender").json()
+
+    response = client.post("/cardio/records", json=[PATIENT_RECORD] * 3 + [{**PATIENT_RECORD, "ap_lo": 20}])
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["received"], result["appended"], result["rejected"]) == (4, 3, 1)
+    assert result["total_records"] == before["total_records"] + 3
+
+    after = client.get("/cardio/statistics")
+    assert after.json()["total_records"] == before["total_records"] + 3
+    assert after.json()["cardio_positive"] == before["cardio_positive"] + 3
+    assert client.get("/cardio/charts/gender").json()["data"][1]["num_sick_people"] == (
+        gender["data"][1]["num_sick_people"] + 3
+    )
+    assert client.get("/health/dataset").json()["appended_records"] == 3
+
+
+def test_add_records_are_persisted(client: TestClient, dataset_copy):
+    """Test that appended records are written to the journal of the dataset file and read back by the next load."""
+    loaded = len(dataset_store.get_dataset_store())
+    content = dataset_copy.read_bytes()
+    response = client.post("/cardio/records", json=[PATIENT_RECORD] * 2 + [{**PATIENT_RECORD, "ap_hi": 300}])
+    assert response.status_code == 200
+    assert dataset_copy.read_bytes() == content
+
+    reloaded = dataset_store.DatasetStore.load(str(dataset_copy))
+    assert len(reloaded) == loaded + 2
+    assert reloaded.columns["IMC"][-1] == pytest.approx(81 / 1.8 ** 2)
+    assert reloaded.columns["age"][-1] == PATIENT_RECORD["age"]
+
+
+def test_add_records_rejects_large_bodies(client: TestClient, dataset_copy):
+    """Test that a body of more records than accepted at once is rejected without appending any."""
+    response = client.post("/cardio/records", json=[PATIENT_RECORD] * (MAX_APPEND_RECORDS + 1))
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["type"] == "too_long"
+    assert dataset_store.get_dataset_store().appended_records == 0
+
+
+def test_add_records_rejects_invalid_ages(client: TestClient, dataset_copy):
+    """Test that records with an age out of bounds are rejected without appending any."""
+    for age in (-1, 121):
+        response = client.post("/cardio/records", json=[PATIENT_RECORD, {**PATIENT_RECORD, "age": age}])
+        assert response.status_code == 422
+    assert dataset_store.get_dataset_store().appended_records == 0
+    with pytest.raises(ValueError, match="negative"):
+        dataset_store.append_records(pd.DataFrame([{**PATIENT_RECORD, "age": -1}]))
+
+
+def test_add_records_requires_cardio_status(client: TestClient):
+    """Test that records without a cardiovascular disease status are rejected."""
+    record = {name: value for name, value in PATIENT_RECORD.items() if name != "cardio"}
+    response = client.post("/cardio/records", json=[record])
+    assert response.status_code == 422
@@ -0,0 +1,95 @@
+"""
+Tests for the cardio service.
+
+This module contains unit tests for the CardioService computations.
+"""
+
+import numpy as np
+import pytest
+
+from api.models.cardio import CohortFilter, Layout
+from api.services.cardio_service import CardioService
+from api.services.dataset_store import get_dataset_store
+from api.services.moments import Moments
+
+
+@pytest.fixture
+def cardio_service():
+    """The analysis service of the whole population."""
+    return CardioService(get_dataset_store())
+
+
+def test_scatter_charts_match_dataframe_sample(cardio_service):
+    """Test that the scatter charts contain the records DataFrame.sample would draw."""
+    sample_data = cardio_service.data.sample(n=5000, random_state=42)
+    expected = [
+        {'age': int(row['age']), 'IMC': float(row['IMC']), 'cardio': int(row['cardio'])}
+        for _, row in sample_data.iterrows()
+    ]
+
+    chart = cardio_service.get_bmi_age_chart()
+    assert chart.data == expected
+    assert [type(item['IMC']) for item in chart.data[:10]] == [float] * 10
+    assert [type(item['age']) for item in chart.data[:10]] == [int] * 10
+
+
+def test_scatter_sample_is_shared(cardio_service):
+    """Test that the scatter charts reuse a single sample per dataset version."""
+    first = cardio_service._scatter_sample()
+    second = CardioService(get_dataset_store())._scatter_sample()
+
+    assert first is second
+    assert len(first['ap_hi']) == 5000
+
+
+def test_density_grid_is_cached_per_bins(cardio_service):
+    """Test that density grids of the whole population are computed once per bin setting."""
+    first = cardio_service.get_bmi_age_density_chart(bins=15)
+    second = CardioService(get_dataset_store()).get_bmi_age_density_chart(bins=15)
+
+    assert first.data == second.data
+    assert cardio_service._density_columns('age', 'IMC', 15) is cardio_service._density_columns('age', 'IMC', 15)
+    assert sum(item['count'] for item in first.data) == len(cardio_service.data)
+
+
+def test_population_artifacts_are_memoized(cardio_service):
+    """Test that analyses of the whole population are computed once per set of arguments."""
+    other = CardioService(get_dataset_store())
+
+    assert cardio_service.get_dataset_statistics() is other.get_dataset_statistics()
+    assert cardio_service.get_bmi_age_chart() is other.get_bmi_age_chart(Layout.ROWS)
+    assert cardio_service.get_bmi_age_chart() is not other.get_bmi_age_chart(Layout.COLUMNAR)
+    assert cardio_service.get_bmi_age_density_chart(bins=12) is other.get_bmi_age_density_chart(12)
+
+
+def test_cohort_artifacts_are_not_memoized():
+    """Test that analyses of a cohort are computed on each call."""
+    cohort_service = CardioService(get_dataset_store(), CohortFilter(gender=1))
+    assert cohort_service.get_dataset_statistics() is not cohort_service.get_dataset_statistics()
+
+
+def test_cube_cohort_does_not_select_rows():
+    """Test that a cohort selected by the cube dimensions is counted from the cube cells, as from its rows."""
+    store = get_dataset_store()
+    cohort_service = CardioService(store, CohortFilter(gender=1, smoke=True, age_min=50, age_max=60))
+
+    chart = cohort_service.get_gender_distribution_chart()
+    moments = cohort_service._moments()
+    assert "rows" not in vars(cohort_service)
+
+    rows = cohort_service.rows
+    np.testing.assert_array_equal(cohort_service.cube.counts, store.cube.count(store.cells[rows]))
+    assert int(cohort_service.cube.counts.sum()) == len(rows)
+    assert chart.data[0]["num_healthy_people"] + chart.data[0]["num_sick_people"] == len(rows)
+    expected = Moments.from_columns(cohort_service.columns)
+    assert moments.count == expected.count
+    np.testing.assert_allclose(moments.correlation(), expected.correlation(), equal_nan=True)
+
+
+def test_filtered_cohort_selects_rows():
+    """Test that a cohort filtering a column outside the cube is counted from its rows."""
+    store = get_dataset_store()
+    cohort_service = CardioService(store, CohortFilter(gender=1, ap_hi_min=140))
+
+    assert "rows" in vars(cohort_service)
+    np.testing.assert_array_equal(cohort_service.cube.counts, store.cube.count(store.cells[cohort_service.rows]))
@@ -0,0 +1,71 @@
+"""
+Tests for the response compression utilities.
+
+This module contains tests for the negotiation of content codings and the compression of response bodies.
+"""
+
+import asyncio
+import gzip
+
+import pytest
+
+from api.utils.compression import ENCODINGS, compress, iter_compressed, negotiate_encoding
+from api.utils.negotiation import parse_preferences
+
+
+def test_parse_preferences():
+    """Test that tokens are ordered by quality, then by position."""
+    assert parse_preferences("text/csv;q=0.5, application/json, */*;q=0.1") == [
+        ("application/json", 1.0),
+        ("text/csv", 0.5),
+        ("*/*", 0.1),
+    ]
+    assert parse_preferences("gzip;q=oops, br") == [("br", 1.0), ("gzip", 0.0)]
+    assert parse_preferences(None) == []
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    (None, None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip, deflate", "gzip"),
+    ("gzip;q=0", None),
+    ("*;q=0.5, gzip;q=0.2", ENCODINGS[0]),
+])
+def test_negotiate_encoding(accept_encoding, expected):
+    """Test that the supported coding with the highest quality is chosen."""
+    assert negotiate_encoding(accept_encoding) == expected
+
+
+def test_negotiate_encoding_prefers_brotli():
+    """Test that brotli is preferred over gzip when both are accepted."""
+    pytest.importorskip("brotli")
+    assert negotiate_encoding("gzip, deflate, br") == "br"
+    assert negotiate_encoding("gzip, br;q=0.5") == "gzip"
+
+
+def test_gzip_is_deterministic():
+    """Test that compressing the same body twice gives the same bytes."""
+    body = b'{"data": [1, 2, 3]}' * 100
+    assert compress(body, "gzip") == compress(body, "gzip")
+    assert gzip.decompress(compress(body, "gzip")) == body
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_iter_compressed(encoding):
+    """Test that a compressed stream decompresses to the concatenated chunks."""
+    chunks = [b"first chunk\n" * 50, b"", b"second chunk\n" * 50]
+
+    async def source():
+        for chunk in chunks:
+            yield chunk
+
+    async def collect():
+        return b"".join([chunk async for chunk in iter_compressed(source(), encoding)])
+
+    compressed = asyncio.run(collect())
+    if encoding == "br":
+        import brotli
+        assert brotli.decompress(compressed) == b"".join(chunks)
+    else:
+        assert gzip.decompress(compressed) == b"".join(chunks)
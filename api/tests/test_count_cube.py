@@ -0,0 +1,67 @@
+"""
+Tests for the count cube.
+
+This module contains tests for the dense count cube backing the categorical charts.
+"""
+
+import numpy as np
+import pytest
+
+from api.services.count_cube import CUBE_DIMENSIONS, CountCube
+from api.services.dataset_store import get_dataset_store
+
+
+@pytest.fixture
+def store():
+    """The shared dataset store."""
+    return get_dataset_store()
+
+
+def test_cube_counts_every_record(store):
+    """Test that the cube holds one count per record."""
+    assert store.cube.dimensions == CUBE_DIMENSIONS
+    assert int(store.cube.counts.sum()) == len(store)
+
+
+@pytest.mark.parametrize("column", ["age", "gender", "cholesterol", "gluc", "smoke", "alco", "active"])
+def test_breakdown_matches_pivot_table(store, column):
+    """Test that marginalizing the cube gives the same counts as a pivot table."""
+    pivot = store.data.pivot_table(index=column, columns="cardio", aggfunc="size", fill_value=0)
+
+    levels, table = store.cube.breakdown(column, by="cardio")
+    np.testing.assert_array_equal(levels, pivot.index.to_numpy())
+    np.testing.assert_array_equal(table, pivot.to_numpy())
+
+
+def test_margin_keeps_requested_axis_order(store):
+    """Test that margins are returned with their axes in the requested order."""
+    np.testing.assert_array_equal(
+        store.cube.margin("cardio", "gender"),
+        store.cube.margin("gender", "cardio").T,
+    )
+
+
+def test_breakdown_skips_empty_levels():
+    """Test that levels without records are left out of a breakdown."""
+    columns = {
+        "gender": np.array([1, 1, 2, 2]),
+        "cardio": np.array([0, 1, 0, 1]),
+    }
+    cube = CountCube.from_columns(columns, dimensions=("gender", "cardio"))
+    cube.counts = cube.count(cube.encode({name: values[:2] for name, values in columns.items()}))
+
+    levels, table = cube.breakdown("gender")
+    assert levels.tolist() == [1]
+    assert table.tolist() == [[1, 1]]
+
+
+def test_merge_matches_cube_of_every_record(store):
+    """Test that merging the cubes of two slices gives the cube of every record."""
+    head = CountCube.from_columns({name: values[:100] for name, values in store.columns.items()})
+    tail = CountCube.from_columns({name: values[100:] for name, values in store.columns.items()})
+    merged = head.merge(tail)
+
+    assert head.shape != store.cube.shape
+    for name in CUBE_DIMENSIONS:
+        np.testing.assert_array_equal(merged.levels[name], store.cube.levels[name])
+    np.testing.assert_array_equal(merged.counts, store.cube.counts)
@@ -0,0 +1,109 @@
+"""
+Tests for the dataset cache.
+
+This module contains tests for the binary columnar cache of the preprocessed dataset.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from api.services import dataset_store
+from api.services.dataset_store import DATASET_PATH, DatasetStore
+
+
+@pytest.fixture
+def source(tmp_path):
+    """Create a small copy of the dataset source."""
+    path = tmp_path / "cardio_sample.csv"
+    with open(DATASET_PATH) as full_source:
+        lines = [next(full_source) for _ in range(501)]
+    path.write_text("".join(lines))
+    return str(path)
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    """Directory holding the cache entries of a test."""
+    return str(tmp_path / "cache")
+
+
+def test_first_load_writes_cache(source, cache_dir):
+    """Test that loading a source without cache entry parses it and writes the cache."""
+    store = DatasetStore.load(source, cache_dir)
+
+    assert not store.from_cache
+    entries = os.listdir(cache_dir)
+    assert len(entries) == 1
+    assert "manifest.json" in os.listdir(os.path.join(cache_dir, entries[0]))
+
+
+def test_second_load_reads_cache(source, cache_dir):
+    """Test that the cached columns match the preprocessed source."""
+    parsed = DatasetStore.load(source, cache_dir)
+    cached = DatasetStore.load(source, cache_dir)
+
+    assert cached.from_cache
+    assert cached.version == parsed.version
+    assert list(cached.columns) == list(parsed.columns)
+    for name, values in parsed.columns.items():
+        assert cached.columns[name].dtype == values.dtype
+        np.testing.assert_array_equal(cached.columns[name], values)
+
+
+def test_source_change_invalidates_cache(source, cache_dir):
+    """Test that changing the source content rebuilds the cache."""
+    first = DatasetStore.load(source, cache_dir)
+
+    with open(source) as source_file:
+        lines = source_file.readlines()
+    with open(source, "w") as source_file:
+        source_file.writelines(lines[:-10])
+
+    second = DatasetStore.load(source, cache_dir)
+    assert not second.from_cache
+    assert second.version != first.version
+    assert len(os.listdir(cache_dir)) == 1
+
+
+def test_preprocessing_version_invalidates_cache(source, cache_dir, monkeypatch):
+    """Test that bumping the preprocessing version rebuilds the cache."""
+    DatasetStore.load(source, cache_dir)
+
+    monkeypatch.setattr(dataset_store, "PREPROCESSING_VERSION", dataset_store.PREPROCESSING_VERSION + 1)
+    store = DatasetStore.load(source, cache_dir)
+    assert not store.from_cache
+
+
+def test_corrupted_cache_falls_back_to_source(source, cache_dir):
+    """Test that an unreadable cache entry is ignored."""
+    parsed = DatasetStore.load(source, cache_dir)
+
+    entry = os.path.join(cache_dir, os.listdir(cache_dir)[0])
+    with open(os.path.join(entry, "manifest.json"), "w") as manifest_file:
+        manifest_file.write("{")
+
+    store = DatasetStore.load(source, cache_dir)
+    assert not store.from_cache
+    assert len(store) == len(parsed)
+
+
+def test_columns_are_memory_mapped(source, cache_dir):
+    """Test that the store maps the cache files instead of keeping private copies."""
+    for store in (DatasetStore.load(source, cache_dir), DatasetStore.load(source, cache_dir)):
+        assert store.memory_mapped
+        for name, values in store.columns.items():
+            assert isinstance(values, np.memmap)
+            assert not values.flags.writeable
+            assert np.shares_memory(store.data[name].to_numpy(), values)
+
+
+def test_imc_float32_opt_in(source, cache_dir):
+    """Test that the BMI can be stored as float32 under its own cache version."""
+    default = DatasetStore.load(source, cache_dir)
+    compact = DatasetStore.load(source, cache_dir, imc_float32=True)
+
+    assert compact.version != default.version
+    assert compact.columns["IMC"].dtype == np.float32
+    np.testing.assert_allclose(compact.columns["IMC"], default.columns["IMC"], rtol=1e-6)
@@ -0,0 +1,97 @@
+"""
+Tests for the dataset registry.
+
+This module contains tests for the registry serving several dataset versions side
+by side and for the dataset query parameter of the /cardio endpoints.
+"""
+
+import pytest
+from starlette.testclient import TestClient
+
+from api.services import dataset_cache
+from api.services.dataset_registry import DatasetRegistry, UnknownDatasetError, registry
+from api.services.dataset_store import DATASET_PATH, get_dataset_store
+from api.utils.lru import SizedLRUCache
+
+
+@pytest.fixture
+def directory(tmp_path, monkeypatch):
+    """A registry directory holding two slices of the dataset, cached in the test directory."""
+    monkeypatch.setattr(dataset_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    with open(DATASET_PATH) as source:
+        header = source.readline()
+        rows = source.readlines()
+    (tmp_path / "hopital_a.csv").write_text(header + "".join(rows[:2000]))
+    (tmp_path / "hopital_b.csv").write_text(header + "".join(rows[2000:5000]))
+    (tmp_path / "notes.txt").write_text("not a dataset")
+    return str(tmp_path)
+
+
+@pytest.fixture
+def shared_registry(directory, monkeypatch):
+    """The registry of the application, reading the test directory with an empty cache."""
+    monkeypatch.setattr(registry, "directory", directory)
+    monkeypatch.setattr(registry, "cache", SizedLRUCache(1 << 30, sizeof=lambda store: store.footprint_bytes))
+    monkeypatch.setattr(registry, "loads", 0)
+    return registry
+
+
+def test_registry_loads_lazily(directory):
+    """Test that datasets are loaded on first use and served from memory afterwards."""
+    datasets = DatasetRegistry(directory, max_bytes=1 << 30, default="cardio_train")
+
+    assert datasets.names() == ["cardio_train", "hopital_a", "hopital_b"]
+    assert datasets.stats()["entries"] == 0
+    first = datasets.get("hopital_a")
+    assert datasets.get("hopital_a") is first
+    assert len(first) < 2000
+    assert datasets.get(None) is datasets.get("cardio_train") is get_dataset_store()
+    assert {key: datasets.stats()[key] for key in ("entries", "hits", "misses", "loads")} == {
+        "entries": 1, "hits": 1, "misses": 1, "loads": 1,
+    }
+
+
+def test_registry_evicts_least_recently_used(directory):
+    """Test that the resident datasets stay within the memory budget."""
+    datasets = DatasetRegistry(directory, max_bytes=1 << 30)
+    sizes = {name: datasets.get(name).footprint_bytes for name in ("hopital_a", "hopital_b")}
+    datasets = DatasetRegistry(directory, max_bytes=max(sizes.values()))
+
+    datasets.get("hopital_a")
+    datasets.get("hopital_b")
+    assert "hopital_a" not in datasets.cache
+    datasets.get("hopital_a")
+
+    stats = datasets.stats()
+    assert (stats["entries"], stats["evictions"], stats["loads"]) == (1, 2, 3)
+    assert stats["bytes"] == sizes["hopital_a"] <= stats["max_bytes"]
+
+
+@pytest.mark.parametrize("name", ["hopital_c", "notes", "../dataset/cardio_train", ""])
+def test_registry_rejects_unknown_datasets(directory, name):
+    """Test that only the files of the registry directory are served."""
+    with pytest.raises(UnknownDatasetError):
+        DatasetRegistry(directory).get(name)
+
+
+def test_dataset_parameter(client: TestClient, shared_registry):
+    """Test that the /cardio endpoints serve the selected dataset, tagged with its version."""
+    default = client.get("/cardio/statistics")
+    selected = client.get("/cardio/statistics", params={"dataset": "hopital_a"})
+    other = client.get("/cardio/charts/gender", params={"dataset": "hopital_b", "gender": 1})
+
+    assert selected.status_code == other.status_code == 200
+    assert selected.json()["total_records"] == len(shared_registry.get("hopital_a"))
+    assert selected.json()["total_records"] < default.json()["total_records"]
+    assert selected.headers["etag"] != default.headers["etag"]
+    assert client.get(
+        "/cardio/statistics", params={"dataset": "hopital_a"}, headers={"If-None-Match": selected.headers["etag"]}
+    ).status_code == 304
+    assert client.get("/health/metrics").json()["dataset_registry"]["loads"] == 2
+
+
+def test_dataset_parameter_errors(client: TestClient, shared_registry):
+    """Test that unknown datasets are not found and that registered ones do not accept records."""
+    assert client.get("/cardio/statistics", params={"dataset": "hopital_c"}).status_code == 404
+    response = client.post("/cardio/records", params={"dataset": "hopital_a"}, json=[])
+    assert response.status_code == 400
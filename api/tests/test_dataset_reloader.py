@@ -0,0 +1,148 @@
+"""
+Tests for the dataset reloader.
+
+This module contains tests for the reload of the dataset when its source file
+changes, and for the swap of the process-wide store.
+"""
+
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from api.services import dataset_cache, dataset_reloader, dataset_store
+from api.services.cardio_service import CardioService
+from api.services.dataset_reloader import DatasetReloader
+from api.services.dataset_store import (
+    DATASET_PATH, DatasetStore, append_records, append_to_journal, get_dataset_store
+)
+from api.services.warmup import Warmup
+
+RECORD = {
+    "age": 50, "gender": 1, "height": 170.0, "weight": 70.0, "ap_hi": 120, "ap_lo": 80,
+    "cholesterol": 1, "gluc": 1, "smoke": 0, "alco": 0, "active": 1, "cardio": 1,
+}
+
+
+@pytest.fixture
+def rows():
+    """Header and rows of the dataset source."""
+    with open(DATASET_PATH) as source:
+        return source.readline(), source.readlines()
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch, rows):
+    """A small source file served as the process-wide store, cached in the test directory."""
+    monkeypatch.setattr(dataset_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    header, lines = rows
+    path = tmp_path / "cardio_train.csv"
+    path.write_text(header + "".join(lines[:3000]))
+    monkeypatch.setattr(dataset_store, "_store", DatasetStore.load(str(path)))
+    monkeypatch.setattr(dataset_store, "_load_count", dataset_store._load_count)
+    return path
+
+
+def _rewrite(path, text):
+    """Write a file with a modification time distinct from the previous one."""
+    path.write_text(text)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_reload_swaps_the_store(source, rows):
+    """Test that a changed source is published once stable, leaving the previous snapshot intact."""
+    header, lines = rows
+    reloader = DatasetReloader(str(source), interval=0.01)
+    previous = get_dataset_store()
+    statistics = CardioService(previous).get_dataset_statistics()
+
+    assert not reloader.check()
+    _rewrite(source, header + "".join(lines[:4000]))
+    assert not reloader.check()
+    assert get_dataset_store() is previous
+    assert reloader.check()
+
+    current = get_dataset_store()
+    assert current.version != previous.version
+    assert len(current) > len(previous)
+    assert CardioService(previous).get_dataset_statistics() is statistics
+    assert reloader.stats() == {"checks": 3, "reloads": 1, "failures": 0}
+
+
+def test_reload_reads_appended_records(source):
+    """Test that records appended by another worker are read from the journal, and that the source is unchanged."""
+    loaded = len(get_dataset_store())
+    content = source.read_bytes()
+    reloader = DatasetReloader(str(source), interval=0.01)
+    append_to_journal(str(source), pd.DataFrame([RECORD] * 3))
+
+    assert not reloader.check()
+    assert reloader.check()
+    reloaded = get_dataset_store()
+    assert (len(reloaded), reloaded.appended_records) == (loaded + 3, 3)
+    assert source.read_bytes() == content
+
+    append_records(pd.DataFrame([RECORD]))
+    assert not reloader.reload()
+    assert len(get_dataset_store()) == loaded + 4
+
+
+def test_reload_skips_sources_changed_while_loading(source, rows, monkeypatch):
+    """Test that a store read before records were appended is not published, and that the next check reloads."""
+    header, lines = rows
+    reloader = DatasetReloader(str(source), interval=0.01)
+
+    class AppendingWarmup(Warmup):
+        def run(self, *args, **kwargs):
+            super().run(*args, **kwargs)
+            append_records(pd.DataFrame([RECORD] * 2))
+
+    monkeypatch.setattr(dataset_reloader, "Warmup", AppendingWarmup)
+    _rewrite(source, header + "".join(lines[:4000]))
+    previous = get_dataset_store()
+    assert not reloader.reload()
+    assert get_dataset_store() is not previous
+    assert get_dataset_store().appended_records == 2
+    loaded = len(DatasetStore.load(str(source)))
+
+    monkeypatch.setattr(dataset_reloader, "Warmup", Warmup)
+    assert not reloader.check()
+    assert reloader.check()
+    reloaded = get_dataset_store()
+    assert (len(reloaded), reloaded.appended_records) == (loaded, 2)
+    assert reloaded._memo
+
+
+def test_reload_ignores_unchanged_and_invalid_sources(source, rows):
+    """Test that a touched source is not republished and that a broken one leaves the store in place."""
+    header, lines = rows
+    previous = get_dataset_store()
+    reloader = DatasetReloader(str(source), interval=0.01)
+
+    _rewrite(source, header + "".join(lines[:3000]))
+    assert not reloader.reload()
+    _rewrite(source, "not;a;dataset\n1;2;3\n")
+    assert not reloader.reload()
+    assert get_dataset_store() is previous
+    assert reloader.stats()["failures"] == 1
+
+
+def test_background_reload(source, rows):
+    """Test that the watcher thread publishes a changed source and reports its warm-up."""
+    header, lines = rows
+    warmups = []
+    reloader = DatasetReloader(str(source), interval=0.02)
+    reloader.start(on_reload=warmups.append)
+    try:
+        _rewrite(source, header + "".join(lines[:5000]))
+        deadline = time.monotonic() + 10
+        while not warmups and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        reloader.stop()
+
+    assert len(warmups) == 1
+    assert warmups[0].ready
+    assert warmups[0].store is get_dataset_store()
@@ -0,0 +1,157 @@
+"""
+Tests for the dataset store.
+
+This module contains tests for the process-wide dataset store and the health router.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from starlette.testclient import TestClient
+
+from api.main import app
+from api.routers.cardio import get_cardio_service
+from api.services.cardio_service import CardioService
+from api.services.dataset_store import DatasetStore, append_records, get_dataset_store
+
+
+def test_dataset_store_is_shared():
+    """Test that the store is loaded once and shared by every service."""
+    store = get_dataset_store()
+    assert get_dataset_store() is store
+
+    first = get_cardio_service(store)
+    second = get_cardio_service(store)
+    assert first.data is second.data
+    assert store.info()["load_count"] == 1
+
+
+def test_dataset_store_is_read_only():
+    """Test that the store columns cannot be modified."""
+    store = get_dataset_store()
+    for values in store.columns.values():
+        assert not values.flags.writeable
+
+    with pytest.raises(ValueError):
+        store.columns["age"][0] = 0
+
+
+def test_dataset_store_preprocessing():
+    """Test that the store contains the preprocessed columns."""
+    store = get_dataset_store()
+
+    assert isinstance(store, DatasetStore)
+    assert "id" not in store.columns
+    assert "height" not in store.columns
+    assert "weight" not in store.columns
+    assert store.data["ap_hi"].between(90, 200).all()
+    assert store.data["ap_lo"].between(60, 140).all()
+    assert store.data["IMC"].between(10, 80).all()
+
+
+def test_lifespan_loads_dataset():
+    """Test that the application lifespan loads the store before serving."""
+    with TestClient(app) as client:
+        response = client.get("/health/dataset")
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["total_records"] == len(get_dataset_store())
+    assert data["load_count"] == 1
+    assert data["memory_bytes"] > 0
+    assert data["footprint_bytes"] > data["memory_bytes"]
+    assert data["load_time"] > 0
+
+
+def test_dataset_store_compact_dtypes():
+    """Test that the store keeps each column in its narrowest exact dtype."""
+    store = get_dataset_store()
+
+    for name in ("age", "gender", "cholesterol", "gluc", "smoke", "alco", "active", "cardio"):
+        assert store.columns[name].dtype == np.int8
+    assert store.columns["ap_hi"].dtype == np.int16
+    assert store.columns["ap_lo"].dtype == np.int16
+    assert store.columns["IMC"].dtype == np.float64
+    assert store.memory_bytes < store.original_memory_bytes
+
+
+def test_compact_store_matches_original_dtypes():
+    """Test that the service returns the same results on compact and original dtypes."""
+    store = get_dataset_store()
+    wide_columns = {
+        name: values.astype(np.int64 if np.issubdtype(values.dtype, np.integer) else np.float64)
+        for name, values in store.columns.items()
+    }
+    wide_store = DatasetStore(wide_columns, source=store.source, version=store.version, load_time=0.0)
+
+    compact_service = CardioService(store)
+    wide_service = CardioService(wide_store)
+    assert compact_service.get_dataset_statistics() == wide_service.get_dataset_statistics()
+    assert compact_service.get_correlation_analysis() == wide_service.get_correlation_analysis()
+    assert compact_service.get_all_charts() == wide_service.get_all_charts()
+
+
+def _split_store(store, rows):
+    """Build a store of the first rows of a store, and the columns of the remaining rows."""
+    head = DatasetStore(
+        {name: values[:rows] for name, values in store.columns.items()},
+        source=store.source,
+        version=store.version,
+        load_time=0.0,
+    )
+    return head, {name: values[rows:] for name, values in store.columns.items()}
+
+
+def test_append_matches_full_load():
+    """Test that appending records updates the aggregates as if the store was loaded with them."""
+    store = get_dataset_store()
+    head, tail = _split_store(store, 50000)
+    appended = head.append(tail)
+
+    assert len(head) == 50000
+    assert len(appended) == len(store)
+    assert appended.appended_records == len(store) - 50000
+    assert appended.version.startswith(store.version + "+")
+    np.testing.assert_array_equal(appended.cube.counts, store.cube.counts)
+    np.testing.assert_array_equal(appended.cells, store.cells)
+    np.testing.assert_allclose(appended.moments.comoments, store.moments.comoments)
+    np.testing.assert_array_equal(appended.moment_cube.counts, store.moment_cube.counts)
+    np.testing.assert_allclose(appended.moment_cube.comoments, store.moment_cube.comoments, atol=1e-6)
+
+    statistics = CardioService(appended).get_dataset_statistics(exact=True)
+    expected = CardioService(store).get_dataset_statistics(exact=True)
+    assert (statistics.total_records, statistics.cardio_positive) == (expected.total_records, expected.cardio_positive)
+    assert statistics.age_range == pytest.approx(expected.age_range)
+    assert statistics.bmi_range == pytest.approx(expected.bmi_range)
+    for pressure, summary in expected.blood_pressure_range.items():
+        assert statistics.blood_pressure_range[pressure] == pytest.approx(summary)
+    assert CardioService(appended).get_correlation_analysis() == CardioService(store).get_correlation_analysis()
+    assert CardioService(appended).get_all_charts() == CardioService(store).get_all_charts()
+
+
+def test_append_new_level_rebuilds_cube():
+    """Test that records with an age absent from the store rebuild the count cube."""
+    store = get_dataset_store()
+    record = {name: values[:1] for name, values in store.columns.items()}
+    record["age"] = np.array([90])
+    appended = store.append(record)
+
+    assert 90 in appended.cube.levels["age"]
+    assert int(appended.cube.counts.sum()) == len(store) + 1
+    assert store.cube.counts.sum() == len(store)
+
+
+def test_append_records_preprocesses_and_replaces_store(dataset_copy):
+    """Test that appended records are preprocessed and replace the shared store."""
+    store = get_dataset_store()
+    record = {
+        "age": 50, "gender": 1, "height": 170.0, "weight": 70.0, "ap_hi": 120, "ap_lo": 80,
+        "cholesterol": 1, "gluc": 1, "smoke": 0, "alco": 0, "active": 1, "cardio": 1,
+    }
+    data = pd.DataFrame([record, {**record, "ap_hi": 300}])
+
+    appended, kept = append_records(data)
+    assert kept == 1
+    assert get_dataset_store() is appended
+    assert len(appended) == len(store) + 1
+    assert appended.columns["IMC"][-1] == pytest.approx(70 / 1.7 ** 2)
@@ -0,0 +1,121 @@
+"""
+Tests for the dataset summary.
+
+This module contains tests for the out-of-core mode, which summarizes the dataset
+chunk by chunk instead of holding its records in memory.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from starlette.testclient import TestClient
+
+from api.models.cardio import CohortFilter
+from api.services import dataset_store
+from api.services.cardio_service import CardioService
+from api.services.dataset_store import (
+    DATASET_PATH, DatasetStore, DatasetSummary, RecordsUnavailableError, append_to_journal, get_dataset_store
+)
+from api.services.warmup import SUMMARY_ARTIFACTS, Warmup
+
+
+@pytest.fixture(scope="module")
+def summary():
+    """The dataset summarized in chunks of 10000 source rows."""
+    return DatasetSummary.load(chunk_size=10000)
+
+
+def test_summary_matches_store(summary):
+    """Test that the summary aggregates are the ones of the in-memory store."""
+    store = get_dataset_store()
+
+    assert summary.chunks == 7
+    assert len(summary) == len(store)
+    np.testing.assert_array_equal(summary.cube.counts, store.cube.counts)
+    np.testing.assert_allclose(summary.moments.mean, store.moments.mean)
+    np.testing.assert_allclose(summary.moments.comoments, store.moments.comoments)
+    for column in ("age", "ap_hi", "ap_lo", "IMC"):
+        assert summary.median(column) == store.median(column)
+
+
+def test_empty_source(tmp_path):
+    """Test that a source holding its header only is rejected with a clear error by both loaders."""
+    path = tmp_path / "empty.csv"
+    with open(DATASET_PATH) as source:
+        path.write_text(source.readline())
+
+    with pytest.raises(ValueError, match="holds no record"):
+        DatasetSummary.load(str(path))
+    with pytest.raises(ValueError, match="holds no record"):
+        DatasetStore.load(str(path), cache_dir=str(tmp_path / "cache"))
+
+
+def test_summary_reads_journal(summary, dataset_copy):
+    """Test that the records appended to the journal of the source are folded after its chunks."""
+    record = {
+        "age": 50, "gender": 1, "height": 170.0, "weight": 70.0, "ap_hi": 120, "ap_lo": 80,
+        "cholesterol": 1, "gluc": 1, "smoke": 0, "alco": 0, "active": 1, "cardio": 1,
+    }
+    append_to_journal(str(dataset_copy), pd.DataFrame([record] * 4))
+    journaled = DatasetSummary.load(str(dataset_copy), chunk_size=10000)
+
+    assert len(journaled) == len(summary) + 4
+    assert journaled.version != summary.version
+    assert journaled.version == DatasetSummary.load(str(dataset_copy), chunk_size=10000).version
+
+
+def test_summary_serves_aggregate_analyses(summary):
+    """Test that the statistics, categorical charts and correlation analysis are served from the summary."""
+    summarized = CardioService(summary)
+    loaded = CardioService(get_dataset_store())
+
+    statistics = summarized.get_dataset_statistics(quantiles=(0.05, 0.95), exact=True)
+    expected = loaded.get_dataset_statistics(quantiles=(0.05, 0.95), exact=True)
+    assert statistics.total_records == len(summary)
+    assert statistics.age_range == pytest.approx(expected.age_range)
+    assert statistics.quantiles["IMC"] == pytest.approx(expected.quantiles["IMC"])
+    assert summarized.get_correlation_analysis() == loaded.get_correlation_analysis()
+    assert summarized.get_age_distribution_chart() == loaded.get_age_distribution_chart()
+    assert summarized.get_risk_factors_radar_chart() == loaded.get_risk_factors_radar_chart()
+
+
+def test_summary_serves_cube_cohorts(summary):
+    """Test that analyses of a cohort selected by the cube dimensions are served from the summary."""
+    cohort = CohortFilter(gender=2, cholesterol=3, age_max=55)
+    summarized = CardioService(summary, cohort)
+    loaded = CardioService(get_dataset_store(), cohort)
+
+    assert summarized.get_correlation_analysis() == loaded.get_correlation_analysis()
+    assert summarized.get_smoking_chart() == loaded.get_smoking_chart()
+
+
+def test_summary_rejects_record_analyses(summary):
+    """Test that analyses needing the records raise RecordsUnavailableError."""
+    with pytest.raises(RecordsUnavailableError):
+        CardioService(summary).get_blood_pressure_chart()
+    with pytest.raises(RecordsUnavailableError):
+        len(summary.data)
+
+
+def test_warmup_of_summary(summary):
+    """Test that the warm-up computes the artifacts available from the summary only."""
+    warmup = Warmup(summary)
+    warmup.run(workers=2)
+
+    assert warmup.ready
+    assert set(warmup.durations) == set(SUMMARY_ARTIFACTS)
+
+
+def test_out_of_core_endpoints(client: TestClient, summary, monkeypatch):
+    """Test the endpoints served by a worker in out-of-core mode."""
+    monkeypatch.setattr(dataset_store, "_store", summary)
+
+    assert client.get("/cardio/statistics").json()["total_records"] == len(summary)
+    assert client.get("/cardio/charts/gender").status_code == 200
+    assert client.get("/cardio/correlation").status_code == 200
+    assert client.get("/cardio/charts/blood-pressure").status_code == 501
+    assert client.get("/cardio/charts/gender", params={"cardio": True}).status_code == 200
+    assert client.get("/cardio/correlation", params={"gender": 1, "age_min": 50}).status_code == 200
+    assert client.get("/cardio/correlation", params={"ap_hi_min": 140}).status_code == 501
+    assert client.get("/cardio/dataset").status_code == 501
+    assert client.get("/health/dataset").json()["out_of_core"] is True
@@ -0,0 +1,72 @@
+"""
+Tests for the bounded executors.
+
+This module contains tests for the workload pools running the blocking service calls off the event loop.
+"""
+
+import asyncio
+import threading
+
+import pytest
+from starlette.testclient import TestClient
+
+from api.services.cardio_service import CardioService
+from api.utils import executors
+from api.utils.executors import ANALYTICS, POOL_SIZES, executor_stats, get_executor, run_in_pool, shutdown_executors
+
+
+def test_run_in_pool_uses_workload_threads():
+    """Test that calls run in a thread of their workload pool."""
+    name = asyncio.run(run_in_pool(ANALYTICS, lambda: threading.current_thread().name))
+    assert name.startswith(ANALYTICS)
+    assert get_executor(ANALYTICS)._max_workers == POOL_SIZES[ANALYTICS]
+
+
+def test_run_in_pool_passes_arguments_and_errors():
+    """Test that arguments are passed and exceptions raised to the caller."""
+    assert asyncio.run(run_in_pool(ANALYTICS, sorted, [3, 1, 2], reverse=True)) == [3, 2, 1]
+    with pytest.raises(ZeroDivisionError):
+        asyncio.run(run_in_pool(ANALYTICS, divmod, 1, 0))
+
+
+def test_pending_calls_are_counted():
+    """Test that running calls are reported in the pool statistics."""
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    async def scenario():
+        task = asyncio.ensure_future(run_in_pool(executors.EXPORT, block))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        pending = executor_stats()[executors.EXPORT]["pending"]
+        release.set()
+        await task
+        return pending
+
+    assert asyncio.run(scenario()) == 1
+    assert executor_stats()[executors.EXPORT]["pending"] == 0
+
+
+def test_cohort_selection_runs_in_analytics_pool(client: TestClient, monkeypatch):
+    """Test that the records of a cohort are selected in the analytics pool rather than the default one."""
+    threads = []
+    load_data = CardioService.load_data
+
+    def recording(self):
+        threads.append(threading.current_thread().name)
+        load_data(self)
+
+    monkeypatch.setattr(CardioService, "load_data", recording)
+    response = client.get("/cardio/charts/gender", params={"cholesterol": 3, "gluc": 2, "active": 0})
+
+    assert response.status_code == 200
+    assert threads and all(name.startswith(ANALYTICS) for name in threads)
+
+
+def test_shutdown_recreates_pools():
+    """Test that pools are created again after a shutdown."""
+    pool = get_executor(ANALYTICS)
+    shutdown_executors()
+    assert get_executor(ANALYTICS) is not pool
@@ -0,0 +1,159 @@
+"""
+Tests for the HTTP caching utilities.
+
+This module contains tests for the ETag and conditional GET support of the cardio router.
+"""
+
+import pytest
+from starlette.testclient import TestClient
+
+from api.main import app
+from api.routers.cardio import get_cohort_service
+from api.services import dataset_store
+from api.utils import http_cache
+from api.utils.http_cache import etag_matches, response_cache
+
+
+@pytest.mark.parametrize("path", ["/cardio/statistics", "/cardio/charts/age", "/cardio/correlation"])
+def test_responses_carry_etag(client: TestClient, path):
+    """Test that analytics responses carry a stable ETag and Cache-Control header."""
+    first = client.get(path)
+    second = client.get(path)
+
+    assert first.status_code == 200
+    assert first.headers["etag"].startswith('"')
+    assert first.headers["etag"] == second.headers["etag"]
+    assert "max-age" in first.headers["cache-control"]
+
+
+def test_etag_depends_on_query(client: TestClient):
+    """Test that different queries get different tags and equivalent queries the same."""
+    full = client.get("/cardio/charts/age").headers["etag"]
+    cohort = client.get("/cardio/charts/age?gender=1&smoke=0").headers["etag"]
+    reordered = client.get("/cardio/charts/age?smoke=0&gender=1").headers["etag"]
+
+    assert full != cohort
+    assert cohort == reordered
+
+
+def _vary(response):
+    return [name.strip().lower() for name in response.headers.get("vary", "").split(",")]
+
+
+def test_etag_depends_on_declared_headers(client: TestClient):
+    """Test that the headers read by an endpoint are part of its ETag and listed in Vary."""
+    csv = client.get("/cardio/dataset/export", headers={"Accept": "text/csv"})
+    binary = client.get("/cardio/dataset/export", headers={"Accept": "application/octet-stream"})
+
+    assert csv.headers["etag"] != binary.headers["etag"]
+    assert "accept" in _vary(csv)
+    assert "accept" not in _vary(client.get("/cardio/charts/age"))
+
+
+def test_conditional_get_skips_service(client: TestClient):
+    """Test that a matching If-None-Match header gets a 304 without computing anything."""
+    etag = client.get("/cardio/charts/gender").headers["etag"]
+
+    def fail():
+        raise AssertionError("The analysis service must not be used")
+
+    app.dependency_overrides[get_cohort_service] = fail
+    try:
+        response = client.get("/cardio/charts/gender", headers={"If-None-Match": etag})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+
+def test_cached_body_skips_service(client: TestClient):
+    """Test that a response already computed for the same tag is served from the cache."""
+    first = client.get("/cardio/charts/bmi-age")
+    assert first.headers["etag"] in response_cache
+
+    def fail():
+        raise AssertionError("The analysis service must not be used")
+
+    app.dependency_overrides[get_cohort_service] = fail
+    try:
+        second = client.get("/cardio/charts/bmi-age")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert second.status_code == 200
+    assert second.headers["content-type"] == "application/json"
+    assert second.headers["etag"] == first.headers["etag"]
+    assert second.content == first.content
+
+
+def test_responses_are_compressed_once(client: TestClient):
+    """Test that compressed bodies have their own tag and are served from the cache."""
+    identity = client.get("/cardio/charts/bmi-age", headers={"Accept-Encoding": "identity"})
+    first = client.get("/cardio/charts/bmi-age", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in identity.headers
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["etag"] == identity.headers["etag"][:-1] + '-gzip"'
+    assert "accept-encoding" in _vary(first)
+    assert first.content == identity.content
+
+    def fail():
+        raise AssertionError("The analysis service must not be used")
+
+    app.dependency_overrides[get_cohort_service] = fail
+    try:
+        second = client.get("/cardio/charts/bmi-age", headers={"Accept-Encoding": "gzip"})
+        revalidated = client.get(
+            "/cardio/charts/bmi-age",
+            headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]},
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert second.headers["content-encoding"] == "gzip"
+    assert second.content == first.content
+    assert revalidated.status_code == 304
+
+
+def test_streamed_responses_are_compressed(client: TestClient):
+    """Test that streamed exports are compressed on the fly."""
+    identity = client.get("/cardio/dataset/export", params={"format": "csv"}, headers={"Accept-Encoding": "identity"})
+    compressed = client.get("/cardio/dataset/export", params={"format": "csv"}, headers={"Accept-Encoding": "gzip"})
+
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.content == identity.content
+
+
+def test_failed_responses_are_not_cached(client: TestClient):
+    """Test that error responses are neither tagged nor cached."""
+    response = client.get("/cardio/charts/age", params={"age_min": 90})
+
+    assert response.status_code == 404
+    assert "etag" not in response.headers
+
+
+def test_body_matches_etag_version(client: TestClient, monkeypatch):
+    """Test that a version published after the ETag is computed does not leak into the response body."""
+    store = dataset_store.get_dataset_store()
+    appended = store.append({name: values[:10] for name, values in store.columns.items()})
+
+    def publish_after_read():
+        # A new version is published between the ETag computation and the endpoint
+        monkeypatch.setattr(dataset_store, "_store", appended)
+        return store
+
+    monkeypatch.setattr(http_cache, "get_dataset_store", publish_after_read)
+    response = client.get("/cardio/statistics", params={"quantiles": "0.37"})
+
+    assert response.json()["total_records"] == len(store)
+
+
+def test_etag_matches():
+    """Test the weak comparison of If-None-Match values."""
+    assert etag_matches('"a"', '"a"')
+    assert etag_matches('"b", W/"a"', '"a"')
+    assert etag_matches("*", '"a"')
+    assert not etag_matches('"b"', '"a"')
+    assert not etag_matches(None, '"a"')
@@ -0,0 +1,24 @@
+"""
+Tests for the JSON encoding utilities.
+
+This module contains tests for the sliced JSON encoding of the response models.
+"""
+
+from pydantic_core import to_json
+
+from api.models.cardio import ChartData, ColumnarDataset, Dataset
+from api.utils.json_encoding import encode_json
+
+
+def test_models_are_encoded_like_pydantic():
+    """Test that sliced encoding gives the bytes of a single pydantic encoding."""
+    records = [{"age": age, "IMC": age / 3, "gender": "Femme"} for age in range(30, 70)]
+    values = [
+        Dataset(data=records, total_records=40),
+        ColumnarDataset(columns={"age": list(range(40)), "IMC": [value / 7 for value in range(40)]}, total_records=40),
+        [ChartData(chart_type="bar", title="Âge", description="é", x_label="x", data=records)] * 2,
+        {"nested": {"value": [1.5, None, True]}},
+    ]
+    for value in values:
+        assert encode_json(value, chunk_size=7) == to_json(value)
+        assert encode_json(value) == to_json(value)
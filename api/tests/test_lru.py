@@ -0,0 +1,54 @@
+"""
+Tests for the size-aware LRU cache.
+
+This module contains tests for the cache bounding its values by their total size.
+"""
+
+from api.utils.lru import SizedLRUCache
+
+
+def test_get_and_put():
+    """Test that cached values are returned and misses counted."""
+    cache = SizedLRUCache(max_bytes=10)
+
+    assert cache.put("a", b"123")
+    assert cache.get("a") == b"123"
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.bytes == 3
+
+
+def test_evicts_least_recently_used():
+    """Test that the least recently used entries are evicted past the budget."""
+    cache = SizedLRUCache(max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    cache.get("a")
+    cache.put("c", b"1234")
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert cache.bytes == 8
+    assert cache.stats()["evictions"] == 1
+
+
+def test_rejects_values_larger_than_budget():
+    """Test that a value larger than the whole budget is not cached."""
+    cache = SizedLRUCache(max_bytes=4)
+
+    assert not cache.put("a", b"12345")
+    assert len(cache) == 0
+
+
+def test_replace_and_pop():
+    """Test that replacing and removing values keeps the size accurate."""
+    cache = SizedLRUCache(max_bytes=10, sizeof=lambda value: value["size"])
+    cache.put("a", {"size": 3})
+    cache.put("a", {"size": 5})
+    assert cache.bytes == 5
+
+    assert cache.pop("a") == {"size": 5}
+    assert cache.pop("a") is None
+    assert cache.bytes == 0
@@ -0,0 +1,109 @@
+"""
+Tests for the moments.
+
+This module contains tests for the sufficient statistics of the numeric columns.
+"""
+
+import numpy as np
+import pytest
+
+from api.services.dataset_store import get_dataset_store
+from api.services.moments import MOMENT_COLUMNS, MomentCube, Moments, ValueCounts
+
+
+@pytest.fixture
+def store():
+    """The shared dataset store."""
+    return get_dataset_store()
+
+
+def test_moments_match_pandas(store):
+    """Test that the moments give the means, variances and correlations of pandas."""
+    moments = store.moments
+    data = store.data[list(MOMENT_COLUMNS)]
+
+    assert moments.count == len(store)
+    np.testing.assert_allclose(moments.mean, data.mean().to_numpy())
+    np.testing.assert_allclose(moments.variance(), data.var(ddof=0).to_numpy())
+    np.testing.assert_allclose(moments.correlation(), data.corr().to_numpy(), atol=1e-12)
+
+
+@pytest.mark.parametrize("split", [1, 1000, 34215, 68000])
+def test_merge_matches_moments_of_union(store, split):
+    """Test that merging the moments of two parts gives the moments of every record."""
+    head = Moments.from_columns({name: values[:split] for name, values in store.columns.items()})
+    tail = Moments.from_columns({name: values[split:] for name, values in store.columns.items()})
+    merged = head.merge(tail)
+
+    assert merged.count == store.moments.count
+    np.testing.assert_array_equal(merged.minimum, store.moments.minimum)
+    np.testing.assert_array_equal(merged.maximum, store.moments.maximum)
+    np.testing.assert_allclose(merged.mean, store.moments.mean)
+    np.testing.assert_allclose(merged.comoments, store.moments.comoments)
+
+
+def test_merge_with_empty_moments(store):
+    """Test that empty moments are neutral."""
+    empty = Moments.from_columns({name: values[:0] for name, values in store.columns.items()})
+    assert empty.merge(store.moments) is store.moments
+    assert store.moments.merge(empty) is store.moments
+
+
+@pytest.mark.parametrize("column", ["age", "ap_hi", "IMC"])
+def test_value_counts_median(store, column):
+    """Test that merged value counts give the median numpy computes over every record."""
+    values = store.columns[column]
+    counts = ValueCounts.from_values(values[:25000]).merge(ValueCounts.from_values(values[25000:]))
+
+    assert int(counts.counts.sum()) == len(values)
+    assert counts.median() == float(np.median(values))
+    assert ValueCounts.from_values(values[:3]).median() == float(np.median(values[:3]))
+
+
+@pytest.mark.parametrize("bounds", [
+    {},
+    {"gender": (1, 1), "age": (40, 55), "smoke": (0, 0)},
+    {"cholesterol": (2, 3), "age": (None, 45)},
+])
+def test_moment_cube_select_matches_pandas(store, bounds):
+    """Test that the moments of the cells of a cohort are those of its records."""
+    cube = MomentCube.from_cells(store.cube.levels, store.cells, store.columns)
+    selected = np.ones(len(store), dtype=bool)
+    for name, (low, high) in bounds.items():
+        values = store.columns[name]
+        selected &= values >= (-np.inf if low is None else low)
+        selected &= values <= (np.inf if high is None else high)
+    expected = store.data.loc[selected, list(MOMENT_COLUMNS)]
+
+    moments = cube.select(bounds)
+    assert moments.count == len(expected)
+    np.testing.assert_allclose(moments.mean, expected.mean().to_numpy())
+    np.testing.assert_allclose(moments.correlation(), expected.corr().to_numpy(), atol=1e-12)
+
+
+def test_moment_cube_merge_with_other_levels(store):
+    """Test that cubes built from slices with different levels merge into the cube of the whole dataset."""
+    young = store.columns["age"] < 50
+    slices = [{name: values[rows] for name, values in store.columns.items()} for rows in (young, ~young)]
+    cubes = []
+    for columns in slices:
+        levels = {name: np.unique(columns[name]) for name in store.cube.dimensions}
+        cells = np.ravel_multi_index(
+            [np.searchsorted(levels[name], columns[name]) for name in levels], tuple(map(len, levels.values()))
+        )
+        cubes.append(MomentCube.from_cells(levels, cells, columns))
+    merged = cubes[0].merge(cubes[1])
+    whole = MomentCube.from_cells(store.cube.levels, store.cells, store.columns)
+
+    np.testing.assert_array_equal(merged.counts, whole.counts)
+    np.testing.assert_allclose(merged.means, whole.means, atol=1e-9)
+    np.testing.assert_allclose(merged.comoments, whole.comoments, atol=1e-6)
+
+
+def test_moment_cube_constant_column(store):
+    """Test that a column constant over the selected cells has a variance of exactly zero."""
+    moments = store.moment_cube.select({"cardio": (1, 1)})
+    assert moments.variance()[MOMENT_COLUMNS.index("cardio")] == 0
+    assert np.isnan(moments.correlation()[MOMENT_COLUMNS.index("cardio")]).all()
+    with pytest.raises(KeyError):
+        store.moment_cube.select({"ap_hi": (120, 140)})
@@ -0,0 +1,124 @@
+"""
+Tests for the quantile sketches.
+
+This module contains tests for the quantile sketches of the numeric columns and
+the quantiles of the /cardio/statistics endpoint.
+"""
+
+import numpy as np
+import pytest
+
+from api.services.cardio_service import CardioService
+from api.services.dataset_store import DatasetStore, get_dataset_store
+from api.services.quantile_sketch import QuantileSketch, parse_quantiles
+
+FRACTIONS = np.linspace(0.01, 0.99, 99)
+
+# Documented bound of the rank error, as a fraction of the number of records
+RANK_ERROR = 0.01
+
+
+def _rank_error(values: np.ndarray, sketch: QuantileSketch) -> float:
+    """Largest distance between the requested fractions and the ranks of the sketch quantiles."""
+    ordered = np.sort(values)
+    quantiles = sketch.quantiles(FRACTIONS)
+    lower = np.searchsorted(ordered, quantiles, side='left') / len(ordered)
+    upper = np.searchsorted(ordered, quantiles, side='right') / len(ordered)
+    return float(np.max(np.clip(np.maximum(lower - FRACTIONS, FRACTIONS - upper), 0, None)))
+
+
+@pytest.mark.parametrize("column", ["age", "IMC", "ap_hi", "ap_lo"])
+def test_sketch_rank_error(column):
+    """Test that the quantiles of the sketches of the store are within the documented bound."""
+    store = get_dataset_store()
+    values = store.columns[column]
+    merged = QuantileSketch()
+    for start in range(0, len(values), 5000):
+        merged = merged.merge(QuantileSketch.from_values(values[start:start + 5000]))
+
+    assert _rank_error(values, store.sketches[column]) <= RANK_ERROR
+    assert _rank_error(values, merged) <= RANK_ERROR
+    assert merged.count == len(values)
+    assert merged.quantiles([0, 1]) == [values.min(), values.max()]
+
+
+@pytest.mark.parametrize("chunks", [1, 400])
+def test_merged_sketch_rank_error(chunks):
+    """Test that the rank error stays within the documented bound when many chunk sketches are merged."""
+    values = np.random.default_rng(0).normal(size=200_000)
+    merged = QuantileSketch()
+    for chunk in np.array_split(values, chunks):
+        merged = merged.merge(QuantileSketch.from_values(chunk))
+
+    assert merged.count == len(values)
+    assert _rank_error(values, merged) <= RANK_ERROR
+
+
+def test_sketch_memory_is_bounded():
+    """Test that a sketch keeps a number of values growing with the logarithm of the records."""
+    values = np.random.default_rng(0).normal(size=1_000_000)
+    sketch = QuantileSketch()
+    for start in range(0, len(values), 10000):
+        sketch.update(values[start:start + 10000])
+
+    assert sketch.count == len(values)
+    assert sketch.size < 4 * sketch.k
+    assert _rank_error(values, sketch) <= RANK_ERROR
+
+
+def test_sketch_is_deterministic():
+    """Test that a sketch depends only on its input."""
+    values = get_dataset_store().columns["IMC"]
+    first, second = QuantileSketch.from_values(values), QuantileSketch.from_values(values)
+    assert first.quantiles(FRACTIONS) == second.quantiles(FRACTIONS)
+    assert np.isnan(QuantileSketch().quantiles([0.5])).all()
+
+
+def test_append_merges_sketches():
+    """Test that appended records are added to the sketches of the new store."""
+    store = get_dataset_store()
+    head = DatasetStore({name: values[:50000] for name, values in store.columns.items()}, "", "head", 0.0)
+    appended = head.append({name: values[50000:] for name, values in store.columns.items()})
+
+    assert appended.sketches["ap_hi"].count == len(store)
+    assert _rank_error(store.columns["ap_hi"], appended.sketches["ap_hi"]) <= RANK_ERROR
+    assert appended.quantiles("IMC", [0.1, 0.9], exact=True) == store.quantiles("IMC", [0.1, 0.9], exact=True)
+
+
+def test_parse_quantiles():
+    """Test that fractions are parsed, deduplicated and validated."""
+    assert parse_quantiles("0.95, 0.05,0.5,0.5") == (0.05, 0.5, 0.95)
+    assert parse_quantiles(None) == ()
+    for spec in ("1.5", "-0.1", "median", "nan"):
+        with pytest.raises(ValueError):
+            parse_quantiles(spec)
+
+
+def test_statistics_quantiles_endpoint(client):
+    """Test the quantiles and exact parameters of /cardio/statistics."""
+    store = get_dataset_store()
+    approximate = client.get("/cardio/statistics", params={"quantiles": "0.05,0.5,0.95"}).json()
+    exact = client.get("/cardio/statistics", params={"quantiles": "0.05,0.5,0.95", "exact": "true"}).json()
+
+    assert set(approximate["quantiles"]) == {"age", "IMC", "ap_hi", "ap_lo"}
+    assert list(approximate["quantiles"]["IMC"]) == ["0.05", "0.5", "0.95"]
+    assert approximate["bmi_range"]["median"] == approximate["quantiles"]["IMC"]["0.5"]
+    assert exact["bmi_range"]["median"] == float(np.median(store.columns["IMC"]))
+    assert list(exact["quantiles"]["ap_hi"].values()) == np.quantile(store.columns["ap_hi"], [0.05, 0.5, 0.95]).tolist()
+    assert client.get("/cardio/statistics").json()["quantiles"] is None
+    assert client.get("/cardio/statistics", params={"quantiles": "2"}).status_code == 400
+
+
+def test_requested_quantiles_are_not_memoized():
+    """Test that distinct quantile requests do not grow the values memoized with the store."""
+    store = DatasetStore(dict(get_dataset_store().columns), source="memory", version="test", load_time=0.0)
+    service = CardioService(store)
+    statistics = service.get_dataset_statistics()
+    memoized = len(store._memo)
+
+    for position in range(1, 50):
+        quantiles = service.get_dataset_statistics(quantiles=(position / 100,)).quantiles
+        assert list(quantiles["age"]) == [f"{position / 100:g}"]
+    assert len(store._memo) == memoized
+    assert service.get_dataset_statistics() is statistics
+    assert statistics.quantiles is None
@@ -0,0 +1,97 @@
+"""
+Tests for the single-flight execution.
+
+This module contains tests for the coalescing of identical concurrent computations.
+"""
+
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from api.main import app
+from api.models.cardio import ChartData
+from api.routers.cardio import get_cohort_service
+from api.utils.http_cache import flights, response_cache
+from api.utils.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    """Test that callers of the same key await a single call."""
+    group = SingleFlight()
+    calls = []
+
+    async def call(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return value
+
+    async def scenario():
+        keyed = [group.do("key", lambda: call("first")) for _ in range(5)]
+        return await asyncio.gather(*keyed, group.do("other", lambda: call("other")))
+
+    results = asyncio.run(scenario())
+    assert [result for result, _ in results] == ["first"] * 5 + ["other"]
+    assert [shared for _, shared in results[:5]] == [False, True, True, True, True]
+    assert calls == ["first", "other"]
+    assert group.stats() == {"executed": 2, "coalesced": 4, "in_flight": 0}
+
+
+def test_errors_are_raised_to_every_caller():
+    """Test that an exception of the call is raised to every caller, and not remembered."""
+    group = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def scenario():
+        return await asyncio.gather(*(group.do("key", fail) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in asyncio.run(scenario()))
+    assert group.stats()["in_flight"] == 0
+
+
+def test_identical_requests_are_coalesced():
+    """Test that concurrent identical requests run the endpoint once."""
+    computations = []
+    lock = threading.Lock()
+
+    class SlowService:
+        def get_age_distribution_chart(self):
+            with lock:
+                computations.append(1)
+            time.sleep(0.2)
+            return ChartData(chart_type="bar", title="t", description="d", x_label="x", data=[{"age": 1}])
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            return await asyncio.gather(*(
+                client.get("/cardio/charts/age", params={"gender": 2, "smoke": 1, "alco": 1})
+                for _ in range(8)
+            ))
+
+    response_cache.clear()
+    before = flights.stats()
+    app.dependency_overrides[get_cohort_service] = SlowService
+    try:
+        responses = asyncio.run(scenario())
+    finally:
+        app.dependency_overrides.clear()
+        response_cache.clear()
+
+    assert [response.status_code for response in responses] == [200] * 8
+    assert len({response.content for response in responses}) == 1
+    assert len(computations) == 1
+    assert flights.stats()["coalesced"] - before["coalesced"] >= 7
+
+
+@pytest.mark.parametrize("section", ["single_flight", "response_cache", "aggregate_cache", "executors"])
+def test_metrics(client, section):
+    """Test that the worker counters are exposed."""
+    response = client.get("/health/metrics")
+    assert response.status_code == 200
+    assert section in response.json()
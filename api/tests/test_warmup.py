@@ -0,0 +1,75 @@
+"""
+Tests for the analytics warm-up.
+
+This module contains tests for the computation of the analytics artifacts at startup and the readiness probe.
+"""
+
+import time
+
+import pytest
+from starlette.testclient import TestClient
+
+from api.main import app
+from api.services import warmup as warmup_module
+from api.services.cardio_service import CardioService
+from api.services.dataset_store import get_dataset_store
+from api.services.warmup import Warmup, artifact_factories
+
+
+def test_warmup_computes_every_artifact():
+    """Test that the warm-up memoizes every artifact with the dataset store."""
+    store = get_dataset_store()
+    warmup = Warmup(store)
+    warmup.run(workers=4)
+
+    assert warmup.ready
+    assert warmup.wait(0)
+    assert set(warmup.durations) == set(artifact_factories(CardioService(store)))
+    assert CardioService(store).get_all_charts() is CardioService(store).get_all_charts()
+
+
+def test_warmup_records_errors(monkeypatch):
+    """Test that a failed warm-up is reported instead of raised."""
+    def fail():
+        raise ValueError("boom")
+
+    monkeypatch.setattr(warmup_module, "artifact_factories", lambda cardio_service: {"statistics": fail})
+    warmup = Warmup(get_dataset_store())
+    warmup.run(workers=1)
+
+    assert not warmup.ready
+    assert "boom" in warmup.error
+
+
+def test_not_ready_without_warmup(client: TestClient):
+    """Test that a worker started without its lifespan is not ready."""
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["ready"] is False
+
+
+@pytest.mark.filterwarnings("ignore")
+def test_ready_after_startup():
+    """Test that the worker becomes ready once warmed up, and reuses the preloaded model."""
+    with TestClient(app) as client:
+        for _ in range(200):
+            response = client.get("/health/ready")
+            if response.status_code == 200:
+                break
+            time.sleep(0.05)
+
+        data = response.json()
+        assert response.status_code == 200
+        assert data["ready"] and data["artifacts_warm"] and data["prediction_model_loaded"]
+        assert data["dataset_version"] == get_dataset_store().version
+        assert "charts" in data["artifacts"]
+
+        prediction_service = app.state.prediction_service
+        response = client.post(
+            "/prediction/user",
+            json={"age": 50, "ap_hi": 120, "ap_lo": 80, "cholesterol": 1, "active": 1},
+        )
+        assert response.status_code == 200
+        assert app.state.prediction_service is prediction_service
+
+    assert app.state.prediction_service is None
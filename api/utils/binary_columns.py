@@ -0,0 +1,148 @@
+"""
+Binary column format.
+
+This module encodes a set of equal-length NumPy columns as a self-describing
+binary document, and reads such a document back into NumPy arrays without copying
+the column buffers.
+
+A document is laid out as follows, every integer being little-endian:
+
+- the 8-byte magic string b"HIACOL1\\0";
+- the length of the header, as an unsigned 32-bit integer;
+- the header, a UTF-8 JSON object giving the number of rows and, for each
+  column, its name, little-endian dtype string, offset and size in bytes, padded
+  with spaces to a multiple of 8 bytes;
+- the column buffers, in header order, each padded with zeros to a multiple of 8
+  bytes so that every buffer is aligned for its dtype.
+
+Column offsets are relative to the end of the header.
+"""
+
+import json
+import struct
+from typing import Dict, Iterator, Union
+
+import numpy as np
+
+MAGIC = b"HIACOL1\0"
+
+MEDIA_TYPE = "application/octet-stream"
+
+_ALIGNMENT = 8
+
+
+def _padding(size: int) -> int:
+    return -size % _ALIGNMENT
+
+
+def _little_endian(values: np.ndarray) -> np.ndarray:
+    return values.astype(values.dtype.newbyteorder("<"), copy=False)
+
+
+def encode_header(columns: Dict[str, np.ndarray]) -> bytes:
+    """
+    Encode the magic string and header of a document.
+
+    Args:
+        columns: Mapping of column name to column values, all of the same length
+
+    Returns:
+        bytes: The beginning of the document, up to the first column buffer
+
+    Raises:
+        ValueError: If the columns do not have the same length or are not numeric
+    """
+    rows = len(next(iter(columns.values()))) if columns else 0
+    descriptions = []
+    offset = 0
+    for name, values in columns.items():
+        if len(values) != rows:
+            raise ValueError(f"Column {name} has {len(values)} values, expected {rows}")
+        if values.dtype.kind not in "biuf":
+            raise ValueError(f"Column {name} is not numeric")
+        dtype = _little_endian(values[:0]).dtype
+        nbytes = rows * dtype.itemsize
+        descriptions.append({"name": name, "dtype": dtype.str, "offset": offset, "nbytes": nbytes})
+        offset += nbytes + _padding(nbytes)
+
+    header = json.dumps({"rows": rows, "columns": descriptions}, separators=(",", ":")).encode()
+    header += b" " * _padding(len(MAGIC) + 4 + len(header))
+    return MAGIC + struct.pack("<I", len(header)) + header
+
+
+def iter_encoded(columns: Dict[str, np.ndarray], chunk_size: int = 65536) -> Iterator[bytes]:
+    """
+    Encode columns as a document, a bounded number of values at a time.
+
+    Each chunk is a copy of a slice of a column buffer, so encoding does not convert
+    values one by one and uses memory independent of the number of rows.
+
+    Args:
+        columns: Mapping of column name to column values, all of the same length
+        chunk_size: Maximum number of values per chunk
+
+    Yields:
+        bytes: The header, then the column buffers and their padding
+
+    Raises:
+        ValueError: If the columns do not have the same length or are not numeric
+    """
+    yield encode_header(columns)
+    for values in columns.values():
+        for start in range(0, len(values), chunk_size):
+            yield _little_endian(values[start:start + chunk_size]).tobytes()
+        padding = _padding(values.nbytes)
+        if padding:
+            yield b"\0" * padding
+
+
+def encode_columns(columns: Dict[str, np.ndarray]) -> bytes:
+    """
+    Encode columns as a document.
+
+    Args:
+        columns: Mapping of column name to column values, all of the same length
+
+    Returns:
+        bytes: The document
+    """
+    return b"".join(iter_encoded(columns))
+
+
+def read_columns(buffer: Union[bytes, bytearray, memoryview, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Read the columns of a document.
+
+    The returned arrays are views on the buffer; they are read-only when the buffer
+    is. A memory-mapped file, e.g. np.memmap(path, mode="r"), can be passed to read
+    a downloaded document without loading it in memory.
+
+    Args:
+        buffer: The document
+
+    Returns:
+        Dict mapping column names to their values
+
+    Raises:
+        ValueError: If the buffer is not a valid document
+    """
+    view = memoryview(buffer).cast("B")
+    if len(view) < len(MAGIC) + 4 or bytes(view[:len(MAGIC)]) != MAGIC:
+        raise ValueError("Not a binary column document")
+
+    (header_length,) = struct.unpack_from("<I", view, len(MAGIC))
+    data_start = len(MAGIC) + 4 + header_length
+    try:
+        header = json.loads(bytes(view[len(MAGIC) + 4:data_start]))
+    except ValueError:
+        raise ValueError("Invalid binary column header")
+
+    columns = {}
+    for column in header["columns"]:
+        dtype = np.dtype(column["dtype"])
+        if data_start + column["offset"] + column["nbytes"] > len(view):
+            raise ValueError(f"Truncated binary column document: column {column['name']} is incomplete")
+        columns[column["name"]] = np.frombuffer(
+            view, dtype=dtype, count=header["rows"], offset=data_start + column["offset"]
+        )
+    return columns
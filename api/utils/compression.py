@@ -0,0 +1,92 @@
+"""
+Response compression utilities.
+
+This module negotiates a content coding from the Accept-Encoding request header and
+compresses response bodies, either at once or as a stream of chunks. Brotli is
+offered when the brotli package is installed, gzip otherwise.
+"""
+
+import gzip
+import zlib
+from typing import AsyncIterable, AsyncIterator, Optional
+
+from api.utils.executors import EXPORT, run_in_pool
+from api.utils.negotiation import parse_preferences
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Supported content codings, in order of preference
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Choose the content coding of a response.
+
+    Args:
+        accept_encoding: Value of the Accept-Encoding request header, if any
+
+    Returns:
+        The supported coding with the highest quality, preferring brotli over gzip on
+        ties, or None to send the response uncompressed
+    """
+    qualities = {}
+    for token, quality in parse_preferences(accept_encoding):
+        qualities.setdefault(token, quality)
+
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """
+    Compress a response body.
+
+    The output only depends on the body, so compressed bodies can be cached and
+    compared.
+
+    Args:
+        body: The uncompressed body
+        encoding: Content coding returned by negotiate_encoding
+
+    Returns:
+        bytes: The compressed body
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+async def iter_compressed(chunks: AsyncIterable[bytes], encoding: str) -> AsyncIterator[bytes]:
+    """
+    Compress a streamed response body chunk by chunk, in the export pool.
+
+    Args:
+        chunks: The uncompressed chunks
+        encoding: Content coding returned by negotiate_encoding
+
+    Yields:
+        bytes: The compressed chunks
+    """
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        process, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        process, finish = compressor.compress, compressor.flush
+
+    async for chunk in chunks:
+        compressed = await run_in_pool(EXPORT, process, chunk if isinstance(chunk, bytes) else bytes(chunk))
+        if compressed:
+            yield compressed
+    yield await run_in_pool(EXPORT, finish)
@@ -0,0 +1,97 @@
+"""
+Bounded executors.
+
+This module provides one thread pool per class of workload, so that CPU-bound
+service calls run off the asyncio event loop and a burst of one workload (e.g.
+dataset exports) cannot take the threads of another (e.g. predictions). Each pool
+has a fixed number of threads; calls beyond it wait in the pool queue.
+"""
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, TypeVar
+
+# Workload classes
+ANALYTICS = "analytics"
+PREDICTION = "prediction"
+EXPORT = "export"
+
+# Number of threads of each workload pool
+POOL_SIZES = {
+    ANALYTICS: int(os.getenv("ANALYTICS_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    PREDICTION: int(os.getenv("PREDICTION_WORKERS", "2")),
+    EXPORT: int(os.getenv("EXPORT_WORKERS", "2")),
+}
+
+Result = TypeVar("Result")
+
+_pools: Dict[str, ThreadPoolExecutor] = {}
+_pending: Dict[str, int] = {workload: 0 for workload in POOL_SIZES}
+_lock = threading.Lock()
+
+
+def get_executor(workload: str) -> ThreadPoolExecutor:
+    """
+    Get the thread pool of a workload, creating it on first use.
+
+    Args:
+        workload: Workload class, one of POOL_SIZES
+
+    Returns:
+        ThreadPoolExecutor: The pool of the workload
+    """
+    with _lock:
+        pool = _pools.get(workload)
+        if pool is None:
+            pool = ThreadPoolExecutor(max_workers=POOL_SIZES[workload], thread_name_prefix=workload)
+            _pools[workload] = pool
+        return pool
+
+
+async def run_in_pool(workload: str, func: Callable[..., Result], *args: Any, **kwargs: Any) -> Result:
+    """
+    Run a blocking function in the thread pool of a workload.
+
+    Args:
+        workload: Workload class, one of POOL_SIZES
+        func: Function to run
+        args: Positional arguments of the function
+        kwargs: Keyword arguments of the function
+
+    Returns:
+        The result of the function
+    """
+    pool = get_executor(workload)
+    with _lock:
+        _pending[workload] += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, functools.partial(func, *args, **kwargs))
+    finally:
+        with _lock:
+            _pending[workload] -= 1
+
+
+def executor_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Describe the usage of the workload pools.
+
+    Returns:
+        Dict mapping each workload to its number of threads and of calls running or waiting
+    """
+    with _lock:
+        return {
+            workload: {"workers": size, "pending": _pending[workload]}
+            for workload, size in POOL_SIZES.items()
+        }
+
+
+def shutdown_executors() -> None:
+    """Shut down the workload pools, waiting for the running calls."""
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True)
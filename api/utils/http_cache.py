@@ -0,0 +1,218 @@
+"""
+HTTP caching utilities.
+
+This module provides the route class tagging the analytics responses with a
+strong ETag derived from the dataset version and the request query, answering
+conditional requests without running the endpoint, and serving the encoded body of
+responses already computed for the same tag, compressed once per content coding.
+Concurrent requests for the same tag share a single computation.
+"""
+
+import hashlib
+import os
+from typing import Any, Callable, Coroutine, List, NamedTuple, Optional, Sequence, Union
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.dependencies.models import Dependant
+from fastapi.routing import APIRoute
+
+from api.services.dataset_registry import UnknownDatasetError, registry
+from api.services.dataset_store import get_dataset_store
+from api.utils.compression import compress, iter_compressed, negotiate_encoding
+from api.utils.executors import ANALYTICS, run_in_pool
+from api.utils.lru import SizedLRUCache
+from api.utils.single_flight import SingleFlight
+
+# Number of seconds clients may reuse a response before revalidating it
+CACHE_MAX_AGE = int(os.getenv("CACHE_MAX_AGE", "0"))
+
+CACHE_CONTROL = f"public, max-age={CACHE_MAX_AGE}, must-revalidate"
+
+# Memory budget of the encoded response bodies kept by the versioned routes
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+class CachedResponse(NamedTuple):
+    """Encoded body of a response and its media type."""
+    body: bytes
+    media_type: Optional[str]
+
+
+response_cache = SizedLRUCache(RESPONSE_CACHE_MAX_BYTES, sizeof=lambda cached: len(cached.body))
+
+# Computations and compressions of responses in progress, keyed by ETag
+flights = SingleFlight()
+
+
+def compute_etag(version: str, request: Request, vary: Sequence[str] = ()) -> str:
+    """
+    Compute the strong ETag of a request for a dataset version.
+
+    The query parameters are sorted so that equivalent queries share their tag.
+
+    Args:
+        version: Version of the dataset the response is computed from
+        request: The incoming request
+        vary: Names of the request headers the response depends on
+
+    Returns:
+        str: The quoted entity tag
+    """
+    digest = hashlib.sha256()
+    digest.update(version.encode())
+    digest.update(b"\0" + request.url.path.encode())
+    for key, value in sorted(request.query_params.multi_items()):
+        digest.update(b"\0" + key.encode() + b"=" + value.encode())
+    for name in vary:
+        digest.update(b"\0" + name.encode() + b":" + request.headers.get(name, "").encode())
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def header_dependencies(dependant: Dependant) -> List[str]:
+    """
+    List the request headers read by an endpoint and its dependencies.
+
+    Args:
+        dependant: Dependency tree of the endpoint
+
+    Returns:
+        List of the lowercase header names, without duplicates
+    """
+    names = [param.alias.lower() for param in dependant.header_params]
+    for dependency in dependant.dependencies:
+        names.extend(header_dependencies(dependency))
+    return list(dict.fromkeys(names))
+
+
+def encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    """
+    Derive the entity tag of a compressed representation.
+
+    Args:
+        etag: The quoted entity tag of the uncompressed representation
+        encoding: Content coding of the representation, None if uncompressed
+
+    Returns:
+        str: The quoted entity tag of the representation
+    """
+    return f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check whether an If-None-Match header matches an entity tag.
+
+    Tags are compared with the weak comparison required for If-None-Match.
+
+    Args:
+        if_none_match: Value of the If-None-Match header, if any
+        etag: The current entity tag
+
+    Returns:
+        bool: True if the client already holds the current representation
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+class VersionedRoute(APIRoute):
+    """
+    Route serving responses versioned by the dataset they are computed from.
+
+    Successful GET responses carry an ETag and a Cache-Control header, and requests
+    whose If-None-Match header matches the current ETag get a 304 response before
+    any dependency or endpoint code runs. The encoded body of each successful
+    response is kept in the response cache under its ETag, so that the next request
+    for the same dataset version and query is answered with those bytes, skipping
+    the computation, the response model validation and the JSON encoding.
+
+    The request headers declared by the endpoint, such as Accept for negotiated
+    formats, are part of the ETag and listed in the Vary header.
+
+    Responses are compressed with the coding negotiated from Accept-Encoding, each
+    coding having its own ETag. Compressed bodies are cached next to the
+    uncompressed one, so a response is compressed once per dataset version and
+    coding; streamed responses are compressed on the fly.
+
+    Requests arriving while the response for their ETag is being computed or
+    compressed await that computation instead of starting their own (see
+    SingleFlight); the ETag covers the path, query, declared headers and dataset
+    version of the request.
+
+    The dataset is the one selected by the dataset query parameter (see
+    api.services.dataset_registry), resolved once per request and handed to the
+    get_dataset dependency, so the body is always computed from the version its
+    ETag names, even when records are appended or the dataset is reloaded
+    meanwhile.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+        vary = header_dependencies(self.dependant)
+
+        async def versioned_handler(request: Request) -> Response:
+            if request.method != "GET":
+                return await handler(request)
+
+            dataset = request.query_params.get("dataset")
+            if registry.is_default(dataset):
+                store = get_dataset_store()
+            else:
+                # Registered datasets are loaded on first use, off the event loop
+                try:
+                    store = await run_in_pool(ANALYTICS, registry.get, dataset)
+                except UnknownDatasetError:
+                    return await handler(request)
+            # The response is computed from the store its ETag is derived from, even if a new version is published
+            request.state.dataset_store = store
+            version = store.version
+
+            identity_etag = compute_etag(version, request, vary)
+            encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+            etag = encoded_etag(identity_etag, encoding)
+            headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": ", ".join(["accept-encoding", *vary])}
+            if etag_matches(request.headers.get("if-none-match"), etag):
+                return Response(status_code=304, headers=headers)
+
+            if encoding:
+                headers["Content-Encoding"] = encoding
+
+            async def render() -> Union[CachedResponse, Response]:
+                response = await handler(request)
+                if response.status_code != 200 or isinstance(response, StreamingResponse):
+                    return response
+                identity = CachedResponse(bytes(response.body), response.media_type)
+                response_cache.put(identity_etag, identity)
+                return identity
+
+            async def encode(identity: CachedResponse) -> CachedResponse:
+                body = await run_in_pool(ANALYTICS, compress, identity.body, encoding)
+                cached = CachedResponse(body, identity.media_type)
+                response_cache.put(etag, cached)
+                return cached
+
+            cached = response_cache.get(etag)
+            if cached is None:
+                identity = response_cache.get(identity_etag) if encoding else None
+                if identity is None:
+                    result, shared = await flights.do(identity_etag, render)
+                    if isinstance(result, Response):
+                        # Streamed and failed responses cannot be shared between requests
+                        response = await handler(request) if shared else result
+                        if response.status_code == 200:
+                            if encoding and isinstance(response, StreamingResponse):
+                                response.body_iterator = iter_compressed(response.body_iterator, encoding)
+                            response.headers.update(headers)
+                        return response
+                    identity = result
+                cached = identity
+                if encoding:
+                    cached, _ = await flights.do(etag, lambda: encode(identity))
+            return Response(content=cached.body, media_type=cached.media_type, headers=headers)
+
+        return versioned_handler
@@ -0,0 +1,45 @@
+"""
+JSON encoding utilities.
+
+This module encodes response models to JSON in bounded pieces. pydantic encodes a
+value in a single call that holds the GIL from start to end, which stalls the event
+loop thread for as long as a large response takes to encode; long lists are
+therefore encoded a slice at a time, giving other threads a chance to run between
+slices.
+"""
+
+from typing import Any
+
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+# Maximum number of list items encoded per call
+CHUNK_SIZE = 2000
+
+
+def encode_json(value: Any, chunk_size: int = CHUNK_SIZE) -> bytes:
+    """
+    Encode a value to compact JSON, slicing long lists.
+
+    Models are encoded field by field, in declaration order, so the output is the
+    one of pydantic_core.to_json for the models of this API, which have no aliases
+    nor custom serializers.
+
+    Args:
+        value: Model, list, dict or JSON-compatible value to encode
+        chunk_size: Maximum number of list items encoded per call
+
+    Returns:
+        bytes: The JSON document
+    """
+    if isinstance(value, BaseModel):
+        items = ((name, getattr(value, name)) for name in type(value).model_fields)
+        return b"{" + b",".join(to_json(name) + b":" + encode_json(item, chunk_size) for name, item in items) + b"}"
+    if isinstance(value, dict):
+        return b"{" + b",".join(to_json(key) + b":" + encode_json(item, chunk_size) for key, item in value.items()) + b"}"
+    if isinstance(value, list) and (len(value) > chunk_size or any(isinstance(item, BaseModel) for item in value)):
+        if len(value) <= chunk_size:
+            return b"[" + b",".join(encode_json(item, chunk_size) for item in value) + b"]"
+        slices = (to_json(value[start:start + chunk_size])[1:-1] for start in range(0, len(value), chunk_size))
+        return b"[" + b",".join(slices) + b"]"
+    return to_json(value)
@@ -0,0 +1,126 @@
+"""
+Size-aware LRU cache.
+
+This module provides a thread-safe least-recently-used cache bounded by the total
+size of its values rather than by their number.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class SizedLRUCache:
+    """Thread-safe LRU cache evicting the least recently used entries past a size budget."""
+
+    def __init__(self, max_bytes: int, sizeof: Callable[[Any], int] = len):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes: Maximum total size of the cached values
+            sizeof: Function returning the size of a value, in bytes
+        """
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a cached value and mark it as recently used.
+
+        Args:
+            key: Key of the value
+            default: Value returned when the key is not cached
+
+        Returns:
+            The cached value, or default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: Optional[int] = None) -> bool:
+        """
+        Cache a value, evicting the least recently used entries to stay within budget.
+
+        Args:
+            key: Key of the value
+            value: Value to cache
+            size: Size of the value, computed with sizeof when not given
+
+        Returns:
+            bool: False if the value alone exceeds the budget and was not cached
+        """
+        size = self.sizeof(value) if size is None else size
+        if size > self.max_bytes:
+            return False
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+
+            while self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+        return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Remove a value from the cache.
+
+        Args:
+            key: Key of the value
+            default: Value returned when the key is not cached
+
+        Returns:
+            The removed value, or default
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return default
+            self.bytes -= entry[1]
+            return entry[0]
+
+    def clear(self) -> None:
+        """Remove every value from the cache."""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Describe the cache usage.
+
+        Returns:
+            Dict containing the number of entries, size, budget, hits, misses and evictions
+        """
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
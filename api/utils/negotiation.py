@@ -0,0 +1,36 @@
+"""
+Content negotiation utilities.
+
+This module parses the Accept family of request headers, whose values are lists of
+tokens weighted by an optional quality parameter.
+"""
+
+from typing import List, Optional, Tuple
+
+
+def parse_preferences(header: Optional[str]) -> List[Tuple[str, float]]:
+    """
+    Parse an Accept or Accept-Encoding header.
+
+    Args:
+        header: Value of the header, if any
+
+    Returns:
+        List of the lowercase tokens and their quality, most preferred first; tokens of
+        equal quality keep the order of the header
+    """
+    preferences = []
+    for item in (header or "").split(","):
+        token, *parameters = [part.strip() for part in item.split(";")]
+        if not token:
+            continue
+        quality = 1.0
+        for parameter in parameters:
+            name, _, value = parameter.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        preferences.append((token.lower(), quality))
+    return sorted(preferences, key=lambda preference: -preference[1])
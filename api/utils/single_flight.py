@@ -0,0 +1,70 @@
+"""
+Single-flight execution.
+
+This module provides a group of keyed asynchronous calls in which concurrent
+callers asking for the same key share a single execution: the first caller starts
+the call, and the others await its result instead of repeating it.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+Result = TypeVar("Result")
+
+
+class SingleFlight:
+    """Group of keyed calls executed at most once at a time per key."""
+
+    def __init__(self):
+        """Initialize the group."""
+        self.executed = 0
+        self.coalesced = 0
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Result]]) -> Tuple[Result, bool]:
+        """
+        Run a call, or join the call already running for the same key.
+
+        The call runs in its own task, so that it completes for the callers still
+        waiting even if the caller that started it is cancelled.
+
+        Args:
+            key: Key identifying the result of the call
+            call: Function starting the call
+
+        Returns:
+            Tuple of the result and whether it was shared with another caller
+
+        Raises:
+            Exception: Any exception raised by the call, to every caller
+        """
+        task = self._calls.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.executed += 1
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._done(key, done))
+        return await asyncio.shield(task), shared
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved when every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Describe the calls of the group.
+
+        Returns:
+            Dict containing the number of calls executed, coalesced and running
+        """
+        return {
+            'executed': self.executed,
+            'coalesced': self.coalesced,
+            'in_flight': len(self._calls),
+        }